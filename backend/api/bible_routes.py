@@ -12,7 +12,7 @@ from typing import Optional, List, Dict, Any
 import logging
 import os
 
-from services.bible_session_service import BibleSessionService
+from services.bible_session_service import BibleSessionService, CACHED_SEARCH_SOURCES
 from services.bible_storage_service import BibleStorageService
 from services.nlt_api_service import NLTApiService
 
@@ -125,6 +125,7 @@ async def search_bible(
     q: str = Query(..., description="Search query"),
     version: str = Query(default="NLT", description="Bible version to search"),
     cached_only: bool = Query(default=False, description="Search cached content only"),
+    source: Optional[str] = Query(default=None, description="Cached search source (database, session)"),
     session_service: BibleSessionService = Depends(get_bible_session_service)
 ):
     """
@@ -133,6 +134,8 @@ async def search_bible(
     This endpoint:
     1. Searches either cached content only or uses API search
     2. Respects compliance limits (cached-only if over limit)
+       Cached searches run against every stored verse in the database (full-text
+       index) or only against the chapters in the session cache (source=session)
     3. Returns formatted search results with context
     
     Learning Notes:
@@ -150,8 +153,11 @@ async def search_bible(
         if version not in ["NLT", "KJV"]:
             raise HTTPException(status_code=400, detail="Invalid Bible version. Only NLT and KJV are supported.")
         
+        if source is not None and source not in CACHED_SEARCH_SOURCES:
+            raise HTTPException(status_code=400, detail=f"Invalid search source. Use one of: {', '.join(CACHED_SEARCH_SOURCES)}")
+        
         # Search using session service
-        result = await session_service.search_bible(q.strip(), version, cached_only)
+        result = await session_service.search_bible(q.strip(), version, cached_only, source)
         
         # Convert to response model
         return BibleSearchResponse(
@@ -164,6 +170,8 @@ async def search_bible(
             error=result.get('error')
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Error searching Bible for '{q}': {e}")
         raise HTTPException(status_code=500, detail=f"Bible search failed: {str(e)}")
@@ -248,7 +256,7 @@ async def initialize_bible_session(
     Initialize Bible session cache for a specific version.
     
     This endpoint:
-    1. Loads all cached chapters for the version into session memory
+    1. Warms the bounded session cache with the most read stored chapters
     2. Identifies missing chapters for progressive loading
     3. Returns initialization statistics
     
@@ -277,4 +285,47 @@ async def initialize_bible_session(
         
     except Exception as e:
         logger.error(f"❌ Error initializing Bible session for {version}: {e}")
-        raise HTTPException(status_code=500, detail=f"Session initialization failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Session initialization failed: {str(e)}")
+
+@bible_router.post("/chapter/{book}/{chapter}/pin")
+async def pin_bible_chapter(
+    book: str,
+    chapter: int,
+    version: str = Query(default="NLT", description="Bible version (NLT, KJV)"),
+    pinned: bool = Query(default=True, description="Pin (true) or unpin (false) the chapter"),
+    session_service: BibleSessionService = Depends(get_bible_session_service)
+):
+    """
+    Pin a hot chapter in the session cache so LRU eviction never drops it,
+    or unpin it again. Only chapters that have already been fetched (cached or
+    stored) can be pinned.
+    """
+    try:
+        if version not in ["NLT", "KJV"]:
+            raise HTTPException(status_code=400, detail="Invalid Bible version. Only NLT and KJV are supported.")
+        
+        if pinned:
+            try:
+                resident = await session_service.pin_chapter(book, chapter, version)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            if not resident:
+                raise HTTPException(status_code=404, detail=f"{book} {chapter} ({version}) has not been fetched yet; open it before pinning")
+        else:
+            session_service.unpin_chapter(book, chapter, version)
+            resident = session_service.session_cache.contains(version, f"{book}.{chapter}")
+        
+        return {
+            "success": True,
+            "book": book,
+            "chapter": chapter,
+            "version": version,
+            "pinned": pinned,
+            "resident": resident
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Error pinning Bible chapter {book} {chapter}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to pin Bible chapter: {str(e)}")
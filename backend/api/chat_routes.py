@@ -1,12 +1,17 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import AsyncIterator, List, Optional, Dict, Any
 from datetime import datetime
+import asyncio
 import logging
 import json
 import os
+import uuid
 
 from services.grok_service import grok_service
+from api.sse import sse_event
+from services.provider_health import provider_health
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +33,49 @@ class ChatResponse(BaseModel):
     error: Optional[str] = None
     conversation_id: Optional[str] = None
 
+def _prepare_librarian_prompt(request: ChatRequest) -> str:
+    """Validate a chat request and build (and log) its librarian prompt"""
+    # Validate request
+    if not request.message or not request.message.strip():
+        raise HTTPException(
+            status_code=400,
+            detail="Message cannot be empty"
+        )
+    
+    # Limit conversation history to last 4 messages (2 user/assistant pairs)
+    limited_history = request.conversation_history[-4:] if len(request.conversation_history) > 4 else request.conversation_history
+    
+    # Build librarian persona and context-aware prompt
+    librarian_prompt = build_librarian_prompt(
+        user_message=request.message,
+        conversation_history=limited_history,
+        study_context=request.context
+    )
+    
+    logger.info(f"Built librarian prompt: {len(librarian_prompt)} characters")
+    
+    # Log the prompt to file for debugging
+    log_chat_prompt(request.message, librarian_prompt, limited_history)
+    
+    return librarian_prompt
+
+def build_fallback_response(user_message: str) -> str:
+    """Helpful reply used when the AI service is unavailable"""
+    return f"""I apologize, but I'm having trouble connecting to my knowledge base right now. 
+
+However, I can see you asked: "{user_message}"
+
+As your Study Librarian, I'm here to help with:
+- Biblical interpretation and exegesis
+- Theological questions and concepts  
+- Historical and cultural context
+- Cross-references and parallel passages
+- Study methods and research guidance
+
+Please try your question again in a moment, or feel free to rephrase it. I'm committed to helping you grow in your understanding of Scripture!
+
+*[AI service temporarily unavailable - this is a fallback response]*"""
+
 @chat_router.post("/librarian", response_model=ChatResponse)
 async def chat_with_librarian(request: ChatRequest):
     """
@@ -37,32 +85,14 @@ async def chat_with_librarian(request: ChatRequest):
     try:
         logger.info(f"Librarian chat request: {request.message[:100]}...")
         
-        # Validate request
-        if not request.message or not request.message.strip():
-            raise HTTPException(
-                status_code=400,
-                detail="Message cannot be empty"
-            )
-        
-        # Limit conversation history to last 4 messages (2 user/assistant pairs)
-        limited_history = request.conversation_history[-4:] if len(request.conversation_history) > 4 else request.conversation_history
-        
-        # Build librarian persona and context-aware prompt
-        librarian_prompt = build_librarian_prompt(
-            user_message=request.message,
-            conversation_history=limited_history,
-            study_context=request.context
-        )
-        
-        logger.info(f"Built librarian prompt: {len(librarian_prompt)} characters")
-        
-        # Log the prompt to file for debugging
-        log_chat_prompt(request.message, librarian_prompt, limited_history)
+        librarian_prompt = _prepare_librarian_prompt(request)
         
         # Generate response using Grok AI
         try:
             logger.info("Sending prompt to Grok AI service for librarian chat...")
-            ai_response = await grok_service.generate_chat_response(librarian_prompt)
+            # Fails fast (to the fallback reply) while Grok's circuit is open
+            async with provider_health.call("grok"):
+                ai_response = await grok_service.generate_chat_response(librarian_prompt)
             logger.info(f"Successfully generated librarian response: {len(ai_response)} characters")
             
             return ChatResponse(
@@ -74,20 +104,7 @@ async def chat_with_librarian(request: ChatRequest):
         except Exception as ai_error:
             logger.error(f"Grok AI generation failed: {ai_error}")
             # Return a helpful fallback response
-            fallback_response = f"""I apologize, but I'm having trouble connecting to my knowledge base right now. 
-
-However, I can see you asked: "{request.message}"
-
-As your Study Librarian, I'm here to help with:
-- Biblical interpretation and exegesis
-- Theological questions and concepts  
-- Historical and cultural context
-- Cross-references and parallel passages
-- Study methods and research guidance
-
-Please try your question again in a moment, or feel free to rephrase it. I'm committed to helping you grow in your understanding of Scripture!
-
-*[AI service temporarily unavailable - this is a fallback response]*"""
+            fallback_response = build_fallback_response(request.message)
             
             return ChatResponse(
                 success=True,
@@ -104,6 +121,106 @@ Please try your question again in a moment, or feel free to rephrase it. I'm com
             detail="Internal server error during chat processing"
         )
 
+# Librarian streams in progress, by stream id, so clients can cancel them.
+# This lives in one worker process's memory: with several workers (gunicorn -w)
+# a cancel request only succeeds if it reaches the worker that owns the stream,
+# so clients should cancel by closing the connection, which works everywhere.
+_active_chat_streams: Dict[str, asyncio.Task] = {}
+
+@chat_router.post("/librarian/stream")
+async def chat_with_librarian_stream(request: ChatRequest):
+    """
+    Chat with the Study Librarian, streaming the reply as Server-Sent Events
+    
+    Events: 'start' (stream_id), 'token' (text chunk), then 'done' or 'error'.
+    Cancel by closing the connection, which aborts the upstream Grok request.
+    POST /librarian/stream/{stream_id}/cancel also works, but only within the
+    worker process serving the stream (see _active_chat_streams).
+    """
+    try:
+        logger.info(f"Librarian stream request: {request.message[:100]}...")
+        librarian_prompt = _prepare_librarian_prompt(request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to process librarian chat: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error during chat processing"
+        )
+    
+    stream_id = uuid.uuid4().hex
+    return StreamingResponse(
+        _librarian_events(stream_id, request.message, librarian_prompt),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "X-Stream-Id": stream_id
+        }
+    )
+
+@chat_router.post("/librarian/stream/{stream_id}/cancel")
+async def cancel_librarian_stream(stream_id: str):
+    """Cancel an in-progress librarian stream served by this worker process"""
+    reader = _active_chat_streams.get(stream_id)
+    if not reader:
+        raise HTTPException(status_code=404, detail="Stream not found, already finished, or served by another worker")
+    
+    reader.cancel()
+    return {"success": True, "stream_id": stream_id}
+
+async def _librarian_events(stream_id: str, user_message: str, librarian_prompt: str) -> AsyncIterator[str]:
+    """Forward Grok chat tokens to the client until done, failed or cancelled"""
+    stream = grok_service.stream_chat_response(librarian_prompt)
+    chunks: asyncio.Queue = asyncio.Queue()
+    
+    async def read_stream():
+        async with provider_health.call("grok"):
+            async for chunk in stream:
+                chunks.put_nowait(chunk)
+    
+    # One reader task per stream; cancelling it aborts a stalled upstream, and
+    # its completion (however it ends) wakes the loop below with a None marker
+    reader = asyncio.create_task(read_stream())
+    reader.add_done_callback(lambda _: chunks.put_nowait(None))
+    _active_chat_streams[stream_id] = reader
+    emitted = 0
+    
+    try:
+        yield sse_event("start", {"stream_id": stream_id, "conversation_id": f"chat_{int(datetime.utcnow().timestamp())}"})
+        
+        while (chunk := await chunks.get()) is not None:
+            emitted += len(chunk)
+            yield sse_event("token", {"text": chunk})
+        
+        if reader.cancelled():
+            logger.info(f"Librarian stream {stream_id} cancelled by client after {emitted} characters")
+            yield sse_event("done", {"cancelled": True})
+            return
+        
+        ai_error = reader.exception()
+        if ai_error is None:
+            logger.info(f"Successfully streamed librarian response: {emitted} characters")
+            yield sse_event("done", {"cancelled": False})
+            return
+        
+        logger.error(f"Grok AI streaming failed: {ai_error}")
+        if emitted:
+            yield sse_event("error", {"error": str(ai_error)})
+        else:
+            # Nothing shown yet: reply with the same fallback as the non-streaming endpoint
+            yield sse_event("token", {"text": build_fallback_response(user_message)})
+            yield sse_event("done", {"cancelled": False, "fallback": True})
+    
+    finally:
+        # Runs on completion, cancel and client disconnect: abort the upstream request
+        _active_chat_streams.pop(stream_id, None)
+        if not reader.done():
+            reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+        await stream.aclose()
+
 def build_librarian_prompt(user_message: str, conversation_history: List[ChatMessage], study_context: Dict[str, Any] = None) -> str:
     """
     Build a clean, efficient prompt for the Study Librarian AI
@@ -1,12 +1,14 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import AsyncIterator, Optional, Tuple
 from datetime import datetime
 import logging
 import json
 import os
 
 from services.prompt_service import PromptService
+from api.sse import sse_event
 from services.sermon_service import sermon_service
 
 logger = logging.getLogger(__name__)
@@ -28,84 +30,98 @@ class SermonResponse(BaseModel):
     error: Optional[str] = None
     code: Optional[str] = None
 
-@sermon_router.post("/generate", response_model=SermonResponse)
-async def generate_sermon(config: SermonConfig):
-    """Generate a sermon based on configuration and content"""
-    try:
-        # Validate configuration using prompt service
-        validation = prompt_service.validate_configuration(
-            config.sermonType, 
-            config.speakingStyle, 
-            config.sermonLength, 
-            config.outputFormat
+def _prepare_sermon_prompt(config: SermonConfig) -> Tuple[dict, str, dict]:
+    """
+    Validate a sermon configuration and build (and log) its AI prompt
+    
+    Returns:
+        Tuple of (validation, ai_prompt, prompt_metadata)
+    
+    Raises:
+        HTTPException: If the configuration or content is invalid
+    """
+    # Validate configuration using prompt service
+    validation = prompt_service.validate_configuration(
+        config.sermonType, 
+        config.speakingStyle, 
+        config.sermonLength, 
+        config.outputFormat
+    )
+    
+    if not validation['valid']:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Configuration validation failed: {'; '.join(validation['errors'])}"
         )
+    
+    # Validate content
+    if not config.content or not config.content.strip():
+        raise HTTPException(
+            status_code=400, 
+            detail="Content is required and cannot be empty"
+        )
+    
+    logger.info(f"Generating {config.sermonType} sermon in {config.speakingStyle} style")
+    logger.info(f"Length: {config.sermonLength}, Format: {config.outputFormat}")
+    
+    # Generate the AI prompt using prompt service
+    ai_prompt = prompt_service.build_prompt(
+        config.sermonType,
+        config.speakingStyle,
+        config.sermonLength,
+        config.outputFormat,
+        config.content
+    )
+    
+    # Get prompt metadata
+    prompt_metadata = prompt_service.get_prompt_metadata(
+        config.sermonType,
+        config.speakingStyle,
+        config.sermonLength,
+        config.outputFormat,
+        config.content
+    )
+    
+    logger.info(f"Generated prompt: {prompt_metadata['prompt_words']} words, {prompt_metadata['prompt_length']} characters")
+    
+    # Save the complete prompt to log file for review
+    try:
+        log_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "log_prompts")
+        os.makedirs(log_dir, exist_ok=True)
         
-        if not validation['valid']:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Configuration validation failed: {'; '.join(validation['errors'])}"
-            )
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        log_filename = f"sermon_prompt_{timestamp}.json"
+        log_filepath = os.path.join(log_dir, log_filename)
         
-        # Validate content
-        if not config.content or not config.content.strip():
-            raise HTTPException(
-                status_code=400, 
-                detail="Content is required and cannot be empty"
-            )
+        prompt_log = {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "configuration": {
+                "sermonType": config.sermonType,
+                "speakingStyle": config.speakingStyle,
+                "sermonLength": config.sermonLength,
+                "outputFormat": config.outputFormat
+            },
+            "content": config.content,
+            "generated_prompt": ai_prompt,
+            "prompt_metadata": prompt_metadata
+        }
         
-        logger.info(f"Generating {config.sermonType} sermon in {config.speakingStyle} style")
-        logger.info(f"Length: {config.sermonLength}, Format: {config.outputFormat}")
+        with open(log_filepath, 'w', encoding='utf-8') as f:
+            json.dump(prompt_log, f, indent=2, ensure_ascii=False)
         
-        # Generate the AI prompt using prompt service
-        ai_prompt = prompt_service.build_prompt(
-            config.sermonType,
-            config.speakingStyle,
-            config.sermonLength,
-            config.outputFormat,
-            config.content
-        )
+        logger.info(f"Prompt logged to: {log_filepath}")
         
-        # Get prompt metadata
-        prompt_metadata = prompt_service.get_prompt_metadata(
-            config.sermonType,
-            config.speakingStyle,
-            config.sermonLength,
-            config.outputFormat,
-            config.content
-        )
-        
-        logger.info(f"Generated prompt: {prompt_metadata['prompt_words']} words, {prompt_metadata['prompt_length']} characters")
-        
-        # Save the complete prompt to log file for review
-        try:
-            log_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "log_prompts")
-            os.makedirs(log_dir, exist_ok=True)
-            
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            log_filename = f"sermon_prompt_{timestamp}.json"
-            log_filepath = os.path.join(log_dir, log_filename)
-            
-            prompt_log = {
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-                "configuration": {
-                    "sermonType": config.sermonType,
-                    "speakingStyle": config.speakingStyle,
-                    "sermonLength": config.sermonLength,
-                    "outputFormat": config.outputFormat
-                },
-                "content": config.content,
-                "generated_prompt": ai_prompt,
-                "prompt_metadata": prompt_metadata
-            }
-            
-            with open(log_filepath, 'w', encoding='utf-8') as f:
-                json.dump(prompt_log, f, indent=2, ensure_ascii=False)
-            
-            logger.info(f"Prompt logged to: {log_filepath}")
-            
-        except Exception as log_error:
-            logger.error(f"Failed to log prompt: {log_error}")
-            # Don't fail the sermon generation if logging fails
+    except Exception as log_error:
+        logger.error(f"Failed to log prompt: {log_error}")
+        # Don't fail the sermon generation if logging fails
+    
+    return validation, ai_prompt, prompt_metadata
+
+@sermon_router.post("/generate", response_model=SermonResponse)
+async def generate_sermon(config: SermonConfig):
+    """Generate a sermon based on configuration and content"""
+    try:
+        validation, ai_prompt, prompt_metadata = _prepare_sermon_prompt(config)
         
         # Generate sermon using AI service with fallback
         try:
@@ -163,6 +179,72 @@ async def generate_sermon(config: SermonConfig):
         )
 
 
+@sermon_router.post("/generate/stream")
+async def generate_sermon_stream(config: SermonConfig):
+    """
+    Generate a sermon and stream it as Server-Sent Events
+    
+    Events: 'start' (configuration and prompt metadata), 'token' (text chunk
+    and service), then 'done' (final metadata) or 'error'.
+    """
+    try:
+        validation, ai_prompt, prompt_metadata = _prepare_sermon_prompt(config)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to prepare sermon prompt: {e}")
+        raise HTTPException(
+            status_code=500, 
+            detail="Internal server error during sermon generation"
+        )
+    
+    complete_prompt = ai_prompt + "\n\nCONTENT TO WORK WITH:\n" + config.content
+    
+    return StreamingResponse(
+        _sermon_events(complete_prompt, validation, prompt_metadata),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Don't let a reverse proxy buffer the stream
+        }
+    )
+
+async def _sermon_events(prompt: str, validation: dict, prompt_metadata: dict) -> AsyncIterator[str]:
+    """Forward sermon text chunks to the client as they are generated"""
+    yield sse_event("start", {
+        "configuration": validation['configuration'],
+        "prompt_metadata": prompt_metadata
+    })
+    
+    chunks = []
+    service_used = "none"
+    try:
+        async for chunk, service_used in sermon_service.stream_sermon(prompt):
+            chunks.append(chunk)
+            yield sse_event("token", {"text": chunk, "service": service_used})
+            
+    except Exception as ai_error:
+        logger.error(f"Streaming sermon generation failed: {ai_error}")
+        yield sse_event("error", {"error": str(ai_error), "ai_service_used": service_used})
+        return
+    
+    generated_sermon = "".join(chunks)
+    word_count = len(generated_sermon.split())
+    logger.info(f"Successfully streamed sermon with {service_used}: {len(generated_sermon)} characters")
+    
+    yield sse_event("done", {
+        "estimatedWords": word_count,
+        "estimatedMinutes": max(1, word_count // 120),
+        "generatedAt": datetime.utcnow().isoformat() + "Z",
+        "ai_service_used": service_used
+    })
+
+
+@sermon_router.get("/stats")
+async def sermon_dispatch_stats():
+    """Per-provider latency stats for tuning the sermon dispatch policy"""
+    return sermon_service.get_latency_stats()
+
 # Health check endpoint
 @sermon_router.get("/health")
 async def health_check():
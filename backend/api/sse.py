@@ -0,0 +1,10 @@
+# backend/api/sse.py
+"""
+Server-Sent Events formatting shared by the streaming routes
+"""
+
+import json
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
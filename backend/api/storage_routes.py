@@ -10,12 +10,19 @@ from typing import List, Dict, Any, Optional
 import json
 import uuid
 import asyncio
+import codecs
+import os
+import re
+import tempfile
+import zlib
 from datetime import datetime
-from io import BytesIO
+from decimal import Decimal
 import logging
 
-from services.storage_service import StorageService
-from services.file_processor import FileProcessor
+from services.storage_service import (
+    StorageService, SEARCH_MODES, CONTENT_FIELD_SETS, DEFAULT_SIMILARITY_THRESHOLD, encode_cursor
+)
+from services.file_processor import FileProcessor, extract_bible_references
 from services.analysis_service import analysis_service
 
 logger = logging.getLogger(__name__)
@@ -37,62 +44,57 @@ async def upload_content(
     category: str = Form(...),
     storage_service: StorageService = Depends(get_storage_service)
 ):
-    """Upload and process content files"""
+    """
+    Upload and process content files
+    
+    The request body is capped at UPLOAD_REQUEST_MAX_BYTES before the form is
+    parsed (UploadSizeLimitMiddleware). Each file is then copied off the event
+    loop to a named temporary file for the parser (files above UPLOAD_MAX_BYTES
+    are rejected) and parsed concurrently (at most UPLOAD_CONCURRENCY at a time), then all
+    successfully parsed files are stored in a single transaction. Each entry in
+    'items' reports the status of one file; a file that fails does not fail the batch.
+    """
     try:
         processor = FileProcessor()
-        uploaded_items = []
+        semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
         
-        for file in files:
-            # Read file content
-            content_bytes = await file.read()
-            
-            # Process file based on type
-            processed_data = await processor.process_file(
-                filename=file.filename,
-                content_bytes=content_bytes,
-                file_type=file.content_type
-            )
-            
-            # Add metadata
-            content_data = {
-                'title': processed_data.get('title', file.filename),
-                'category': category,
-                'content': processed_data['content'],
-                'passage': processed_data.get('passage'),
-                'tags': processed_data.get('tags', []),
-                'word_count': processed_data.get('word_count', 0),
-                'size_bytes': len(content_bytes),
-                'file_type': file.content_type
-            }
-            
-            # Store in database (using a default user ID for single-user setup)
-            content_id = await storage_service.store_content(
-                user_id=DEFAULT_USER_ID,
-                content_data=content_data
-            )
-            
-            # Trigger AI theological analysis (non-blocking)
-            await analysis_service.trigger_analysis(
-                content_id=content_id,
-                text_content=processed_data['content'],
-                title=processed_data.get('title'),
-                category=category,
-                storage_service=storage_service
-            )
-            
-            uploaded_items.append({
-                'id': content_id,
-                'title': content_data['title'],
-                'category': category,
-                'status': 'success'
+        results = await asyncio.gather(*[
+            _parse_upload(processor, semaphore, file, category) for file in files
+        ])
+        
+        parsed = [result for result in results if result['status'] == 'success']
+        
+        # Store every parsed file in one batch
+        content_ids = await storage_service.bulk_import(
+            user_id=DEFAULT_USER_ID,
+            content_items=[result.pop('content_data') for result in parsed]
+        )
+        
+        analysis_items = []
+        for result, content_id in zip(parsed, content_ids):
+            if content_id is None:
+                result['status'] = 'error'
+                result['error'] = 'Content could not be stored'
+                result.pop('text_content')
+                continue
+            result['id'] = content_id
+            analysis_items.append({
+                'content_id': content_id,
+                'text_content': result.pop('text_content'),
+                'title': result['title'],
+                'category': category
             })
-            
-            logger.info(f"Uploaded file: {file.filename} -> {content_id}")
+            logger.info(f"Uploaded file: {result['filename']} -> {content_id}")
+        
+        # Trigger AI theological analysis (non-blocking)
+        await analysis_service.trigger_bulk_analysis(analysis_items, storage_service, lane='interactive')
         
+        uploaded_count = len(analysis_items)
         return {
             'success': True,
-            'uploaded_count': len(uploaded_items),
-            'items': uploaded_items
+            'uploaded_count': uploaded_count,
+            'failed_count': len(results) - uploaded_count,
+            'items': results
         }
         
     except Exception as e:
@@ -104,16 +106,36 @@ async def list_content(
     category: Optional[str] = None,
     limit: int = 100,
     offset: int = 0,
+    cursor: Optional[str] = None,
+    fields: str = 'full',
     storage_service: StorageService = Depends(get_storage_service)
 ):
-    """List user's content with optional filtering"""
+    """
+    List user's content with optional filtering
+    
+    Pass the returned next_cursor back as ?cursor= to fetch the following page
+    (keyset pagination); offset is still accepted for older clients.
+    fields=summary returns metadata plus a short 'preview' instead of the full
+    content body (fetch the body from /content/{id}).
+    """
     try:
-        content_items = await storage_service.list_content(
-            user_id=DEFAULT_USER_ID,
-            category=category,
-            limit=limit,
-            offset=offset
-        )
+        try:
+            content_items = await storage_service.list_content(
+                user_id=DEFAULT_USER_ID,
+                category=category,
+                limit=limit,
+                offset=offset,
+                cursor=cursor,
+                fields=fields
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # A full page means there may be more rows after the last item
+        next_cursor = None
+        if content_items and len(content_items) == limit:
+            last_item = content_items[-1]
+            next_cursor = encode_cursor(last_item['date_created'], last_item['id'])
         
         # Convert datetime objects to ISO strings for JSON serialization
         for item in content_items:
@@ -124,9 +146,12 @@ async def list_content(
         
         return {
             'items': content_items,
-            'count': len(content_items)
+            'count': len(content_items),
+            'next_cursor': next_cursor
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to list content: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -176,11 +201,14 @@ async def update_content(
         # Add ID to content data to ensure update
         content_data['id'] = content_id
         
-        # Update word count and size if content changed
+        # Update word count and size if content changed (re-sending identical text is not a change)
         content_changed = False
-        if 'content' in content_data:
+        if 'content' in content_data and content_data['content'] != existing.get('content'):
             content_data['word_count'] = len(content_data['content'].split())
             content_data['size_bytes'] = len(content_data['content'].encode('utf-8'))
+            content_data['bible_references'] = extract_bible_references(content_data['content'])
+            # Pending until re-analyzed (also lets a deferred re-analysis be picked up later)
+            content_data['processing_status'] = 'pending'
             content_changed = True
         
         await storage_service.store_content(
@@ -349,18 +377,51 @@ async def search_content(
     q: str,
     category: Optional[str] = None,
     limit: int = 50,
+    mode: str = 'fulltext',
+    prefix: bool = True,
+    similarity: float = DEFAULT_SIMILARITY_THRESHOLD,
+    fields: str = 'full',
     storage_service: StorageService = Depends(get_storage_service)
 ):
-    """Search content with full-text search"""
+    """
+    Search content
+    
+    mode=fulltext (default) returns results ranked by relevance with a highlighted
+    'snippet'; supports "quoted phrases" and prefix matching of the last word.
+    mode=fuzzy matches misspelled/partial titles and passages; 'similarity'
+    (0-1) sets the match threshold.
+    mode=substring uses the legacy ILIKE match.
+    fields=summary omits the content body (see list_content).
+    
+    When the database lacks pg_trgm, fuzzy requests fall back to substring
+    search; the response's 'mode' is the mode that actually ran.
+    """
     try:
         if not q.strip():
             return {'items': [], 'count': 0}
         
+        if mode not in SEARCH_MODES:
+            raise HTTPException(status_code=400, detail=f"Invalid search mode. Use one of: {', '.join(SEARCH_MODES)}")
+        
+        if not 0 <= similarity <= 1:
+            raise HTTPException(status_code=400, detail="Similarity must be between 0 and 1")
+        
+        if fields not in CONTENT_FIELD_SETS:
+            raise HTTPException(status_code=400, detail=f"Invalid fields. Use one of: {', '.join(CONTENT_FIELD_SETS)}")
+        
+        if mode == 'fuzzy' and not storage_service.trigram_available:
+            logger.warning("Fuzzy search requested but pg_trgm is not installed, using substring search")
+            mode = 'substring'
+        
         results = await storage_service.search_content(
             user_id=DEFAULT_USER_ID,
             query=q.strip(),
             category=category,
-            limit=limit
+            limit=limit,
+            mode=mode,
+            prefix=prefix,
+            similarity=similarity,
+            fields=fields
         )
         
         # Convert datetime objects
@@ -373,9 +434,12 @@ async def search_content(
         return {
             'items': results,
             'count': len(results),
-            'query': q
+            'query': q,
+            'mode': mode
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Search failed for query '{q}': {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -419,70 +483,89 @@ async def get_categories():
 
 @storage_router.post("/export")
 async def export_user_data(
+    format: str = 'json',
+    compress: bool = False,
     storage_service: StorageService = Depends(get_storage_service)
 ):
-    """Export all user data as JSON"""
-    try:
-        export_data = await storage_service.export_user_data(DEFAULT_USER_ID)
-        
-        # Convert datetime objects to strings
-        def convert_datetime(obj):
-            if isinstance(obj, datetime):
-                return obj.isoformat()
-            elif isinstance(obj, dict):
-                return {k: convert_datetime(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [convert_datetime(item) for item in obj]
-            return obj
-        
-        export_data = convert_datetime(export_data)
-        
-        # Create JSON response
-        json_str = json.dumps(export_data, indent=2, ensure_ascii=False)
-        json_bytes = json_str.encode('utf-8')
-        
-        return StreamingResponse(
-            BytesIO(json_bytes),
-            media_type='application/json',
-            headers={
-                'Content-Disposition': 'attachment; filename="sermon_organizer_export.json"'
-            }
-        )
-        
-    except Exception as e:
-        logger.error(f"Export failed: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    """
+    Export all user data as a streamed download
+    
+    format=json writes the {"user_id", "export_date", "content_items": [...]} document
+    incrementally; format=ndjson writes one content item per line. compress=true
+    gzips the stream. Memory use stays bounded regardless of library size.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid export format. Use one of: {', '.join(EXPORT_FORMATS)}")
+    
+    chunks = _export_chunks(storage_service, DEFAULT_USER_ID, format)
+    if compress:
+        chunks = _gzip_chunks(chunks)
+    
+    filename = f"sermon_organizer_export.{format}" + (".gz" if compress else "")
+    media_type = 'application/gzip' if compress else (
+        'application/x-ndjson' if format == 'ndjson' else 'application/json'
+    )
+    
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"'
+        }
+    )
 
 @storage_router.post("/import")
 async def import_user_data(
     file: UploadFile = File(...),
     storage_service: StorageService = Depends(get_storage_service)
 ):
-    """Import user data from JSON file"""
+    """
+    Import user data from an export file
+    
+    Accepts the JSON export document (or a bare JSON array of items) and NDJSON
+    (.ndjson/.jsonl), optionally gzip-compressed. The upload is parsed
+    incrementally and loaded in batches of IMPORT_BATCH_SIZE, each in its own
+    transaction; per-batch progress is returned in 'batches'.
+    """
+    imported_count = 0
+    batches = []
+    
     try:
-        # Read and parse JSON
-        content_bytes = await file.read()
-        import_data = json.loads(content_bytes.decode('utf-8'))
-        
-        # Extract content items
-        content_items = import_data.get('content_items', [])
-        
-        # Import items
-        imported_ids = await storage_service.bulk_import(
-            user_id=DEFAULT_USER_ID,
-            content_items=content_items
-        )
+        text_chunks = _iter_upload_text(file)
+        if _is_ndjson_filename(file.filename):
+            items = _iter_ndjson_items(text_chunks)
+        else:
+            items = _iter_json_items(text_chunks)
+        
+        batch = []
+        async for item in items:
+            batch.append(item)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                batches.append(await _import_batch(storage_service, batch, len(batches) + 1))
+                imported_count += batches[-1]['imported']
+                batch = []
+        
+        if batch:
+            batches.append(await _import_batch(storage_service, batch, len(batches) + 1))
+            imported_count += batches[-1]['imported']
         
         return {
             'success': True,
-            'imported_count': len(imported_ids),
-            'message': f'Successfully imported {len(imported_ids)} items'
+            'imported_count': imported_count,
+            'skipped_count': sum(b['skipped'] for b in batches),
+            'analysis_queued': sum(b['analysis_queued'] for b in batches),
+            'batches': batches,
+            'message': f'Successfully imported {imported_count} items'
         }
         
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=400, detail="Invalid JSON file")
+    except (json.JSONDecodeError, ValueError, zlib.error) as e:
+        logger.error(f"Import rejected after {imported_count} items: {e}")
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid import file: {str(e)} ({imported_count} items were imported before the error)"
+        )
     except Exception as e:
-        logger.error(f"Import failed: {e}")
+        logger.error(f"Import failed after {imported_count} items: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @storage_router.put("/content/{content_id}/summary")
@@ -520,6 +603,325 @@ async def update_summary(
         raise HTTPException(status_code=500, detail=f"Summary update failed: {str(e)}")
 
 # Helper functions
+EXPORT_FORMATS = ('json', 'ndjson')
+
+def _json_default(obj):
+    """JSON encoder for database values (datetimes, UUIDs, NUMERIC)"""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+async def _export_chunks(storage_service: StorageService, user_id: str, format: str):
+    """Serialize content items one at a time as they arrive from the database cursor"""
+    try:
+        if format == 'ndjson':
+            async for item in storage_service.iter_content(user_id):
+                yield (json.dumps(item, default=_json_default, ensure_ascii=False) + "\n").encode('utf-8')
+            return
+        
+        header = json.dumps({'user_id': user_id, 'export_date': datetime.now().isoformat()}, ensure_ascii=False)
+        yield (header[:-1] + ', "content_items": [').encode('utf-8')
+        
+        first = True
+        async for item in storage_service.iter_content(user_id):
+            separator = "\n" if first else ",\n"
+            first = False
+            yield (separator + json.dumps(item, default=_json_default, ensure_ascii=False)).encode('utf-8')
+        
+        yield b"\n]}\n"
+        
+    except Exception as e:
+        # Headers are already sent, so the client sees a truncated file
+        logger.error(f"Export failed: {e}")
+        raise
+
+async def _gzip_chunks(chunks):
+    """Gzip-compress an async byte stream incrementally"""
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "4"))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_REQUEST_MAX_BYTES = int(os.getenv("UPLOAD_REQUEST_MAX_BYTES", str(200 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware capping the request body of upload endpoints
+    
+    Starlette reads and spools the whole multipart body before a route (or its
+    dependencies) runs, so the limit has to be enforced here: a Content-Length
+    above max_bytes is answered with 413 without reading the body, and bodies
+    without one (chunked) are counted as they are received.
+    """
+    
+    def __init__(self, app, paths: tuple = ("/api/storage/upload",), max_bytes: int = UPLOAD_REQUEST_MAX_BYTES):
+        self.app = app
+        self.paths = set(paths)
+        self.max_bytes = max_bytes
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        
+        detail = f"Upload exceeds the {_format_bytes(self.max_bytes)} request limit"
+        content_length = dict(scope['headers']).get(b'content-length')
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = JSONResponse({'detail': detail}, status_code=413)
+            await response(scope, receive, send)
+            return
+        
+        received = 0
+        
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > self.max_bytes:
+                    # Raised while the form is being parsed; FastAPI re-raises HTTPException
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+        
+        await self.app(scope, limited_receive, send)
+
+def _copy_upload(source, path: str, max_bytes: int, chunk_size: int) -> int:
+    """Blocking chunked copy of an upload's spooled file to path, enforcing max_bytes"""
+    size = 0
+    source.seek(0)
+    with open(path, 'wb') as spool:
+        while chunk := source.read(chunk_size):
+            size += len(chunk)
+            if size > max_bytes:
+                raise ValueError(f"File exceeds the {_format_bytes(max_bytes)} upload limit")
+            spool.write(chunk)
+    return size
+
+async def _spool_upload(file: UploadFile, max_bytes: int = UPLOAD_MAX_BYTES,
+                        chunk_size: int = UPLOAD_CHUNK_SIZE) -> tuple:
+    """
+    Copy an upload to a named temporary file so a parser process can open it
+    by path (Starlette's own spooled file is anonymous). The copy runs in a
+    thread, off the event loop. Returns (path, size); the caller removes the file.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise ValueError(f"File exceeds the {_format_bytes(max_bytes)} upload limit")
+    
+    suffix = os.path.splitext(file.filename or '')[1]
+    fd, path = tempfile.mkstemp(prefix='upload_', suffix=suffix)
+    os.close(fd)
+    try:
+        size = await asyncio.to_thread(_copy_upload, file.file, path, max_bytes, chunk_size)
+        return path, size
+    except BaseException:
+        os.unlink(path)
+        raise
+
+async def _parse_upload(processor: FileProcessor, semaphore: asyncio.Semaphore,
+                        file: UploadFile, category: str) -> Dict[str, Any]:
+    """Spool and parse one uploaded file, returning its per-file status"""
+    async with semaphore:
+        path = None
+        try:
+            # Spool to disk so the parser worker reads the file instead of an in-memory copy
+            path, size_bytes = await _spool_upload(file)
+            
+            # Process file based on type
+            processed_data = await processor.process_path(
+                filename=file.filename,
+                path=path,
+                file_type=file.content_type
+            )
+            
+            title = processed_data.get('title', file.filename)
+            return {
+                'filename': file.filename,
+                'title': title,
+                'category': category,
+                'status': 'success',
+                'text_content': processed_data['content'],
+                'content_data': {
+                    'title': title,
+                    'category': category,
+                    'content': processed_data['content'],
+                    'passage': processed_data.get('passage'),
+                    'bible_references': processed_data.get('metadata', {}).get('bible_references', []),
+                    'tags': processed_data.get('tags', []),
+                    'word_count': processed_data.get('word_count', 0),
+                    'size_bytes': size_bytes,
+                    'file_type': file.content_type,
+                    'processing_status': 'pending'
+                }
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to process upload {file.filename}: {e}")
+            return {
+                'filename': file.filename,
+                'title': file.filename,
+                'category': category,
+                'status': 'error',
+                'error': str(e)
+            }
+        finally:
+            if path:
+                os.unlink(path)
+            await file.close()
+
+IMPORT_BATCH_SIZE = 500
+IMPORT_CHUNK_SIZE = 64 * 1024
+# Caps on the decompressed import stream and on one buffered (incomplete) item
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+IMPORT_MAX_ITEM_BYTES = int(os.getenv("IMPORT_MAX_ITEM_BYTES", str(64 * 1024 * 1024)))
+_CONTENT_ITEMS_START = re.compile(r'"content_items"\s*:\s*\[')
+
+def _is_ndjson_filename(filename: Optional[str]) -> bool:
+    """NDJSON imports are recognised by extension (optionally with .gz)"""
+    name = (filename or '').lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    return name.endswith(('.ndjson', '.jsonl'))
+
+async def _iter_upload_text(file: UploadFile, chunk_size: int = IMPORT_CHUNK_SIZE,
+                            max_bytes: int = IMPORT_MAX_BYTES):
+    """
+    Read an upload in chunks, transparently gunzipping and decoding UTF-8
+    Decompression is bounded per step and in total, so a gzip bomb is rejected
+    instead of being inflated into memory.
+    """
+    chunk = await file.read(chunk_size)
+    decompressor = zlib.decompressobj(wbits=47) if chunk[:2] == b'\x1f\x8b' else None
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    total = 0
+    
+    def counted(data: bytes) -> bytes:
+        nonlocal total
+        total += len(data)
+        if total > max_bytes:
+            raise ValueError(f"Import data exceeds the {_format_bytes(max_bytes)} limit")
+        return data
+    
+    while chunk:
+        if decompressor:
+            data = counted(decompressor.decompress(chunk, chunk_size))
+            while True:
+                text = decoder.decode(data)
+                if text:
+                    yield text
+                if not decompressor.unconsumed_tail:
+                    break
+                data = counted(decompressor.decompress(decompressor.unconsumed_tail, chunk_size))
+        else:
+            text = decoder.decode(counted(chunk))
+            if text:
+                yield text
+        chunk = await file.read(chunk_size)
+    
+    tail = counted(decompressor.flush()) if decompressor else b''
+    text = decoder.decode(tail, final=True)
+    if text:
+        yield text
+
+def _json_truncated(error: json.JSONDecodeError, buffer: str) -> bool:
+    """Whether a decode error only means the item continues past the buffered text"""
+    # An unfinished string reports its opening quote; anything else fails at (or,
+    # for a partial literal or \u escape, just before) the end of the buffer
+    return error.msg.startswith('Unterminated string') or len(buffer) - error.pos <= 6
+
+async def _iter_json_items(text_chunks):
+    """
+    Incrementally yield objects from the export's "content_items" array (or a bare
+    top-level array) without loading the whole document
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = None  # position inside the item array once it has been found
+    
+    async for text in text_chunks:
+        buffer += text
+        
+        if pos is None:
+            stripped = buffer.lstrip()
+            if stripped.startswith('['):
+                pos = len(buffer) - len(stripped) + 1
+            else:
+                match = _CONTENT_ITEMS_START.search(buffer)
+                if not match:
+                    continue
+                pos = match.end()
+        
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == ']':
+                return
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                if not _json_truncated(e, buffer):
+                    raise
+                break  # item continues in the next chunk
+            yield item
+        
+        buffer = buffer[pos:]
+        pos = 0
+        if len(buffer) > IMPORT_MAX_ITEM_BYTES:
+            raise ValueError(f"Import item exceeds the {_format_bytes(IMPORT_MAX_ITEM_BYTES)} limit")
+    
+    if pos is None:
+        raise ValueError("No content_items array found")
+    raise json.JSONDecodeError("Unexpected end of import data", buffer, pos)
+
+async def _iter_ndjson_items(text_chunks):
+    """Yield one object per non-empty line"""
+    buffer = ''
+    async for text in text_chunks:
+        buffer += text
+        *lines, buffer = buffer.split('\n')
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+        if len(buffer) > IMPORT_MAX_ITEM_BYTES:
+            raise ValueError(f"Import item exceeds the {_format_bytes(IMPORT_MAX_ITEM_BYTES)} limit")
+    
+    if buffer.strip():
+        yield json.loads(buffer)
+
+async def _import_batch(storage_service: StorageService, batch: List[Dict[str, Any]], batch_number: int) -> Dict[str, Any]:
+    """Store one import batch and queue analysis for its unanalyzed items"""
+    content_ids = await storage_service.bulk_import(
+        user_id=DEFAULT_USER_ID,
+        content_items=batch
+    )
+    
+    pending = [
+        {
+            'content_id': content_id,
+            'text_content': item.get('content') or '',
+            'title': item.get('title'),
+            'category': item.get('category')
+        }
+        for content_id, item in zip(content_ids, batch)
+        if content_id is not None and not (item.get('key_themes') and item.get('thought_questions'))
+    ]
+    queued = await analysis_service.trigger_bulk_analysis(pending, storage_service, lane='auto')
+    
+    imported = sum(1 for content_id in content_ids if content_id is not None)
+    skipped = len(content_ids) - imported
+    logger.info(f"Import batch {batch_number}: {imported} items stored, {skipped} skipped, {queued} queued for analysis")
+    return {'batch': batch_number, 'imported': imported, 'skipped': skipped, 'analysis_queued': queued}
+
 def _format_bytes(bytes_value: int) -> str:
     """Format bytes as human-readable string"""
     if bytes_value == 0:
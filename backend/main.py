@@ -15,13 +15,17 @@ import sys
 import os
 sys.path.append('/app/backend')
 
-from api.storage_routes import storage_router, get_storage_service
+from api.storage_routes import storage_router, get_storage_service, UploadSizeLimitMiddleware
 from api.profile_routes import profile_router
 from api.sermon_routes import sermon_router
 from api.chat_routes import chat_router
 from api.bible_routes import bible_router, get_bible_session_service
 from services.storage_service import StorageService
-from services.file_processor import FileProcessor
+from services.file_processor import FileProcessor, shutdown_parse_executor
+from services.analysis_service import analysis_service
+from services.grok_service import grok_service
+from services.claude_service import claude_service
+from services.provider_health import provider_health
 from services.bible_storage_service import BibleStorageService
 from services.bible_session_service import BibleSessionService
 from services.nlt_api_service import NLTApiService
@@ -43,6 +47,10 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Cap upload request bodies before the multipart form is parsed (added before
+# CORS so 413 responses still carry CORS headers)
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # Configure CORS for frontend
 app.add_middleware(
     CORSMiddleware,
@@ -79,6 +87,14 @@ async def startup_event():
     await storage_service_instance.initialize()
     logger.info("✅ Storage service initialized")
     
+    # Open pooled HTTP clients for the AI providers
+    await grok_service.start()
+    await claude_service.start()
+    
+    # Start AI analysis workers
+    await analysis_service.start(storage_service_instance)
+    logger.info("✅ AI analysis workers started")
+    
     # Initialize Bible services
     try:
         # Parse Bible cache database config
@@ -111,8 +127,18 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
+    # Drain AI analysis before the database pool closes
+    await analysis_service.stop()
+    
+    # Close AI provider connection pools once nothing is using them
+    await grok_service.close()
+    await claude_service.close()
+    
     if storage_service_instance:
         await storage_service_instance.close()
+    
+    # Stop file parser worker processes
+    await shutdown_parse_executor()
         
     # Cleanup Bible services
     if bible_session_service_instance:
@@ -143,7 +169,8 @@ async def health_check():
         "status": "healthy",
         "service": "sermon-organizer-api",
         "version": "1.0.0",
-        "database": "postgresql" if storage_service_instance else "not_connected"
+        "database": "postgresql" if storage_service_instance else "not_connected",
+        "ai_providers": provider_health.snapshot()
     }
 
 # Custom StaticFiles class to handle SPA routing
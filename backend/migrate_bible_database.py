@@ -12,6 +12,8 @@ import asyncpg
 import os
 from typing import Dict, List, Tuple
 
+from services.bible_storage_service import INDEX_CHAPTER_VERSES_SQL
+
 # Database connection configuration
 BIBLE_DB_CONFIG = {
     'user': 'bible_user',
@@ -141,6 +143,21 @@ class BibleDatabaseMigrator:
         await self.connection.execute(compliance_sql)
         print("✅ Created compliance_summary table")
         
+        # 6. Create verses table (verse-level full-text search over stored chapters)
+        verses_sql = """
+        CREATE TABLE IF NOT EXISTS bible_cache.verses (
+            chapter_id INTEGER REFERENCES bible_cache.chapters(id) ON DELETE CASCADE,
+            verse_index INTEGER NOT NULL,
+            verse_number INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            search_vector tsvector GENERATED ALWAYS AS (to_tsvector('english', text)) STORED,
+            
+            PRIMARY KEY (chapter_id, verse_index)
+        );
+        """
+        await self.connection.execute(verses_sql)
+        print("✅ Created verses table")
+        
     async def create_indexes(self):
         """Create performance indexes"""
         print("📊 Creating database indexes...")
@@ -151,7 +168,8 @@ class BibleDatabaseMigrator:
             "CREATE INDEX IF NOT EXISTS idx_books_category ON bible_cache.books(category, testament);",
             "CREATE INDEX IF NOT EXISTS idx_chapters_accessed ON bible_cache.chapters(last_accessed DESC);",
             "CREATE INDEX IF NOT EXISTS idx_usage_logs_timestamp ON bible_cache.usage_logs(created_at DESC);",
-            "CREATE INDEX IF NOT EXISTS idx_versions_active ON bible_cache.versions(is_active, code);"
+            "CREATE INDEX IF NOT EXISTS idx_versions_active ON bible_cache.versions(is_active, code);",
+            "CREATE INDEX IF NOT EXISTS idx_verses_search ON bible_cache.verses USING GIN (search_vector);"
         ]
         
         for query in index_queries:
@@ -297,6 +315,20 @@ class BibleDatabaseMigrator:
         
         print("✅ Initialized compliance summary")
         
+    async def backfill_verses(self):
+        """Index the verses of chapters stored before the verses table existed"""
+        print("🔎 Backfilling verse search index...")
+        
+        chapter_ids = await self.connection.fetch("""
+            SELECT c.id FROM bible_cache.chapters c
+            WHERE NOT EXISTS (SELECT 1 FROM bible_cache.verses vs WHERE vs.chapter_id = c.id)
+        """)
+        
+        for row in chapter_ids:
+            await self.connection.execute(INDEX_CHAPTER_VERSES_SQL, row['id'])
+            
+        print(f"✅ Indexed verses for {len(chapter_ids)} stored chapters")
+        
     async def run_migration(self):
         """Run the complete database migration"""
         print("🚀 Starting Bible Cache Database Migration...")
@@ -309,13 +341,14 @@ class BibleDatabaseMigrator:
             await self.populate_versions()
             await self.populate_books()  
             await self.initialize_compliance_summary()
+            await self.backfill_verses()
             
             print("=" * 50)
             print("✅ Bible Cache Database Migration Completed Successfully!")
             print("\nDatabase Summary:")
             print("• Schema: bible_cache")
-            print("• Tables: versions, books, chapters, usage_logs, compliance_summary")  
-            print("• Indexes: 6 performance indexes created")
+            print("• Tables: versions, books, chapters, usage_logs, compliance_summary, verses")  
+            print("• Indexes: 7 performance indexes created (incl. GIN verse search)")
             print("• Books: 66 books (39 OT, 27 NT) with categories")
             print("• Versions: NLT, KJV configured for personal use")
             print("• Compliance: 500 verse limit tracking enabled")
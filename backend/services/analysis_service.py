@@ -5,16 +5,94 @@ Handles communication with AI services (Grok primary, Claude fallback) for key t
 """
 
 import asyncio
+import hashlib
 import logging
 import json
 import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict
 from datetime import datetime
-from typing import Optional
-from .grok_service import grok_service
+from typing import Optional, List, Dict, Any
+from .grok_service import grok_service, TheologicalAnalysis
 from .claude_service import claude_service
+from .provider_health import provider_health, ProviderUnavailableError
 
 logger = logging.getLogger(__name__)
 
+# Bump to invalidate cached analyses when analysis output changes in ways
+# the prompt text itself does not capture (e.g. post-processing)
+ANALYSIS_CACHE_VERSION = 1
+
+_WHITESPACE = re.compile(r'\s+')
+
+def normalize_analysis_text(text: Optional[str]) -> str:
+    """Normalize text so formatting-only edits map to the same cache entry"""
+    if not text:
+        return ''
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+# Rough token estimate (~4 characters per token for English prose)
+CHARS_PER_TOKEN = 4
+
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+# Markdown headings, "Chapter 3"-style lines and short ALL-CAPS lines
+_HEADING = re.compile(r'^(#{1,6}\s|(?i:chapter|part|section)\b|[A-Z][A-Z0-9 ,:;\'-]{2,80}$)')
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def _split_oversized(block: str, max_chars: int) -> List[str]:
+    """Split a block larger than the budget on sentence boundaries (hard split as a last resort)"""
+    pieces, current = [], ''
+    for sentence in _SENTENCE_END.split(block):
+        while len(sentence) > max_chars:
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """
+    Split a long document into chunks of at most max_tokens (estimated)
+    
+    Paragraphs are packed greedily; a heading starts a new chunk once the
+    current one is at least half full, so chunks follow the document's
+    sections and an edit in one section leaves the other chunks unchanged.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks, current = [], []
+    current_len = 0
+    
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        
+        is_heading = bool(_HEADING.match(paragraph.split('\n', 1)[0].strip()))
+        blocks = _split_oversized(paragraph, max_chars) if len(paragraph) > max_chars else [paragraph]
+        
+        for block in blocks:
+            starts_section = is_heading and current_len >= max_chars // 2
+            if current and (starts_section or current_len + len(block) + 2 > max_chars):
+                chunks.append('\n\n'.join(current))
+                current, current_len = [], 0
+            current.append(block)
+            current_len += len(block) + 2
+            is_heading = False
+    
+    if current:
+        chunks.append('\n\n'.join(current))
+    return chunks
+
 class AnalysisService:
     """Service for theological content analysis with queue management using Grok-primary/Claude-fallback"""
     
@@ -22,88 +100,513 @@ class AnalysisService:
         self.grok = grok_service
         self.claude = claude_service
         self.max_retries = 3
-        self.analysis_queue = asyncio.Queue()
-        self.queue_processor_running = False
+        
+        # Worker pool configuration
+        self.worker_count = int(os.getenv('ANALYSIS_WORKERS', '4'))
+        self.drain_timeout = float(os.getenv('ANALYSIS_DRAIN_TIMEOUT', '30'))
+        self.provider_limits = {
+            'Grok': asyncio.Semaphore(int(os.getenv('GROK_MAX_CONCURRENCY', '3'))),
+            'Claude': asyncio.Semaphore(int(os.getenv('CLAUDE_MAX_CONCURRENCY', '2')))
+        }
+        
+        # Durable job queue (analysis_jobs table) settings
+        self.poll_interval = float(os.getenv('ANALYSIS_POLL_INTERVAL', '5'))
+        self.visibility_timeout = float(os.getenv('ANALYSIS_VISIBILITY_TIMEOUT', '600'))
+        self.max_retry_delay = 600
+        # Admission limit on waiting interactive jobs (0 = unbounded); content beyond
+        # it stays 'pending' and is queued as the queue drains
+        self.queue_size = int(os.getenv('ANALYSIS_QUEUE_SIZE', '1000'))
+        self._deferred = False
+        
+        # Long documents are analyzed in chunks (map) and then merged (reduce)
+        self.chunk_threshold_tokens = int(os.getenv('ANALYSIS_CHUNK_THRESHOLD_TOKENS', '12000'))
+        self.chunk_tokens = int(os.getenv('ANALYSIS_CHUNK_TOKENS', '6000'))
+        self.chunk_concurrency = int(os.getenv('ANALYSIS_CHUNK_CONCURRENCY', '4'))
+        
+        # Analysis result cache: in-memory LRU in front of the analysis_cache table
+        self.cache_size = int(os.getenv('ANALYSIS_CACHE_SIZE', '512'))
+        self.cache: OrderedDict = OrderedDict()
+        self.cache_stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0}
+        self._prompt_fingerprints: Dict[str, str] = {}
+        
+        # Bulk lane: large enqueues go through Claude's Message Batches API
+        self.batch_enabled = os.getenv('ANALYSIS_BATCH_ENABLED', 'true').lower() == 'true'
+        self.batch_min_items = int(os.getenv('ANALYSIS_BATCH_MIN_ITEMS', '50'))
+        self.batch_size = int(os.getenv('ANALYSIS_BATCH_SIZE', '1000'))
+        self.batch_poll_interval = float(os.getenv('ANALYSIS_BATCH_POLL_INTERVAL', '60'))
+        self.batch_timeout = float(os.getenv('ANALYSIS_BATCH_TIMEOUT', str(25 * 3600)))
+        self.batch_runner: Optional[asyncio.Task] = None
+        self.batch_pollers: set = set()
+        
+        self.storage_service = None
+        self.workers: List[asyncio.Task] = []
+        self.in_flight = 0
+        self.accepting = True
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+    
+    async def start(self, storage_service = None):
+        """
+        Start the long-lived analysis worker pool (called from app startup)
+        Content left 'pending' by a previous process is requeued first.
+        """
+        if storage_service:
+            self.storage_service = storage_service
+        if self.workers or not self.storage_service:
+            return
+        
+        self.accepting = True
+        self._stopping = False
+        
+        # Anything beyond the admission limit is queued by idle workers later
+        self._deferred = True
+        await self._admit_deferred()
+        
+        self.workers = [
+            asyncio.create_task(self._analysis_worker(worker_id), name=f"analysis-worker-{worker_id}")
+            for worker_id in range(self.worker_count)
+        ]
+        logger.info(f"AI analysis worker pool started ({self.worker_count} workers)")
+        
+        if self.batch_enabled and self.claude.api_key:
+            self.batch_runner = asyncio.create_task(self._batch_runner(), name="analysis-batch-runner")
+    
+    async def stop(self, drain_timeout: float = None):
+        """
+        Stop the worker pool (called from app shutdown)
+        Workers stop claiming jobs and get up to drain_timeout seconds to finish
+        the ones in progress; jobs still running after that are released back to
+        the queue for the next process (or another replica).
+        """
+        if not self.workers:
+            return
+        
+        self.accepting = False
+        self._stopping = True
+        self._wakeup.set()
+        drain_timeout = self.drain_timeout if drain_timeout is None else drain_timeout
+        
+        done, pending = await asyncio.wait(self.workers, timeout=drain_timeout)
+        if pending:
+            logger.warning(f"AI analysis not drained after {drain_timeout}s, releasing {self.in_flight} jobs")
+            for worker in pending:
+                worker.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        
+        self.workers = []
+        
+        # Submitted batches keep running at the provider; polling resumes on next start
+        batch_tasks = [task for task in [self.batch_runner, *self.batch_pollers] if task]
+        for task in batch_tasks:
+            task.cancel()
+        await asyncio.gather(*batch_tasks, return_exceptions=True)
+        self.batch_runner = None
+        self.batch_pollers.clear()
+        
+        logger.info("AI analysis worker pool stopped")
+    
+    async def get_queue_status(self) -> Dict[str, Any]:
+        """Job counts by status and worker pool state"""
+        jobs = await self.storage_service.get_analysis_job_counts() if self.storage_service else {}
+        return {
+            'jobs': jobs,
+            'workers': len(self.workers),
+            'in_flight': self.in_flight,
+            'queue_capacity': self.queue_size,
+            'deferred': self._deferred,
+            'batches_in_flight': len(self.batch_pollers),
+            'accepting': self.accepting,
+            'cache': {**self.cache_stats, 'entries': len(self.cache)}
+        }
     
     async def trigger_analysis(self, content_id: str, text_content: str, 
                               title: str = None, category: str = None, 
                               storage_service = None) -> bool:
         """
-        Add AI theological analysis to queue for sequential processing
+        Queue AI theological analysis as a durable job
         
         Args:
             content_id: UUID of the content item
-            text_content: Full text to analyze
+            text_content: Full text to analyze (workers read the stored text when the job runs)
             title: Optional title for context
             category: Optional category for context
             storage_service: Storage service instance for database updates
             
         Returns:
-            bool: True if request was queued successfully
+            bool: True if a new job was queued (False if one is already waiting,
+                  or the queue is full and the item was deferred)
+        """
+        return await self.trigger_bulk_analysis([{
+            'content_id': content_id,
+            'text_content': text_content,
+            'title': title,
+            'category': category
+        }], storage_service) > 0
+    
+    async def trigger_bulk_analysis(self, items: List[Dict[str, Any]], storage_service = None,
+                                    lane: str = 'interactive') -> int:
+        """
+        Queue AI theological analysis for many content items at once
+        
+        Args:
+            items: Dicts with content_id, text_content and optional title/category
+            storage_service: Storage service instance for database updates
+            lane: 'interactive' (default), 'batch', or 'auto' to use the batch lane
+                  for enqueues of at least ANALYSIS_BATCH_MIN_ITEMS when batching is
+                  enabled (for bulk imports, not user-facing uploads)
+        
+        The interactive lane admits at most ANALYSIS_QUEUE_SIZE waiting jobs; items
+        over the limit keep their 'pending' status and are queued once there is room.
+            
+        Returns:
+            int: Number of new jobs queued (items already waiting are not duplicated)
         """
+        if not self.accepting:
+            logger.warning(f"AI analysis not queued for {len(items)} items: service is shutting down")
+            return 0
+        
+        storage_service = storage_service or self.storage_service
+        if not items or not storage_service:
+            return 0
+        
+        if lane == 'auto':
+            use_batch = self.batch_enabled and self.claude.api_key and len(items) >= self.batch_min_items
+            lane = 'batch' if use_batch else 'interactive'
+        
+        content_ids = [item['content_id'] for item in items]
         try:
-            # Add to queue for sequential processing
-            await self.analysis_queue.put({
-                'content_id': content_id,
-                'text_content': text_content,
-                'title': title,
-                'category': category,
-                'storage_service': storage_service
-            })
+            if lane == 'interactive' and self.queue_size > 0:
+                room = max(0, self.queue_size - await storage_service.count_queued_analysis_jobs(lane))
+                if room < len(content_ids):
+                    logger.warning(f"AI analysis queue is full, deferring {len(content_ids) - room} items")
+                    content_ids = content_ids[:room]
+                    self._deferred = True
+            queued = await storage_service.enqueue_analysis_jobs(content_ids, lane)
+        except Exception as e:
+            logger.error(f"Failed to queue AI analysis for {len(items)} items: {e}")
+            return 0
+        
+        # Start workers if the app did not (e.g. scripts), then wake idle ones
+        await self.start(storage_service)
+        self._wakeup.set()
+        
+        logger.info(f"AI theological analysis queued for {queued} items ({lane})")
+        return queued
+    
+    async def _analysis_worker(self, worker_id: int):
+        """Long-lived worker: claim and process durable jobs until stopped"""
+        while not self._stopping:
+            try:
+                jobs = await self.storage_service.claim_analysis_jobs(1, self.visibility_timeout)
+            except Exception as e:
+                logger.error(f"Analysis worker {worker_id} failed to claim a job: {e}")
+                jobs = []
             
-            # Start queue processor if not running
-            if not self.queue_processor_running:
-                asyncio.create_task(self._process_analysis_queue())
+            if not jobs:
+                if await self._admit_deferred():
+                    continue
+                
+                # Sleep until new work is queued locally, or poll for work from other replicas
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
             
-            queue_size = self.analysis_queue.qsize()
-            logger.info(f"AI theological analysis queued for content {content_id} (queue size: {queue_size})")
-            return True
+            await self._run_job(worker_id, jobs[0])
+    
+    async def _admit_deferred(self) -> int:
+        """Queue 'pending' content that was deferred by the admission limit, up to the limit"""
+        if not self._deferred:
+            return 0
+        self._deferred = False
+        
+        try:
+            room = None
+            if self.queue_size > 0:
+                room = self.queue_size - await self.storage_service.count_queued_analysis_jobs()
+                if room <= 0:
+                    self._deferred = True
+                    return 0
+            requeued = await self.storage_service.requeue_pending_analysis(room)
+        except Exception as e:
+            logger.error(f"Failed to requeue pending analysis: {e}")
+            self._deferred = True
+            return 0
+        
+        # Filling the room may have left more behind
+        self._deferred = room is not None and requeued >= room
+        if requeued:
+            self._wakeup.set()
+        return requeued
+    
+    async def _run_job(self, worker_id: Any, job: Dict[str, Any]):
+        """Process one claimed job and record its outcome"""
+        job_id = job['job_id']
+        content_id = str(job['content_id'])
+        self.in_flight += 1
+        try:
+            success = await self._process_and_store_analysis(
+                content_id,
+                job['content'],
+                job['title'],
+                job['category'],
+                self.storage_service
+            )
+            if success:
+                await self.storage_service.complete_analysis_job(job_id)
+            else:
+                await self.storage_service.fail_analysis_job(
+                    job_id, "AI analysis failed with both Grok and Claude services",
+                    self._retry_delay(job['attempts'])
+                )
+        except asyncio.CancelledError:
+            # Shutdown: hand the job back instead of waiting for its visibility timeout
+            await asyncio.shield(self.storage_service.release_analysis_job(job_id))
+            raise
+        except Exception as e:
+            logger.error(f"Analysis worker {worker_id} error for {content_id}: {e}")
+            try:
+                await self.storage_service.fail_analysis_job(job_id, str(e), self._retry_delay(job['attempts']))
+            except Exception as db_error:
+                logger.error(f"Failed to record analysis job failure for {content_id}: {db_error}")
+        finally:
+            self.in_flight -= 1
+    
+    async def _batch_runner(self):
+        """Claim batch-lane jobs and submit them as provider batches until stopped"""
+        try:
+            submitted = await self.storage_service.get_submitted_analysis_batches()
+        except Exception as e:
+            logger.error(f"Failed to load submitted analysis batches: {e}")
+            submitted = {}
+        
+        for batch_id, jobs in submitted.items():
+            # Keep the original deadline: poll until shortly before the claim taken
+            # at submission runs out
+            lock_seconds = min(job.pop('lock_seconds') or 0 for job in jobs)
+            logger.info(f"Resuming analysis batch {batch_id} ({len(jobs)} jobs, {max(lock_seconds, 0):.0f}s left)")
+            self._spawn_batch_poller(batch_id, jobs, lock_seconds - 2 * self.batch_poll_interval)
+        
+        while not self._stopping:
+            try:
+                # A short claim, so jobs are not stranded if the process dies before
+                # submitting; set_analysis_job_batch extends it once the batch exists
+                jobs = await self.storage_service.claim_analysis_jobs(
+                    self.batch_size, self.visibility_timeout, lane='batch'
+                )
+            except Exception as e:
+                logger.error(f"Analysis batch runner failed to claim jobs: {e}")
+                jobs = []
+            
+            if not jobs:
+                await asyncio.sleep(self.poll_interval)
+                continue
             
+            await self._submit_batch(jobs)
+    
+    def _spawn_batch_poller(self, batch_id: str, jobs: List[Dict[str, Any]], timeout: float = None):
+        self._spawn_batch_task(self._collect_batch(batch_id, jobs, timeout), name=f"analysis-batch-{batch_id}")
+    
+    def _spawn_batch_task(self, coro, name: str = None):
+        """Run batch-lane work in the background, tracked so stop() can cancel it"""
+        task = asyncio.create_task(coro, name=name)
+        self.batch_pollers.add(task)
+        task.add_done_callback(self.batch_pollers.discard)
+    
+    async def _submit_batch(self, jobs: List[Dict[str, Any]]):
+        """Serve cached results directly and submit the rest as one Claude batch"""
+        pending = []
+        for job in jobs:
+            content_id = str(job['content_id'])
+            analysis = await self._get_cached_analysis(
+                content_id, job['content'], job['title'], job['category'], self.storage_service
+            )
+            if analysis:
+                await self._store_batch_result(job, analysis)
+            elif estimate_tokens(job['content']) > self.chunk_threshold_tokens:
+                # Long documents need map-reduce, which the single-request batch API can't do
+                self._spawn_batch_task(self._run_job("batch", job))
+            else:
+                pending.append(job)
+        
+        if not pending:
+            return
+        
+        try:
+            async with provider_health.call("claude"):
+                batch = await self.claude.create_analysis_batch([
+                    {
+                        'custom_id': str(job['job_id']),
+                        'content': job['content'],
+                        'title': job['title'],
+                        'category': job['category']
+                    }
+                    for job in pending
+                ])
+            # Hold the claim for the whole polling window (plus slack); a poller resumed
+            # after a restart derives its deadline from this same lock
+            await self.storage_service.set_analysis_job_batch(
+                [job['job_id'] for job in pending], batch['id'], self.batch_timeout + 2 * self.batch_poll_interval
+            )
         except Exception as e:
-            logger.error(f"Failed to queue AI analysis for {content_id}: {e}")
-            return False
+            logger.error(f"Failed to submit analysis batch of {len(pending)} jobs: {e}")
+            for job in pending:
+                await self.storage_service.fail_analysis_job(job['job_id'], str(e), self._retry_delay(job['attempts']))
+            return
+        
+        self._spawn_batch_poller(batch['id'], pending)
     
-    async def _process_analysis_queue(self):
+    async def _collect_batch(self, batch_id: str, jobs: List[Dict[str, Any]], timeout: float = None):
         """
-        Process analysis requests from queue sequentially
-        Runs continuously until queue is empty
+        Poll a submitted batch until it ends, then fan results back out to content items.
+        If it has not ended within timeout seconds (ANALYSIS_BATCH_TIMEOUT for a new
+        batch, what is left of it for a resumed one), its jobs are re-queued on the
+        interactive lane. The batch is always polled at least once.
         """
-        self.queue_processor_running = True
-        logger.info("AI analysis queue processor started")
+        timeout = self.batch_timeout if timeout is None else timeout
+        deadline = time.monotonic() + max(0.0, timeout)
+        batch = None
+        while True:
+            try:
+                polled = await self.claude.get_batch(batch_id)
+                if polled.get('processing_status') == 'ended':
+                    batch = polled
+                    break
+            except Exception as e:
+                logger.error(f"Failed to poll analysis batch {batch_id}: {e}")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(self.batch_poll_interval, remaining))
         
+        jobs_by_id = {str(job['job_id']): job for job in jobs}
+        succeeded = 0
+        if batch is None:
+            logger.error(f"Analysis batch {batch_id} did not end before its deadline, "
+                         f"re-queuing {len(jobs)} jobs interactively")
+        else:
+            succeeded = await self._store_batch_results(batch, jobs_by_id)
+        
+        # Anything without a result is retried interactively
+        for job in jobs_by_id.values():
+            await self.storage_service.fail_analysis_job(
+                job['job_id'], f"No result in batch {batch_id}", self._retry_delay(job['attempts']), lane='interactive'
+            )
+        
+        logger.info(f"Analysis batch {batch_id} finished: {succeeded}/{len(jobs)} succeeded")
+        self._wakeup.set()
+    
+    async def _store_batch_results(self, batch: Dict[str, Any], jobs_by_id: Dict[str, Dict[str, Any]]) -> int:
+        """Store an ended batch's results, popping each answered job from jobs_by_id"""
+        succeeded = 0
         try:
-            while True:
-                try:
-                    # Get next item from queue (wait up to 1 second)
-                    queue_item = await asyncio.wait_for(
-                        self.analysis_queue.get(), 
-                        timeout=1.0
-                    )
-                    
-                    # Process the analysis
-                    await self._process_and_store_analysis(
-                        queue_item['content_id'],
-                        queue_item['text_content'],
-                        queue_item['title'],
-                        queue_item['category'],
-                        queue_item['storage_service']
+            async for custom_id, result in self.claude.iter_analysis_batch_results(batch):
+                job = jobs_by_id.pop(custom_id, None)
+                if not job:
+                    continue
+                
+                if isinstance(result, str) or not result.key_themes or not result.thought_questions:
+                    # Retry individually through the interactive lane
+                    error = result if isinstance(result, str) else "Batch analysis returned incomplete data"
+                    await self.storage_service.fail_analysis_job(
+                        job['job_id'], error, self._retry_delay(job['attempts']), lane='interactive'
                     )
-                    
-                    # Mark task as done
-                    self.analysis_queue.task_done()
-                    
-                except asyncio.TimeoutError:
-                    # No items in queue for 1 second, stop processor
-                    break
-                    
-                except Exception as e:
-                    logger.error(f"Error processing analysis queue item: {e}")
-                    # Continue processing other items
                     continue
-                    
-        finally:
-            self.queue_processor_running = False
-            logger.info("AI analysis queue processor stopped")
+                
+                await self._store_cached_analysis(
+                    "Claude", self.claude, job['content'], job['title'], job['category'], result, self.storage_service
+                )
+                await self._store_batch_result(job, result)
+                succeeded += 1
+        except Exception as e:
+            logger.error(f"Failed to read results of analysis batch {batch.get('id')}: {e}")
+        
+        return succeeded
+    
+    async def _store_batch_result(self, job: Dict[str, Any], analysis: TheologicalAnalysis):
+        """Save a batch (or cached) analysis and complete its job"""
+        success = await self.storage_service.update_processing_data(
+            content_id=str(job['content_id']),
+            key_themes=analysis.key_themes,
+            thought_questions=analysis.thought_questions,
+            processing_status='completed'
+        )
+        if success:
+            await self.storage_service.complete_analysis_job(job['job_id'])
+        else:
+            await self.storage_service.fail_analysis_job(
+                job['job_id'], "Failed to store analysis", self._retry_delay(job['attempts'])
+            )
+    
+    def _retry_delay(self, attempts: int) -> float:
+        """Exponential backoff between job attempts (30s, 60s, 120s...)"""
+        return min(self.max_retry_delay, 30 * 2 ** max(attempts - 1, 0))
+    
+    async def _analyze_text(self, content_id: str, text_content: str, title: str = None,
+                            category: str = None, storage_service = None) -> Optional[TheologicalAnalysis]:
+        """Analyze one piece of text: cache, then Grok, then Claude fallback"""
+        # Reuse an earlier analysis of identical content
+        analysis = await self._get_cached_analysis(content_id, text_content, title, category, storage_service)
+        
+        if not analysis:
+            # Try Grok first (primary service)
+            analysis = await self._try_analysis_with_service("Grok", self.grok, content_id, text_content, title, category)
+            if analysis:
+                await self._store_cached_analysis("Grok", self.grok, text_content, title, category, analysis, storage_service)
+        
+        # If Grok fails, fallback to Claude
+        if not analysis:
+            logger.warning(f"Grok analysis failed for {content_id}, falling back to Claude")
+            analysis = await self._try_analysis_with_service("Claude", self.claude, content_id, text_content, title, category)
+            if analysis:
+                await self._store_cached_analysis("Claude", self.claude, text_content, title, category, analysis, storage_service)
+        
+        return analysis
+    
+    async def _analyze_chunked(self, content_id: str, text_content: str, title: str = None,
+                               category: str = None, storage_service = None) -> Optional[TheologicalAnalysis]:
+        """
+        Map-reduce analysis for documents too long for a single request
+        
+        Each chunk is analyzed (and cached) on its own, so after an edit only the
+        changed chunks are re-analyzed; the chunk results are then merged into
+        the final themes and questions by one more analysis call.
+        """
+        chunks = split_into_chunks(text_content, self.chunk_tokens)
+        logger.info(f"Chunked analysis for {content_id}: {len(chunks)} chunks")
+        
+        limit = asyncio.Semaphore(self.chunk_concurrency)
+        
+        async def analyze_chunk(index: int, chunk: str):
+            async with limit:
+                return await self._analyze_text(
+                    f"{content_id}#chunk{index + 1}", chunk, title, category, storage_service
+                )
+        
+        results = await asyncio.gather(*(analyze_chunk(index, chunk) for index, chunk in enumerate(chunks)))
+        
+        failed = sum(1 for result in results if not result)
+        if failed:
+            # Successful chunks are cached, so a retry only redoes the failed ones
+            logger.error(f"Chunked analysis for {content_id}: {failed}/{len(chunks)} chunks failed")
+            return None
+        
+        # Reduce: merge the section analyses into the final themes and questions
+        sections = []
+        for index, result in enumerate(results):
+            sections.append(
+                f"Section {index + 1} of {len(results)}\n"
+                f"Themes: {'; '.join(result.key_themes)}\n"
+                f"Questions: {' '.join(result.thought_questions)}"
+            )
+        merged_text = (
+            "The document was analyzed section by section. Considering the whole document, "
+            "synthesize these section analyses into its overall themes and questions.\n\n"
+            + "\n\n".join(sections)
+        )
+        return await self._analyze_text(f"{content_id}#reduce", merged_text, title, category, storage_service)
     
     async def _process_and_store_analysis(self, content_id: str, text_content: str,
                                           title: str = None, category: str = None, 
@@ -112,30 +615,15 @@ class AnalysisService:
         Internal method that handles AI service communication (Grok primary, Claude fallback) and database update
         Includes service fallback logic and error handling
         """
-        # Try Grok first (primary service)
-        analysis = await self._try_analysis_with_service("Grok", self.grok, content_id, text_content, title, category)
-        
-        # If Grok fails, fallback to Claude
-        if not analysis:
-            logger.warning(f"Grok analysis failed for {content_id}, falling back to Claude")
-            analysis = await self._try_analysis_with_service("Claude", self.claude, content_id, text_content, title, category)
+        if estimate_tokens(text_content) > self.chunk_threshold_tokens:
+            analysis = await self._analyze_chunked(content_id, text_content, title, category, storage_service)
+        else:
+            analysis = await self._analyze_text(content_id, text_content, title, category, storage_service)
         
-        # If both services fail
+        # If both services fail: the job is retried, and the content is only marked
+        # 'failed' once the job is dead-lettered (see fail_analysis_job)
         if not analysis:
             logger.error(f"Both Grok and Claude analysis failed for {content_id}")
-            
-            # Update database with failure status
-            if storage_service:
-                try:
-                    await storage_service.update_processing_data(
-                        content_id=content_id,
-                        processing_status='failed',
-                        last_error="AI analysis failed with both Grok and Claude services"
-                    )
-                    logger.info(f"Database updated with failure status for {content_id}")
-                except Exception as db_error:
-                    logger.error(f"Failed to update database with failure status for {content_id}: {db_error}")
-            
             return False
         
         # Success - store results in database
@@ -157,6 +645,87 @@ class AnalysisService:
             logger.error(f"No storage service provided for {content_id}")
             return False
 
+    def _analysis_cache_key(self, service_name: str, service, text_content: str,
+                            title: str = None, category: str = None) -> str:
+        """Hash of (normalized text, title, category, model, prompt version)"""
+        fingerprint = self._prompt_fingerprints.get(service_name)
+        if fingerprint is None:
+            # The prompt version is derived from the prompt itself so edits invalidate the cache
+            prompt = json.dumps([service._create_system_prompt(), service._create_function_schema()], sort_keys=True)
+            fingerprint = hashlib.sha256(f"{ANALYSIS_CACHE_VERSION}:{prompt}".encode('utf-8')).hexdigest()
+            self._prompt_fingerprints[service_name] = fingerprint
+        
+        key = json.dumps([
+            normalize_analysis_text(text_content),
+            normalize_analysis_text(title),
+            category or '',
+            service.model,
+            fingerprint
+        ], ensure_ascii=False)
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+    
+    def _remember_analysis(self, cache_key: str, analysis: TheologicalAnalysis):
+        """Add a result to the in-memory LRU"""
+        self.cache[cache_key] = analysis
+        self.cache.move_to_end(cache_key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+    
+    async def _get_cached_analysis(self, content_id: str, text_content: str, title: str = None,
+                                   category: str = None, storage_service = None) -> Optional[TheologicalAnalysis]:
+        """
+        Look up a previous analysis of identical content (Grok results preferred)
+        
+        Returns:
+            TheologicalAnalysis if cached, None on a miss
+        """
+        cache_keys = [
+            self._analysis_cache_key("Grok", self.grok, text_content, title, category),
+            self._analysis_cache_key("Claude", self.claude, text_content, title, category)
+        ]
+        
+        for cache_key in cache_keys:
+            if cache_key in self.cache:
+                self.cache.move_to_end(cache_key)
+                self.cache_stats['memory_hits'] += 1
+                logger.info(f"AI analysis cache hit (memory) for {content_id}")
+                return self.cache[cache_key]
+        
+        if storage_service:
+            try:
+                cached = await storage_service.get_cached_analysis(cache_keys)
+            except Exception as e:
+                logger.error(f"Analysis cache lookup failed for {content_id}: {e}")
+                cached = None
+            
+            if cached:
+                analysis = TheologicalAnalysis(
+                    key_themes=list(cached['key_themes']),
+                    thought_questions=list(cached['thought_questions'])
+                )
+                self._remember_analysis(cached['cache_key'], analysis)
+                self.cache_stats['db_hits'] += 1
+                logger.info(f"AI analysis cache hit ({cached['model']}) for {content_id}")
+                return analysis
+        
+        self.cache_stats['misses'] += 1
+        return None
+    
+    async def _store_cached_analysis(self, service_name: str, service, text_content: str,
+                                     title: str, category: str, analysis: TheologicalAnalysis,
+                                     storage_service = None):
+        """Cache a fresh analysis in memory and in Postgres"""
+        cache_key = self._analysis_cache_key(service_name, service, text_content, title, category)
+        self._remember_analysis(cache_key, analysis)
+        
+        if storage_service:
+            try:
+                await storage_service.store_cached_analysis(
+                    cache_key, service.model, analysis.key_themes, analysis.thought_questions
+                )
+            except Exception as e:
+                logger.error(f"Failed to cache analysis from {service_name}: {e}")
+    
     async def _try_analysis_with_service(self, service_name: str, service, content_id: str, 
                                        text_content: str, title: str = None, category: str = None):
         """
@@ -165,6 +734,11 @@ class AnalysisService:
         Returns:
             TheologicalAnalysis object if successful, None if failed
         """
+        # Skip a provider whose circuit is open instead of burning retries on it
+        if not provider_health.is_available(service_name):
+            logger.warning(f"{service_name} is unavailable (circuit open), skipping analysis for {content_id}")
+            return None
+        
         for attempt in range(self.max_retries):
             try:
                 logger.info(f"AI theological analysis with {service_name} (attempt {attempt + 1}) for {content_id}")
@@ -172,12 +746,14 @@ class AnalysisService:
                 # Log the analysis prompt for debugging
                 self._log_analysis_prompt(content_id, text_content, title, category, service_name)
                 
-                # Call AI service for theological analysis
-                analysis = await service.analyze_content(
-                    content=text_content,
-                    title=title,
-                    category=category
-                )
+                # Call AI service for theological analysis (capped per provider)
+                async with self.provider_limits[service_name]:
+                    async with provider_health.call(service_name):
+                        analysis = await service.analyze_content(
+                            content=text_content,
+                            title=title,
+                            category=category
+                        )
                 
                 if not analysis or not analysis.key_themes or not analysis.thought_questions:
                     logger.warning(f"{service_name} analysis returned incomplete data: {analysis}")
@@ -191,11 +767,15 @@ class AnalysisService:
                 logger.info(f"{service_name} analysis successful for {content_id}")
                 return analysis
                         
+            except ProviderUnavailableError as e:
+                logger.warning(f"{e}, giving up on {service_name} for {content_id}")
+                return None
+            
             except Exception as e:
                 logger.error(f"{service_name} analysis error for {content_id} (attempt {attempt + 1}): {e}")
             
-            # Wait before retry (exponential backoff)
-            if attempt < self.max_retries - 1:
+            # Wait before retry (exponential backoff) unless the provider has been marked down
+            if attempt < self.max_retries - 1 and provider_health.is_available(service_name):
                 wait_time = 2 ** attempt  # 1s, 2s, 4s
                 await asyncio.sleep(wait_time)
         
@@ -203,9 +783,12 @@ class AnalysisService:
         return None
     
     async def health_check(self) -> bool:
-        """Check if AI services are available (Grok primary, Claude fallback)"""
-        grok_healthy = await self.grok.health_check()
-        claude_healthy = await self.claude.health_check()
+        """
+        Check if AI services are available (Grok primary, Claude fallback)
+        Uses circuit breaker state from real requests rather than live probe calls.
+        """
+        grok_healthy = provider_health.is_available("grok") and bool(self.grok.api_key)
+        claude_healthy = provider_health.is_available("claude") and bool(self.claude.api_key)
         
         if grok_healthy:
             logger.info("Grok AI service is healthy (primary)")
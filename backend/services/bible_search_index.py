@@ -0,0 +1,236 @@
+# backend/services/bible_search_index.py
+"""
+In-memory inverted index over the verses in the Bible session cache
+Maintained incrementally by ChapterCache as chapters are cached and evicted, so
+cached-only search looks up postings instead of scanning every verse
+
+Each cached verse gets an integer id; chapters take a contiguous block of ids
+that are never reused, so postings (token -> array of verse ids, one entry per
+occurrence) stay sorted and can be probed with bisect.
+
+Queries:
+  * bare words must all appear in the verse (AND)
+  * "quoted phrases" must appear as consecutive words
+  * results are ranked with a BM25-style term weight (rarer words count more)
+"""
+
+import math
+import re
+import sys
+import heapq
+import logging
+from array import array
+from collections import Counter
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_PHRASE = re.compile(r'"([^"]+)"')
+
+# Term frequency saturation for ranking
+TF_SATURATION = 1.2
+
+# Approximate memory per posting entry and per distinct term (postings array,
+# key string and dict slot), for the session cache's byte bound
+POSTING_BYTES = array('I').itemsize
+TERM_BYTES = sys.getsizeof(array('I')) + sys.getsizeof('') + 8 + 48
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokens (curly apostrophes folded); the possessive 's is
+    dropped, so "Lord’s", "Lord's" and "lord" are the same token
+    """
+    return [token[:-2] if token.endswith("'s") else token
+            for token in _TOKEN.findall(text.lower().replace('’', "'"))]
+
+def parse_query(query: str) -> Tuple[List[str], List[List[str]]]:
+    """Split a query into required terms and phrases (token lists of 2+ words)"""
+    phrases = [tokens for tokens in (tokenize(phrase) for phrase in _PHRASE.findall(query)) if len(tokens) > 1]
+    terms = list(dict.fromkeys(tokenize(query)))
+    return terms, phrases
+
+def _contains_phrase(tokens: List[str], phrase: List[str]) -> bool:
+    width = len(phrase)
+    return any(tokens[start:start + width] == phrase for start in range(len(tokens) - width + 1))
+
+class _VersionIndex:
+    """Postings and verse id allocation for one Bible version"""
+    
+    def __init__(self):
+        self.postings: Dict[str, array] = {}
+        self.chapters: Dict[str, Any] = {}  # chapter_key -> cached chapter
+        self.bases: Dict[str, int] = {}  # chapter_key -> first verse id
+        # Sorted first verse ids and their chapter keys, for verse id lookup
+        self.block_starts: List[int] = []
+        self.block_keys: List[str] = []
+        self.next_id = 0
+        self.verse_total = 0
+        self.posting_total = 0
+    
+    @property
+    def nbytes(self) -> int:
+        return self.posting_total * POSTING_BYTES + len(self.postings) * TERM_BYTES
+    
+    def locate(self, verse_id: int) -> Tuple[str, int]:
+        """(chapter_key, verse index) of a verse id"""
+        block = bisect_right(self.block_starts, verse_id) - 1
+        chapter_key = self.block_keys[block]
+        return chapter_key, verse_id - self.bases[chapter_key]
+
+class VerseIndex:
+    """Inverted index of cached verses, partitioned by version"""
+    
+    def __init__(self):
+        self.versions: Dict[str, _VersionIndex] = {}
+    
+    def add(self, version_code: str, chapter_key: str, chapter):
+        """Index a chapter's verses (replacing any previous copy of the chapter)"""
+        index = self.versions.setdefault(version_code, _VersionIndex())
+        if chapter_key in index.chapters:
+            self.remove(version_code, chapter_key)
+        
+        base = index.next_id
+        verse_total = 0
+        posting_total = 0
+        for offset, (_, text) in enumerate(chapter.iter_verses()):
+            verse_id = base + offset
+            for token in tokenize(text):
+                postings = index.postings.get(token)
+                if postings is None:
+                    postings = index.postings[token] = array('I')
+                postings.append(verse_id)
+                posting_total += 1
+            verse_total += 1
+        
+        index.next_id = base + verse_total
+        index.verse_total += verse_total
+        index.posting_total += posting_total
+        index.chapters[chapter_key] = chapter
+        index.bases[chapter_key] = base
+        index.block_starts.append(base)
+        index.block_keys.append(chapter_key)
+    
+    def remove(self, version_code: str, chapter_key: str):
+        """Drop a chapter's verses from the index"""
+        index = self.versions.get(version_code)
+        if index is None or chapter_key not in index.chapters:
+            return
+        
+        chapter = index.chapters.pop(chapter_key)
+        base = index.bases.pop(chapter_key)
+        texts = [text for _, text in chapter.iter_verses()]
+        end = base + len(texts)
+        
+        for token in {token for text in texts for token in tokenize(text)}:
+            postings = index.postings.get(token)
+            if postings is None:
+                continue
+            # The chapter's ids are one contiguous run in each sorted postings array
+            start = bisect_left(postings, base)
+            stop = bisect_left(postings, end)
+            index.posting_total -= stop - start
+            del postings[start:stop]
+            if not postings:
+                del index.postings[token]
+        
+        block = bisect_left(index.block_starts, base)
+        del index.block_starts[block]
+        del index.block_keys[block]
+        index.verse_total -= len(texts)
+    
+    def search(self, query: str, version_code: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Ranked verse search over the indexed chapters of a version
+        
+        Candidates come from the rarest term's postings and are probed against
+        the other terms by bisect; only the top `limit` scores are kept, and
+        phrase checks run best-first until `limit` results are confirmed.
+        """
+        index = self.versions.get(version_code)
+        terms, phrases = parse_query(query)
+        if index is None or not terms or limit <= 0:
+            return []
+        
+        term_postings = []
+        for term in terms:
+            postings = index.postings.get(term)
+            if postings is None:
+                return []
+            term_postings.append((term, postings))
+        term_postings.sort(key=lambda item: len(item[1]))
+        
+        weights = [math.log(1 + index.verse_total / len(postings)) for _, postings in term_postings]
+        rarest = term_postings[0][1]
+        probes = [(postings, weight) for (_, postings), weight in zip(term_postings[1:], weights[1:])]
+        
+        def scored() -> Iterable[Tuple[float, int]]:
+            # Counter tallies the rarest term's occurrences per verse in C
+            for verse_id, frequency in Counter(rarest).items():
+                score = self._term_score(frequency, weights[0])
+                for postings, weight in probes:
+                    start = bisect_left(postings, verse_id)
+                    frequency = bisect_right(postings, verse_id, start) - start
+                    if not frequency:
+                        break
+                    score += self._term_score(frequency, weight)
+                else:
+                    yield score, verse_id
+        
+        if not probes and not phrases:
+            # One term: the score only grows with its frequency, so the most
+            # frequent verses are the best ones (ties stay in canonical order)
+            candidates = [(self._term_score(frequency, weights[0]), verse_id)
+                          for verse_id, frequency in Counter(rarest).most_common(limit)]
+        elif phrases:
+            # Rank every candidate, then verify phrases best-first and stop at the limit
+            candidates = sorted(scored(), key=lambda item: (-item[0], item[1]))
+        else:
+            candidates = heapq.nsmallest(limit, scored(), key=lambda item: (-item[0], item[1]))
+        
+        results = []
+        for score, verse_id in candidates:
+            chapter_key, verse_index = index.locate(verse_id)
+            chapter = index.chapters[chapter_key]
+            number, text = chapter.verse_at(verse_index)
+            
+            if phrases:
+                tokens = tokenize(text)
+                if not all(_contains_phrase(tokens, phrase) for phrase in phrases):
+                    continue
+            
+            results.append({
+                'reference': f"{chapter.book_name} {chapter.chapter_number}:{number}",
+                'book': chapter.book_name,
+                'chapter': chapter.chapter_number,
+                'verse': number,
+                'text': text,
+                'version': version_code,
+                'score': round(score, 3),
+                'from_cache': True
+            })
+            if len(results) >= limit:
+                break
+        
+        return results
+    
+    @staticmethod
+    def _term_score(frequency: int, weight: float) -> float:
+        return weight * frequency * (TF_SATURATION + 1) / (frequency + TF_SATURATION)
+    
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the postings of every version"""
+        return sum(index.nbytes for index in self.versions.values())
+    
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            version_code: {
+                'chapters': len(index.chapters),
+                'verses': index.verse_total,
+                'terms': len(index.postings),
+                'approx_bytes': index.nbytes
+            }
+            for version_code, index in self.versions.items()
+        }
@@ -9,14 +9,275 @@ implementing the "cache-first, API-fallback" pattern for personal use compliance
 import asyncio
 import json
 import logging
-from typing import Dict, List, Optional, Any
+import os
+import sys
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Any, Tuple, Union
 from datetime import datetime
 
 from .bible_storage_service import BibleStorageService, BibleChapter
+from .bible_search_index import VerseIndex
 from .nlt_api_service import NLTApiService
 
 logger = logging.getLogger(__name__)
 
+PREVIEW_LENGTH = 40
+
+# Where cached-only search looks: every stored verse (Postgres full-text index)
+# or only the chapters resident in this process (in-memory verse index)
+CACHED_SEARCH_SOURCES = ('database', 'session')
+
+class CompactChapter:
+    """
+    Memory-compact, read-only form of a BibleChapter for the session cache.
+    Verse texts live in one contiguous string sliced by an array of offsets,
+    verse numbers in an array, and previews are only built when the verses are
+    serialized. raw_html is not kept (it stays in the database).
+    """
+    
+    __slots__ = ('book_name', 'book_abbrev', 'chapter_number', 'version_code',
+                 'verse_count', 'api_reference', 'api_url', '_text', '_offsets', '_numbers')
+    
+    def __init__(self, chapter: BibleChapter):
+        self.book_name = chapter.book_name
+        self.book_abbrev = chapter.book_abbrev
+        self.chapter_number = chapter.chapter_number
+        self.version_code = chapter.version_code
+        self.verse_count = chapter.verse_count
+        self.api_reference = chapter.api_reference
+        self.api_url = chapter.api_url
+        
+        texts = [verse.get('text', '') for verse in chapter.verses]
+        self._text = ''.join(texts)
+        # _offsets[i]:_offsets[i + 1] is verse i
+        self._offsets = array('I', [0])
+        for text in texts:
+            self._offsets.append(self._offsets[-1] + len(text))
+        self._numbers = array('I', (int(verse.get('number', index + 1)) for index, verse in enumerate(chapter.verses)))
+        
+    @property
+    def raw_html(self) -> None:
+        return None
+        
+    def verse_at(self, index: int) -> Tuple[int, str]:
+        """(number, text) of the verse at a position in the chapter"""
+        return self._numbers[index], self._text[self._offsets[index]:self._offsets[index + 1]]
+        
+    def iter_verses(self) -> Iterator[Tuple[int, str]]:
+        """(number, text) pairs without building verse dicts"""
+        offsets = self._offsets
+        for index, number in enumerate(self._numbers):
+            yield number, self._text[offsets[index]:offsets[index + 1]]
+            
+    @property
+    def verses(self) -> List[Dict[str, Any]]:
+        """Verse dicts in the BibleChapter format (number, text, preview)"""
+        return [
+            {
+                'number': number,
+                'text': text,
+                'preview': text[:PREVIEW_LENGTH] + '...' if len(text) > PREVIEW_LENGTH else text
+            }
+            for number, text in self.iter_verses()
+        ]
+        
+    def __sizeof__(self) -> int:
+        size = object.__sizeof__(self)
+        for name in ('book_name', 'book_abbrev', 'version_code', 'api_reference', 'api_url', '_text', '_offsets', '_numbers'):
+            size += sys.getsizeof(getattr(self, name))
+        return size
+
+def estimate_chapter_bytes(chapter: BibleChapter) -> int:
+    """Approximate memory held by a cached chapter (verse dicts and strings)"""
+    if isinstance(chapter, CompactChapter):
+        return sys.getsizeof(chapter)
+    
+    size = sys.getsizeof(chapter) + sys.getsizeof(chapter.verses)
+    for verse in chapter.verses:
+        size += sys.getsizeof(verse)
+        for value in verse.values():
+            size += sys.getsizeof(value)
+    if chapter.raw_html:
+        size += sys.getsizeof(chapter.raw_html)
+    return size
+
+class ChapterCache:
+    """
+    Size-bounded LRU cache of Bible chapters, partitioned by version.
+    Bounded by entry count and approximate bytes across all versions; the least
+    recently used unpinned chapter of any version is evicted first. Pinned
+    chapters are never evicted (but still count toward the bounds). Chapters
+    are held as CompactChapter. When given a VerseIndex, the cache keeps it in
+    step with the resident chapters and its postings count toward max_bytes.
+    """
+    
+    def __init__(self, max_entries: int = 2000, max_bytes: int = 64 * 1024 * 1024,
+                 index: Optional[VerseIndex] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.index = index
+        # {version: OrderedDict{chapter_key: (last_used_tick, size, chapter)}} in LRU order
+        self.partitions: Dict[str, OrderedDict] = {}
+        self.pinned: Dict[str, Dict[str, Tuple[int, CompactChapter]]] = {}
+        self.total_entries = 0
+        self.total_bytes = 0
+        self._tick = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+    def get(self, version_code: str, chapter_key: str) -> Optional[CompactChapter]:
+        """Look up a chapter, counting a hit or miss and marking it recently used"""
+        pinned = self.pinned.get(version_code, {}).get(chapter_key)
+        if pinned is not None:
+            self.hits += 1
+            return pinned[1]
+        
+        partition = self.partitions.get(version_code)
+        entry = partition.get(chapter_key) if partition else None
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        self._tick += 1
+        partition[chapter_key] = (self._tick, entry[1], entry[2])
+        partition.move_to_end(chapter_key)
+        return entry[2]
+        
+    def put(self, version_code: str, chapter_key: str, chapter: Union[BibleChapter, CompactChapter]):
+        """Add or replace a chapter (keeping its pin), evicting least recently used chapters to stay in bounds"""
+        self._put(version_code, chapter_key, chapter, pinned=self.is_pinned(version_code, chapter_key))
+        
+    def _put(self, version_code: str, chapter_key: str, chapter: Union[BibleChapter, CompactChapter], pinned: bool):
+        self.remove(version_code, chapter_key)
+        if not isinstance(chapter, CompactChapter):
+            chapter = CompactChapter(chapter)
+        size = estimate_chapter_bytes(chapter)
+        
+        if pinned:
+            self.pinned.setdefault(version_code, {})[chapter_key] = (size, chapter)
+        else:
+            self._tick += 1
+            self.partitions.setdefault(version_code, OrderedDict())[chapter_key] = (self._tick, size, chapter)
+        self.total_entries += 1
+        self.total_bytes += size
+        if self.index is not None:
+            self.index.add(version_code, chapter_key, chapter)
+        self._evict()
+        
+    def remove(self, version_code: str, chapter_key: str):
+        """Drop a chapter (and its pin) from the cache"""
+        partition = self.partitions.get(version_code)
+        if partition and chapter_key in partition:
+            _, size, _ = partition.pop(chapter_key)
+            self.total_entries -= 1
+            self.total_bytes -= size
+            self._unindex(version_code, chapter_key)
+        
+        pinned = self.pinned.get(version_code, {})
+        if chapter_key in pinned:
+            size, _ = pinned.pop(chapter_key)
+            self.total_entries -= 1
+            self.total_bytes -= size
+            self._unindex(version_code, chapter_key)
+        
+    def pin(self, version_code: str, chapter_key: str,
+            chapter: Optional[Union[BibleChapter, CompactChapter]] = None) -> bool:
+        """
+        Keep a hot chapter resident; it is never evicted until unpinned.
+        Only resident (or given) chapters can be pinned; returns whether it is pinned.
+        """
+        if self.is_pinned(version_code, chapter_key):
+            if chapter is not None:
+                self._put(version_code, chapter_key, chapter, pinned=True)
+            return True
+        
+        partition = self.partitions.get(version_code)
+        if chapter is None and partition and chapter_key in partition:
+            chapter = partition[chapter_key][2]
+        if chapter is None:
+            return False
+        
+        self._put(version_code, chapter_key, chapter, pinned=True)
+        return True
+        
+    def unpin(self, version_code: str, chapter_key: str):
+        """Make a pinned chapter evictable again (it stays cached as most recently used)"""
+        pinned = self.pinned.get(version_code, {}).get(chapter_key)
+        if pinned is not None:
+            self._put(version_code, chapter_key, pinned[1], pinned=False)
+        
+    def is_pinned(self, version_code: str, chapter_key: str) -> bool:
+        return chapter_key in self.pinned.get(version_code, {})
+        
+    def contains(self, version_code: str, chapter_key: str) -> bool:
+        """Membership test that does not affect LRU order or hit counters"""
+        return self.is_pinned(version_code, chapter_key) or chapter_key in self.partitions.get(version_code, {})
+        
+    def items(self, version_code: str) -> Iterator[Tuple[str, CompactChapter]]:
+        """Resident chapters of a version, without affecting LRU order"""
+        for chapter_key, (_, chapter) in list(self.pinned.get(version_code, {}).items()):
+            yield chapter_key, chapter
+        for chapter_key, (_, _, chapter) in list(self.partitions.get(version_code, {}).items()):
+            yield chapter_key, chapter
+        
+    def versions(self) -> List[str]:
+        return sorted(set(self.partitions) | set(self.pinned))
+        
+    def _evict(self):
+        """Evict least recently used unpinned chapters (across versions) until within bounds"""
+        while self.total_entries > self.max_entries or self.resident_bytes() > self.max_bytes:
+            oldest_version = None
+            oldest_tick = None
+            for version_code, partition in self.partitions.items():
+                if partition:
+                    tick = next(iter(partition.values()))[0]
+                    if oldest_tick is None or tick < oldest_tick:
+                        oldest_version, oldest_tick = version_code, tick
+            
+            if oldest_version is None:
+                # Only pinned chapters left
+                break
+            
+            chapter_key, (_, size, _) = self.partitions[oldest_version].popitem(last=False)
+            self.total_entries -= 1
+            self.total_bytes -= size
+            self.evictions += 1
+            self._unindex(oldest_version, chapter_key)
+            logger.debug(f"🗑️ Evicted {chapter_key} ({oldest_version}) from session cache")
+        
+    def resident_bytes(self) -> int:
+        """Approximate bytes of the cached chapters plus their search index postings"""
+        return self.total_bytes + (self.index.nbytes if self.index is not None else 0)
+        
+    def _unindex(self, version_code: str, chapter_key: str):
+        if self.index is not None:
+            self.index.remove(version_code, chapter_key)
+        
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        versions = {}
+        for version_code in self.versions():
+            pinned = len(self.pinned.get(version_code, {}))
+            versions[version_code] = {
+                'chapters': len(self.partitions.get(version_code, {})) + pinned,
+                'pinned': pinned
+            }
+        return {
+            'entries': self.total_entries,
+            'max_entries': self.max_entries,
+            'approx_bytes': self.resident_bytes(),
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+            'evictions': self.evictions,
+            'versions': versions,
+            'search_index': self.index.stats() if self.index is not None else None
+        }
+
 class BibleSessionService:
     """
     Session-based Bible content management with database integration.
@@ -26,7 +287,16 @@ class BibleSessionService:
     def __init__(self, storage_service: BibleStorageService, nlt_service: NLTApiService):
         self.storage = storage_service
         self.nlt_api = nlt_service
-        self.session_cache = {}  # Format: {version: {book.chapter: BibleChapter}}
+        self.session_cache = ChapterCache(
+            max_entries=int(os.getenv('BIBLE_CACHE_MAX_CHAPTERS', '2000')),
+            max_bytes=int(os.getenv('BIBLE_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+            index=VerseIndex()
+        )
+        self.stored_chapters: Dict[str, set] = {}  # Keys of chapters stored in the database, by version
+        self.cached_search_source = os.getenv('BIBLE_CACHED_SEARCH_SOURCE', 'database').lower()
+        if self.cached_search_source not in CACHED_SEARCH_SOURCES:
+            logger.warning(f"Unknown BIBLE_CACHED_SEARCH_SOURCE '{self.cached_search_source}', using database")
+            self.cached_search_source = 'database'
         self.books_metadata = []
         self.license_mode = 'personal'  # 'personal' | 'commercial'
         
@@ -43,15 +313,14 @@ class BibleSessionService:
                 self.books_metadata = await self.storage.get_books_metadata()
                 logger.info(f"📚 Loaded metadata for {len(self.books_metadata)} books")
             
-            # Load all cached chapters for this version
-            cached_chapters = await self.storage.get_all_cached_chapters(version_code)
+            # Track every stored chapter, but only warm the cache with the most
+            # read ones (evicted chapters are reloaded from the database on demand)
+            self.stored_chapters[version_code] = await self.storage.get_cached_chapter_keys(version_code)
+            warm_chapters = await self.storage.get_all_cached_chapters(version_code, limit=self.session_cache.max_entries)
             
-            # Initialize version cache if not exists
-            if version_code not in self.session_cache:
-                self.session_cache[version_code] = {}
-                
-            # Load cached chapters into session
-            self.session_cache[version_code].update(cached_chapters)
+            for chapter_key, chapter in warm_chapters.items():
+                self.session_cache.put(version_code, chapter_key, chapter)
+            cached_chapters = self.stored_chapters[version_code]
             
             # Identify missing chapters for progressive loading
             missing_chapters = self._identify_missing_chapters(version_code)
@@ -78,12 +347,20 @@ class BibleSessionService:
         chapter_key = f"{book_name}.{chapter_number}"
         
         # 1. Check session cache first (instant response)
-        if version_code in self.session_cache and chapter_key in self.session_cache[version_code]:
-            chapter = self.session_cache[version_code][chapter_key]
+        chapter = self.session_cache.get(version_code, chapter_key)
+        if chapter:
             logger.info(f"📖 Cache hit: {chapter_key} ({version_code})")
             return self._format_chapter_response(chapter, from_cache=True)
             
-        # 2. Chapter not in session cache - try API with storage
+        # 2. Stored in the database but evicted from (or never loaded into) the session cache
+        if chapter_key in self.stored_chapters.get(version_code, ()):
+            chapter = await self.storage.get_chapter(book_name, chapter_number, version_code)
+            if chapter:
+                logger.info(f"📖 Database hit: {chapter_key} ({version_code})")
+                self.session_cache.put(version_code, chapter_key, chapter)
+                return self._format_chapter_response(chapter, from_cache=True)
+            
+        # 3. Chapter not stored - try API with storage
         logger.info(f"📡 Cache miss: {chapter_key} ({version_code}) - fetching from API")
         
         try:
@@ -113,9 +390,8 @@ class BibleSessionService:
                 stored = await self.storage.store_chapter(bible_chapter)
                 if stored:
                     # Add to session cache
-                    if version_code not in self.session_cache:
-                        self.session_cache[version_code] = {}
-                    self.session_cache[version_code][chapter_key] = bible_chapter
+                    self.stored_chapters.setdefault(version_code, set()).add(chapter_key)
+                    self.session_cache.put(version_code, chapter_key, bible_chapter)
                     
                     logger.info(f"✅ Stored and cached: {chapter_key} ({bible_chapter.verse_count} verses)")
                     return self._format_chapter_response(bible_chapter, from_cache=False, stored=True)
@@ -132,16 +408,19 @@ class BibleSessionService:
             logger.error(f"❌ Failed to fetch {chapter_key}: {e}")
             return self._format_error_response(f"Failed to load chapter: {str(e)}")
             
-    async def search_bible(self, query: str, version_code: str = 'NLT', search_cached_only: bool = False) -> Dict[str, Any]:
+    async def search_bible(self, query: str, version_code: str = 'NLT', search_cached_only: bool = False,
+                           source: Optional[str] = None) -> Dict[str, Any]:
         """
         Search Bible content with option to search cached content only.
+        Cached searches use `source` ('database' or 'session', defaults to
+        BIBLE_CACHED_SEARCH_SOURCE).
         """
         try:
             results = []
             
             if search_cached_only:
                 # Search only cached chapters (instant, no API calls)
-                results = await self._search_cached_content(query, version_code)
+                results = await self._search_cached_content(query, version_code, source=source)
                 logger.info(f"🔍 Cached search for '{query}': {len(results)} results")
             else:
                 # Use API search (may trigger compliance limits)
@@ -152,7 +431,7 @@ class BibleSessionService:
                     logger.info(f"🔍 API search for '{query}': {len(results)} results")
                 else:
                     # Fall back to cached search if over limit
-                    results = await self._search_cached_content(query, version_code)
+                    results = await self._search_cached_content(query, version_code, source=source)
                     logger.info(f"🔍 Compliance fallback search for '{query}': {len(results)} results")
                     
             return {
@@ -234,12 +513,8 @@ class BibleSessionService:
             stats = await self.storage.get_usage_statistics()
             
             # Add session cache info
-            cache_stats = {}
-            for version, chapters in self.session_cache.items():
-                cache_stats[version] = len(chapters)
-                
-            stats['session_cache'] = cache_stats
-            stats['total_cached_versions'] = len(self.session_cache)
+            stats['session_cache'] = self.session_cache.stats()
+            stats['total_cached_versions'] = len(self.session_cache.versions())
             
             return {
                 'success': True,
@@ -253,12 +528,40 @@ class BibleSessionService:
                 'error': str(e)
             }
             
+    async def pin_chapter(self, book_name: str, chapter_number: int, version_code: str = 'NLT') -> bool:
+        """
+        Keep a hot chapter resident in the session cache (loading it if stored).
+        Returns False if the chapter is neither cached nor stored yet.
+        
+        Raises:
+            ValueError: If the book or chapter number does not exist
+        """
+        if not self.books_metadata:
+            self.books_metadata = await self.storage.get_books_metadata()
+        book = next((book for book in self.books_metadata if book['book_name'] == book_name), None)
+        if book is None or not 1 <= chapter_number <= book['total_chapters']:
+            raise ValueError(f"Unknown chapter: {book_name} {chapter_number}")
+        
+        chapter_key = f"{book_name}.{chapter_number}"
+        chapter = None
+        if not self.session_cache.contains(version_code, chapter_key) and chapter_key in self.stored_chapters.get(version_code, ()):
+            chapter = await self.storage.get_chapter(book_name, chapter_number, version_code)
+        
+        pinned = self.session_cache.pin(version_code, chapter_key, chapter)
+        if pinned:
+            logger.info(f"📌 Pinned {chapter_key} ({version_code})")
+        return pinned
+        
+    def unpin_chapter(self, book_name: str, chapter_number: int, version_code: str = 'NLT'):
+        """Allow a pinned chapter to be evicted again"""
+        self.session_cache.unpin(version_code, f"{book_name}.{chapter_number}")
+        
     # Private helper methods
     
     def _identify_missing_chapters(self, version_code: str) -> List[str]:
         """Identify chapters not yet cached for a version"""
         missing = []
-        cached_keys = set(self.session_cache.get(version_code, {}).keys())
+        cached_keys = self.stored_chapters.get(version_code, set())
         
         for book in self.books_metadata:
             for chapter_num in range(1, book['total_chapters'] + 1):
@@ -298,7 +601,7 @@ class BibleSessionService:
             api_url=api_data.get('api_url')
         )
         
-    def _format_chapter_response(self, chapter: BibleChapter, from_cache: bool = True, 
+    def _format_chapter_response(self, chapter: Union[BibleChapter, CompactChapter], from_cache: bool = True, 
                                 stored: bool = None, compliance_warning: str = None) -> Dict[str, Any]:
         """Format chapter data for frontend consumption"""
         return {
@@ -324,27 +627,22 @@ class BibleSessionService:
             'verse_count': 0
         }
         
-    async def _search_cached_content(self, query: str, version_code: str) -> List[Dict[str, Any]]:
-        """Search within cached chapters only"""
-        results = []
-        query_lower = query.lower()
-        
-        cached_chapters = self.session_cache.get(version_code, {})
-        
-        for chapter_key, chapter in cached_chapters.items():
-            for verse in chapter.verses:
-                if query_lower in verse.get('text', '').lower():
-                    results.append({
-                        'reference': f"{chapter.book_name} {chapter.chapter_number}:{verse.get('number', 1)}",
-                        'book': chapter.book_name,
-                        'chapter': chapter.chapter_number,
-                        'verse': verse.get('number', 1),
-                        'text': verse.get('text', ''),
-                        'version': version_code,
-                        'from_cache': True
-                    })
-                    
-        return results[:50]  # Limit results
+    async def _search_cached_content(self, query: str, version_code: str, limit: int = 50,
+                                     source: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Search within cached chapters only, best matches first. The database source
+        covers every stored chapter, even before the session is initialized; the
+        session source (and the fallback when the database search is unavailable)
+        uses the in-memory verse index of the resident chapters.
+        """
+        source = source or self.cached_search_source
+        if source == 'database' and self.storage.verse_search_available:
+            try:
+                return await self.storage.search_verses(query, version_code, limit)
+            except Exception as e:
+                logger.warning(f"⚠️ Database verse search failed, using session index: {e}")
+                
+        return self.session_cache.index.search(query, version_code, limit)
         
     def _format_search_results(self, api_results: List[Dict]) -> List[Dict[str, Any]]:
         """Format API search results"""
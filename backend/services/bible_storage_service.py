@@ -18,6 +18,18 @@ from dataclasses import dataclass
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Explode a chapter's verses JSON into bible_cache.verses rows (full-text
+# indexed through the generated search_vector column). Also run as the backfill
+# in migrate_bible_database.py.
+INDEX_CHAPTER_VERSES_SQL = """
+    INSERT INTO bible_cache.verses (chapter_id, verse_index, verse_number, text)
+    SELECT c.id, v.verse_index, COALESCE((v.verse->>'number')::int, v.verse_index), v.verse->>'text'
+    FROM bible_cache.chapters c
+    CROSS JOIN LATERAL jsonb_array_elements(c.verses) WITH ORDINALITY AS v(verse, verse_index)
+    WHERE c.id = $1 AND coalesce(v.verse->>'text', '') <> ''
+    ON CONFLICT (chapter_id, verse_index) DO NOTHING
+"""
+
 @dataclass
 class BibleChapter:
     """Data class for Bible chapter content"""
@@ -51,11 +63,22 @@ class BibleStorageService:
         self.db_config = db_config
         self.connection_pool = None
         self.license_mode = 'personal_use'
+        self.verse_search_available = False
         
     async def initialize(self):
         """Initialize the database connection pool"""
         try:
             self.connection_pool = await asyncpg.create_pool(**self.db_config)
+            
+            # The verse search table comes from migrate_bible_database.py; older
+            # databases without it keep working without database search
+            async with self.connection_pool.acquire() as connection:
+                self.verse_search_available = await connection.fetchval(
+                    "SELECT to_regclass('bible_cache.verses') IS NOT NULL"
+                )
+            if not self.verse_search_available:
+                logger.warning("⚠️ bible_cache.verses not found - run migrate_bible_database.py to enable database verse search")
+            
             logger.info("✅ Bible storage service initialized")
         except Exception as e:
             logger.error(f"❌ Failed to initialize Bible storage service: {e}")
@@ -154,14 +177,19 @@ class BibleStorageService:
                     # Store new chapter
                     verses_json = json.dumps(chapter.verses)
                     
-                    await connection.execute("""
+                    chapter_id = await connection.fetchval("""
                         INSERT INTO bible_cache.chapters 
                         (version_id, book_id, chapter_number, api_reference, api_url, 
                          raw_html, verses, verse_count)
                         VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+                        RETURNING id
                     """, version_id, book_id, chapter.chapter_number, chapter.api_reference,
                     chapter.api_url, chapter.raw_html, verses_json, chapter.verse_count)
                     
+                    # Index the verses for database search
+                    if self.verse_search_available:
+                        await connection.execute(INDEX_CHAPTER_VERSES_SQL, chapter_id)
+                    
                     # Update compliance summary
                     await self._update_compliance_summary(connection, chapter.verse_count)
                     
@@ -221,10 +249,11 @@ class BibleStorageService:
                 logger.error(f"❌ Failed to retrieve chapter: {e}")
                 return None
                 
-    async def get_all_cached_chapters(self, version_code: str) -> Dict[str, BibleChapter]:
+    async def get_all_cached_chapters(self, version_code: str, limit: Optional[int] = None) -> Dict[str, BibleChapter]:
         """
         Load all cached chapters for a version into session cache format.
         Returns dict with keys like 'Genesis.1', 'Exodus.2', etc.
+        With a limit, only the most frequently read chapters are loaded.
         """
         async with self.connection_pool.acquire() as connection:
             try:
@@ -235,8 +264,9 @@ class BibleStorageService:
                     JOIN bible_cache.books b ON c.book_id = b.id
                     JOIN bible_cache.versions v ON c.version_id = v.id
                     WHERE v.code = $1
-                    ORDER BY b.book_number, c.chapter_number
-                """, version_code)
+                    ORDER BY c.accessed_count DESC, b.book_number, c.chapter_number
+                    LIMIT $2
+                """, version_code, limit)
                 
                 cached_chapters = {}
                 for row in rows:
@@ -260,6 +290,61 @@ class BibleStorageService:
                 logger.error(f"❌ Failed to load cached chapters: {e}")
                 return {}
                 
+    async def get_cached_chapter_keys(self, version_code: str) -> set:
+        """Keys ('Genesis.1', ...) of every chapter stored for a version, without verse content"""
+        async with self.connection_pool.acquire() as connection:
+            try:
+                rows = await connection.fetch("""
+                    SELECT b.book_name, c.chapter_number
+                    FROM bible_cache.chapters c
+                    JOIN bible_cache.books b ON c.book_id = b.id
+                    JOIN bible_cache.versions v ON c.version_id = v.id
+                    WHERE v.code = $1
+                """, version_code)
+                return {f"{row['book_name']}.{row['chapter_number']}" for row in rows}
+                
+            except Exception as e:
+                logger.error(f"❌ Failed to load cached chapter keys: {e}")
+                return set()
+                
+    async def search_verses(self, query: str, version_code: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Ranked full-text search over every stored verse of a version (GIN index on
+        bible_cache.verses). Accepts web-search syntax: words are ANDed, "quoted
+        phrases" match in order, OR and -word are supported.
+        """
+        if not self.verse_search_available:
+            raise RuntimeError("Database verse search is not available (bible_cache.verses is missing)")
+        
+        async with self.connection_pool.acquire() as connection:
+            rows = await connection.fetch("""
+                WITH q AS (SELECT websearch_to_tsquery('english', $1) AS query)
+                SELECT b.book_name, b.book_number, c.chapter_number, vs.verse_number, vs.text,
+                       ts_rank(vs.search_vector, q.query) AS rank
+                FROM q
+                JOIN bible_cache.verses vs ON vs.search_vector @@ q.query
+                JOIN bible_cache.chapters c ON vs.chapter_id = c.id
+                JOIN bible_cache.versions v ON c.version_id = v.id
+                JOIN bible_cache.books b ON c.book_id = b.id
+                WHERE v.code = $2
+                ORDER BY rank DESC, b.book_number, c.chapter_number, vs.verse_index
+                LIMIT $3
+            """, query, version_code, limit)
+            
+            return [
+                {
+                    'reference': f"{row['book_name']} {row['chapter_number']}:{row['verse_number']}",
+                    'book': row['book_name'],
+                    'chapter': row['chapter_number'],
+                    'verse': row['verse_number'],
+                    'text': row['text'],
+                    'version': version_code,
+                    'score': round(row['rank'], 3),
+                    'from_cache': True
+                }
+                for row in rows
+            ]
+            
     async def get_books_metadata(self) -> List[Dict[str, Any]]:
         """Get all books metadata for navigation"""
         async with self.connection_pool.acquire() as connection:
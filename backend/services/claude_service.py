@@ -9,8 +9,9 @@ import json
 import logging
 import asyncio
 import httpx
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
+from .http_client import create_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -23,15 +24,46 @@ class TheologicalAnalysis:
 class ClaudeService:
     """Service for sermon generation using Claude API"""
     
-    def __init__(self, api_key: str = None, base_url: str = "https://api.anthropic.com"):
+    def __init__(self, api_key: str = None, base_url: str = None,
+                 http_client: Optional[httpx.AsyncClient] = None):
         self.api_key = api_key or os.getenv('CLAUDE_API_KEY')
-        self.base_url = base_url
+        self.base_url = base_url or os.getenv('CLAUDE_BASE_URL', 'https://api.anthropic.com')
         self.model = "claude-3-7-sonnet-20250219"  # Claude Sonnet 3.7
         self.timeout = 60.0  # Standard timeout for Claude API
         self.max_retries = 3
         
         if not self.api_key:
             logger.warning("Claude API key not found. Set CLAUDE_API_KEY environment variable.")
+        
+        # Shared keep-alive client, created on first use or by start()
+        self._client = http_client
+        
+        # Static analysis prefix (tools + system prompt), built once per process.
+        # Not marked for prompt caching: it is well under the model's minimum
+        # cacheable prefix (1024 tokens), so the API would never cache it
+        self._analysis_tools = [self._create_function_schema()]
+        self._analysis_system = [
+            {
+                "type": "text",
+                "text": self._create_system_prompt()
+            }
+        ]
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared pooled HTTP client, creating it if needed"""
+        if self._client is None or self._client.is_closed:
+            self._client = create_http_client("Claude", self.timeout)
+        return self._client
+    
+    async def start(self):
+        """Open the shared HTTP client (called from app startup)"""
+        self._get_client()
+    
+    async def close(self):
+        """Close the shared HTTP client and its pooled connections (called from app shutdown)"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
     
     async def generate_sermon(self, prompt: str) -> str:
         """
@@ -69,77 +101,111 @@ class ClaudeService:
         logger.info(f"Generating sermon with Claude API...")
         logger.debug(f"Prompt length: {len(prompt)} characters")
         
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            for attempt in range(self.max_retries):
-                try:
-                    response = await client.post(
-                        f"{self.base_url}/v1/messages",
-                        headers=headers,
-                        json=payload
-                    )
-                    
-                    if response.status_code == 200:
-                        result = response.json()
-                        
-                        if 'content' in result and len(result['content']) > 0:
-                            sermon_text = result['content'][0]['text']
-                            logger.info(f"Successfully generated sermon: {len(sermon_text)} characters")
-                            return sermon_text
-                        else:
-                            logger.error(f"No content in Claude response: {result}")
-                            raise ValueError("No sermon content generated")
+        client = self._get_client()
+        for attempt in range(self.max_retries):
+            try:
+                response = await client.post(
+                    f"{self.base_url}/v1/messages",
+                    timeout=self.timeout,
+                    headers=headers,
+                    json=payload
+                )
+                
+                if response.status_code == 200:
+                    result = response.json()
                     
+                    if 'content' in result and len(result['content']) > 0:
+                        sermon_text = result['content'][0]['text']
+                        logger.info(f"Successfully generated sermon: {len(sermon_text)} characters")
+                        return sermon_text
                     else:
-                        error_text = response.text
-                        logger.error(f"Claude API error: {response.status_code} - {error_text}")
-                        if attempt == self.max_retries - 1:
-                            raise ValueError(f"Claude API failed after {self.max_retries} attempts: {error_text}")
-                        
-                        await asyncio.sleep(2 ** attempt)  # Exponential backoff
-                        
-                except httpx.TimeoutException:
-                    logger.error(f"Claude API timeout on attempt {attempt + 1}")
-                    if attempt == self.max_retries - 1:
-                        raise ValueError("Claude API timed out")
-                    await asyncio.sleep(2 ** attempt)
+                        logger.error(f"No content in Claude response: {result}")
+                        raise ValueError("No sermon content generated")
                     
-                except Exception as e:
-                    logger.error(f"Unexpected error calling Claude API: {e}")
+                else:
+                    error_text = response.text
+                    logger.error(f"Claude API error: {response.status_code} - {error_text}")
                     if attempt == self.max_retries - 1:
-                        raise ValueError(f"Claude API error: {str(e)}")
-                    await asyncio.sleep(2 ** attempt)
+                        raise ValueError(f"Claude API failed after {self.max_retries} attempts: {error_text}")
+                        
+                    await asyncio.sleep(2 ** attempt)  # Exponential backoff
+                    
+            except httpx.TimeoutException:
+                logger.error(f"Claude API timeout on attempt {attempt + 1}")
+                if attempt == self.max_retries - 1:
+                    raise ValueError("Claude API timed out")
+                await asyncio.sleep(2 ** attempt)
+                
+            except Exception as e:
+                logger.error(f"Unexpected error calling Claude API: {e}")
+                if attempt == self.max_retries - 1:
+                    raise ValueError(f"Claude API error: {str(e)}")
+                await asyncio.sleep(2 ** attempt)
 
-    async def health_check(self) -> bool:
-        """Check if Claude API is available"""
-        if not self.api_key:
-            return False
+    async def stream_sermon(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Stream a sermon from the Claude API as text chunks arrive
         
-        try:
-            # Simple test request
-            payload = {
-                "model": self.model,
-                "max_tokens": 10,
-                "messages": [{"role": "user", "content": "Hello"}]
-            }
+        Args:
+            prompt: The complete sermon generation prompt
             
-            headers = {
-                "x-api-key": self.api_key,
-                "Content-Type": "application/json",
-                "anthropic-version": "2023-06-01"
-            }
+        Yields:
+            Text deltas in generation order
+        """
+        if not self.api_key:
+            raise ValueError("Claude API key is required for sermon generation")
+        
+        headers = {
+            "x-api-key": self.api_key,
+            "Content-Type": "application/json",
+            "anthropic-version": "2023-06-01"
+        }
+        
+        payload = {
+            "model": self.model,
+            "max_tokens": 8000,
+            "temperature": 0.7,
+            "stream": True,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+        }
+        
+        logger.info(f"Streaming sermon with Claude API...")
+        
+        # The read timeout applies between chunks, not to the whole sermon
+        client = self._get_client()
+        async with client.stream(
+            "POST",
+            f"{self.base_url}/v1/messages",
+            timeout=httpx.Timeout(self.timeout, connect=10.0),
+            headers=headers,
+            json=payload
+        ) as response:
+            if response.status_code != 200:
+                error_text = (await response.aread()).decode('utf-8', errors='replace')
+                raise ValueError(f"Claude API error: {response.status_code} - {error_text}")
             
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/v1/messages",
-                    json=payload,
-                    headers=headers
-                )
-                return response.status_code == 200
+            # Read to the end of the body after message_stop, so the connection goes back to the pool
+            done = False
+            async for line in response.aiter_lines():
+                if done or not line.startswith("data:"):
+                    continue
                 
-        except Exception as e:
-            logger.error(f"Claude health check failed: {e}")
-            return False
-    
+                event = json.loads(line[5:].strip())
+                event_type = event.get('type')
+                if event_type == 'content_block_delta':
+                    text = event.get('delta', {}).get('text')
+                    if text:
+                        yield text
+                elif event_type == 'message_stop':
+                    done = True
+                elif event_type == 'error':
+                    raise ValueError(f"Claude API stream error: {event.get('error', {}).get('message')}")
+
     def _create_function_schema(self) -> Dict[str, Any]:
         """Create function calling schema for structured theological analysis"""
         return {
@@ -201,6 +267,48 @@ Call the analyze_theological_content function with your analysis."""
         
         return "\n\n".join(prompt_parts)
     
+    def _api_headers(self) -> Dict[str, str]:
+        """Headers for Anthropic API requests"""
+        return {
+            "x-api-key": self.api_key,
+            "Content-Type": "application/json",
+            "anthropic-version": "2023-06-01"
+        }
+    
+    def _create_analysis_payload(self, content: str, title: str = None, category: str = None) -> Dict[str, Any]:
+        """Messages API request body for theological analysis (interactive or batch)"""
+        return {
+            "model": self.model,
+            "max_tokens": 2000,
+            "temperature": 0.7,
+            "tools": self._analysis_tools,
+            "system": self._analysis_system,
+            "messages": [
+                {"role": "user", "content": self._create_user_prompt(content, title, category)}
+            ]
+        }
+    
+    def _parse_analysis_message(self, result: Dict[str, Any]) -> TheologicalAnalysis:
+        """Extract the analyze_theological_content tool call from a Messages API response"""
+        # Extract function call result
+        if 'content' in result and len(result['content']) > 0:
+            for content_block in result['content']:
+                if content_block.get('type') == 'tool_use':
+                    logger.info(f"Tool use found: {json.dumps(content_block, indent=2)}")
+                    try:
+                        function_input = content_block.get('input', {})
+                        
+                        return TheologicalAnalysis(
+                            key_themes=function_input.get('key_themes', []),
+                            thought_questions=function_input.get('thought_questions', [])
+                        )
+                    except Exception as e:
+                        logger.error(f"Failed to parse function input: {e}")
+                        raise Exception(f"Invalid function input: {e}")
+            
+        # Fallback if no function call found
+        raise Exception("No function call result found in response")
+    
     async def analyze_content(self, content: str, title: str = None, category: str = None) -> TheologicalAnalysis:
         """
         Analyze theological content using Claude API with function calling
@@ -223,60 +331,30 @@ Call the analyze_theological_content function with your analysis."""
         
         try:
             # Prepare the API request (Claude format)
-            tools = [self._create_function_schema()]
-            
-            payload = {
-                "model": self.model,
-                "max_tokens": 2000,
-                "temperature": 0.7,
-                "tools": tools,
-                "messages": [
-                    {"role": "user", "content": self._create_system_prompt() + "\n\n" + self._create_user_prompt(content, title, category)}
-                ]
-            }
+            payload = self._create_analysis_payload(content, title, category)
             
             # Make API request
-            headers = {
-                "x-api-key": self.api_key,
-                "Content-Type": "application/json",
-                "anthropic-version": "2023-06-01"
-            }
+            headers = self._api_headers()
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/v1/messages",
-                    json=payload,
-                    headers=headers
-                )
-                
-                if response.status_code != 200:
-                    error_msg = f"Claude API error: {response.status_code} - {response.text}"
-                    logger.error(error_msg)
-                    raise Exception(error_msg)
-                
-                # Parse response
-                result = response.json()
-                logger.info(f"Claude API full response: {json.dumps(result, indent=2)}")
-                
-                # Extract function call result
-                if 'content' in result and len(result['content']) > 0:
-                    for content_block in result['content']:
-                        if content_block.get('type') == 'tool_use':
-                            logger.info(f"Tool use found: {json.dumps(content_block, indent=2)}")
-                            try:
-                                function_input = content_block.get('input', {})
-                                
-                                return TheologicalAnalysis(
-                                    key_themes=function_input.get('key_themes', []),
-                                    thought_questions=function_input.get('thought_questions', [])
-                                )
-                            except Exception as e:
-                                logger.error(f"Failed to parse function input: {e}")
-                                raise Exception(f"Invalid function input: {e}")
-                
-                # Fallback if no function call found
-                raise Exception("No function call result found in response")
+            client = self._get_client()
+            response = await client.post(
+                f"{self.base_url}/v1/messages",
+                timeout=self.timeout,
+                json=payload,
+                headers=headers
+            )
+            
+            if response.status_code != 200:
+                error_msg = f"Claude API error: {response.status_code} - {response.text}"
+                logger.error(error_msg)
+                raise Exception(error_msg)
                 
+            # Parse response
+            result = response.json()
+            logger.info(f"Claude API full response: {json.dumps(result, indent=2)}")
+            
+            return self._parse_analysis_message(result)
+            
         except httpx.TimeoutException:
             logger.error("Claude API request timeout")
             raise
@@ -284,6 +362,90 @@ Call the analyze_theological_content function with your analysis."""
             logger.error(f"Claude API request failed: {str(e)}")
             raise
     
+    async def create_analysis_batch(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Submit theological analyses through the Message Batches API
+        
+        Args:
+            items: Dicts with custom_id, content and optional title/category
+            
+        Returns:
+            The created batch object (id, processing_status, ...)
+        """
+        if not self.api_key:
+            raise ValueError("Claude API key not configured")
+        
+        payload = {
+            "requests": [
+                {
+                    "custom_id": item['custom_id'],
+                    "params": self._create_analysis_payload(item['content'], item.get('title'), item.get('category'))
+                }
+                for item in items
+            ]
+        }
+        
+        client = self._get_client()
+        response = await client.post(
+            f"{self.base_url}/v1/messages/batches",
+            timeout=self.timeout,
+            json=payload,
+            headers=self._api_headers()
+        )
+        if response.status_code != 200:
+            raise Exception(f"Claude batch API error: {response.status_code} - {response.text}")
+        
+        batch = response.json()
+        logger.info(f"Claude analysis batch {batch['id']} created with {len(items)} requests")
+        return batch
+    
+    async def get_batch(self, batch_id: str) -> Dict[str, Any]:
+        """Fetch a message batch's status"""
+        client = self._get_client()
+        response = await client.get(
+            f"{self.base_url}/v1/messages/batches/{batch_id}",
+            timeout=self.timeout,
+            headers=self._api_headers()
+        )
+        if response.status_code != 200:
+            raise Exception(f"Claude batch API error: {response.status_code} - {response.text}")
+        return response.json()
+    
+    async def iter_analysis_batch_results(self, batch: Dict[str, Any]) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Stream the results of an ended batch
+        
+        Yields:
+            (custom_id, TheologicalAnalysis) for succeeded requests, or
+            (custom_id, error message) for errored, canceled or expired ones
+        """
+        client = self._get_client()
+        async with client.stream(
+            "GET",
+            batch['results_url'],
+            timeout=self.timeout,
+            headers=self._api_headers()
+        ) as response:
+            if response.status_code != 200:
+                error_text = (await response.aread()).decode('utf-8', errors='replace')
+                raise Exception(f"Claude batch results error: {response.status_code} - {error_text}")
+            
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                
+                entry = json.loads(line)
+                result = entry.get('result', {})
+                if result.get('type') != 'succeeded':
+                    error = (result.get('error') or {}).get('error') or {}
+                    yield entry['custom_id'], f"Batch request {result.get('type')}: {error.get('message', 'no result')}"
+                    continue
+                
+                try:
+                    yield entry['custom_id'], self._parse_analysis_message(result['message'])
+                except Exception as e:
+                    yield entry['custom_id'], str(e)
+    
     async def generate_chat_response(self, prompt: str) -> str:
         """
         Generate a chat response using Claude API (optimized for fast conversation)
@@ -320,45 +482,46 @@ Call the analyze_theological_content function with your analysis."""
         
         # Use shorter timeout for chat
         chat_timeout = 30.0  # 30 seconds for chat responses
-        async with httpx.AsyncClient(timeout=chat_timeout) as client:
-            for attempt in range(self.max_retries):
-                try:
-                    response = await client.post(
-                        f"{self.base_url}/v1/messages",
-                        headers=headers,
-                        json=payload
-                    )
-                    
-                    if response.status_code == 200:
-                        result = response.json()
-                        
-                        if 'content' in result and len(result['content']) > 0:
-                            chat_text = result['content'][0]['text']
-                            logger.info(f"Successfully generated chat response: {len(chat_text)} characters")
-                            return chat_text
-                        else:
-                            logger.error(f"No content in Claude response: {result}")
-                            raise ValueError("No chat content generated")
+        client = self._get_client()
+        for attempt in range(self.max_retries):
+            try:
+                response = await client.post(
+                    f"{self.base_url}/v1/messages",
+                    timeout=chat_timeout,
+                    headers=headers,
+                    json=payload
+                )
+                
+                if response.status_code == 200:
+                    result = response.json()
                     
+                    if 'content' in result and len(result['content']) > 0:
+                        chat_text = result['content'][0]['text']
+                        logger.info(f"Successfully generated chat response: {len(chat_text)} characters")
+                        return chat_text
                     else:
-                        error_text = response.text
-                        logger.error(f"Claude API error: {response.status_code} - {error_text}")
-                        if attempt == self.max_retries - 1:
-                            raise ValueError(f"Claude API failed after {self.max_retries} attempts")
-                        
-                        await asyncio.sleep(2 ** attempt)  # Exponential backoff
-                        
-                except httpx.TimeoutException:
-                    logger.error(f"Claude API timeout on attempt {attempt + 1}")
-                    if attempt == self.max_retries - 1:
-                        raise ValueError("Claude API timed out")
-                    await asyncio.sleep(2 ** attempt)
+                        logger.error(f"No content in Claude response: {result}")
+                        raise ValueError("No chat content generated")
                     
-                except Exception as e:
-                    logger.error(f"Unexpected error calling Claude API: {e}")
+                else:
+                    error_text = response.text
+                    logger.error(f"Claude API error: {response.status_code} - {error_text}")
                     if attempt == self.max_retries - 1:
-                        raise ValueError(f"Claude API error: {str(e)}")
-                    await asyncio.sleep(2 ** attempt)
+                        raise ValueError(f"Claude API failed after {self.max_retries} attempts")
+                        
+                    await asyncio.sleep(2 ** attempt)  # Exponential backoff
+                    
+            except httpx.TimeoutException:
+                logger.error(f"Claude API timeout on attempt {attempt + 1}")
+                if attempt == self.max_retries - 1:
+                    raise ValueError("Claude API timed out")
+                await asyncio.sleep(2 ** attempt)
+                
+            except Exception as e:
+                logger.error(f"Unexpected error calling Claude API: {e}")
+                if attempt == self.max_retries - 1:
+                    raise ValueError(f"Claude API error: {str(e)}")
+                await asyncio.sleep(2 ** attempt)
 
 # Create singleton instance
 claude_service = ClaudeService()
\ No newline at end of file
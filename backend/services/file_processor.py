@@ -4,9 +4,15 @@ File processing service for various content types
 Handles text extraction, metadata generation, and Bible reference detection
 """
 
+import os
 import re
+import time
 import asyncio
-from typing import Dict, Any, List, Optional
+import multiprocessing
+from queue import Empty
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Optional, Set, Tuple
 from pathlib import Path
 import logging
 from dataclasses import dataclass
@@ -30,6 +36,299 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Parser process pool; FILE_PARSER_WORKERS=0 parses in threads instead
+FILE_PARSER_WORKERS = int(os.getenv("FILE_PARSER_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+FILE_PARSE_TIMEOUT = float(os.getenv("FILE_PARSE_TIMEOUT", "120"))
+# How long app shutdown waits for running parses before terminating the workers
+FILE_PARSER_SHUTDOWN_TIMEOUT = float(os.getenv("FILE_PARSER_SHUTDOWN_TIMEOUT", "30"))
+
+# Workers start from a clean interpreter rather than a fork of the threaded server
+_PARSER_CONTEXT = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
+
+_parse_executor: Optional[ProcessPoolExecutor] = None
+_parse_shutdown = False  # set on app shutdown; no new pool is started after it
+# Submitted (running) parses per pool, so a retired pool is only terminated once
+# its healthy jobs have finished
+_pool_jobs: Dict[ProcessPoolExecutor, Set[Future]] = {}
+# Per pool: the queue its workers report their PIDs on, and the PIDs seen so far
+_pool_workers: Dict[ProcessPoolExecutor, Tuple[Any, Set[int]]] = {}
+_reapers: Set[asyncio.Task] = set()
+# Caps submitted parses at the pool size, so a parse starts as soon as it is
+# submitted and queueing happens before (not inside) its timeout
+_parse_slots: Optional[asyncio.Semaphore] = None
+
+# Canonical book names (as in bible_cache.books) with their chapter counts
+BIBLE_BOOKS = {
+    # Old Testament
+    'Genesis': 50, 'Exodus': 40, 'Leviticus': 27, 'Numbers': 36, 'Deuteronomy': 34,
+    'Joshua': 24, 'Judges': 21, 'Ruth': 4, '1 Samuel': 31, '2 Samuel': 24,
+    '1 Kings': 22, '2 Kings': 25, '1 Chronicles': 29, '2 Chronicles': 36,
+    'Ezra': 10, 'Nehemiah': 13, 'Esther': 10, 'Job': 42, 'Psalms': 150,
+    'Proverbs': 31, 'Ecclesiastes': 12, 'Song of Songs': 8, 'Isaiah': 66,
+    'Jeremiah': 52, 'Lamentations': 5, 'Ezekiel': 48, 'Daniel': 12, 'Hosea': 14,
+    'Joel': 3, 'Amos': 9, 'Obadiah': 1, 'Jonah': 4, 'Micah': 7, 'Nahum': 3,
+    'Habakkuk': 3, 'Zephaniah': 3, 'Haggai': 2, 'Zechariah': 14, 'Malachi': 4,
+    # New Testament
+    'Matthew': 28, 'Mark': 16, 'Luke': 24, 'John': 21, 'Acts': 28, 'Romans': 16,
+    '1 Corinthians': 16, '2 Corinthians': 13, 'Galatians': 6, 'Ephesians': 6,
+    'Philippians': 4, 'Colossians': 4, '1 Thessalonians': 5, '2 Thessalonians': 3,
+    '1 Timothy': 6, '2 Timothy': 4, 'Titus': 3, 'Philemon': 1, 'Hebrews': 13,
+    'James': 5, '1 Peter': 5, '2 Peter': 3, '1 John': 5, '2 John': 1, '3 John': 1,
+    'Jude': 1, 'Revelation': 22
+}
+
+# Alternative full names, matched case-insensitively
+_BOOK_NAME_ALIASES = {
+    'Psalm': 'Psalms', 'Song of Solomon': 'Song of Songs', 'Canticles': 'Song of Songs',
+    'Revelations': 'Revelation', 'Acts of the Apostles': 'Acts'
+}
+
+# Abbreviations, matched case-sensitively (capitalized or upper case) so that
+# ordinary words followed by a number are not mistaken for references
+_BOOK_ABBREVIATIONS = {
+    'Genesis': ['Gen', 'Gn'], 'Exodus': ['Exod', 'Exo', 'Ex'], 'Leviticus': ['Lev', 'Lv'],
+    'Numbers': ['Num', 'Nm'], 'Deuteronomy': ['Deut', 'Deu', 'Dt'], 'Joshua': ['Josh', 'Jos'],
+    'Judges': ['Judg', 'Jdg'], 'Ruth': ['Ru', 'Rth'], 'Ezra': ['Ezr'], 'Nehemiah': ['Neh'],
+    'Esther': ['Esth', 'Est'], 'Job': ['Jb'], 'Psalms': ['Pss', 'Psa', 'Ps'],
+    'Proverbs': ['Prov', 'Pro', 'Prv'], 'Ecclesiastes': ['Eccles', 'Eccl', 'Ecc', 'Qoh'],
+    'Song of Songs': ['Song', 'SOS', 'Sng'], 'Isaiah': ['Isa'], 'Jeremiah': ['Jer'],
+    'Lamentations': ['Lam'], 'Ezekiel': ['Ezek', 'Eze', 'Ezk'], 'Daniel': ['Dan', 'Dn'],
+    'Hosea': ['Hos'], 'Joel': ['Jl'], 'Amos': ['Amo'], 'Obadiah': ['Obad', 'Oba'],
+    'Jonah': ['Jnh'], 'Micah': ['Mic'], 'Nahum': ['Nah'], 'Habakkuk': ['Hab'],
+    'Zephaniah': ['Zeph', 'Zep'], 'Haggai': ['Hag'], 'Zechariah': ['Zech', 'Zec'],
+    'Malachi': ['Mal'], 'Matthew': ['Matt', 'Mat', 'Mt'], 'Mark': ['Mrk', 'Mk'],
+    'Luke': ['Luk', 'Lk'], 'John': ['Jhn', 'Jn'], 'Acts': ['Act'], 'Romans': ['Rom'],
+    'Galatians': ['Gal'], 'Ephesians': ['Eph'], 'Philippians': ['Phil', 'Php'],
+    'Colossians': ['Col'], 'Titus': ['Tit'], 'Philemon': ['Philem', 'Phlm', 'Phm'],
+    'Hebrews': ['Heb'], 'James': ['Jas'], 'Jude': ['Jud'], 'Revelation': ['Rev']
+}
+
+# Numbered books: base name -> abbreviations; the number prefix may be 1/2/3, I/II/III,
+# First/Second/Third or 1st/2nd/3rd, with or without a space
+_NUMBERED_BOOKS = {
+    'Samuel': ['Sam', 'Sm', 'Sa'], 'Kings': ['Kgs', 'Ki'], 'Chronicles': ['Chron', 'Chr', 'Ch'],
+    'Corinthians': ['Cor', 'Co'], 'Thessalonians': ['Thess', 'Thes', 'Th'],
+    'Timothy': ['Tim', 'Ti'], 'Peter': ['Pet', 'Pe', 'Pt'], 'John': ['Jhn', 'Jn']
+}
+_NUMBER_PREFIXES = {
+    '1': '1', 'i': '1', 'first': '1', '1st': '1',
+    '2': '2', 'ii': '2', 'second': '2', '2nd': '2',
+    '3': '3', 'iii': '3', 'third': '3', '3rd': '3'
+}
+
+# Abbreviations that are also ordinary words ("We Act 2 tonight", "Song 2 verses");
+# they only count as references with a trailing period ('Act. 2') or a verse ('Act 2:4')
+_AMBIGUOUS_ABBREVIATIONS = {'act', 'song', 'ex', 'pro', 'ch', 'co', 'ti', 'pe', 'sa'}
+
+# A number right after one of these words belongs to it ("Chapter 1 Ch 2",
+# "page 2 Kings"), so it is not read as a book's number prefix
+_COUNTED_WORD = re.compile(
+    r"(?i)\b(?:chapters?|ch|verses?|vv?|pages?|pp?|parts?|sections?|steps?|points?|lines?|no|numbers?)\.?\s*$"
+)
+
+# Verse counts of single-chapter books, where 'Jude 3' means verse 3
+_SINGLE_CHAPTER_VERSES = {'Obadiah': 21, 'Philemon': 25, '2 John': 13, '3 John': 15, 'Jude': 25}
+
+def _build_book_lookup() -> Dict[str, str]:
+    """Map every accepted spelling (lower case) to its canonical book name"""
+    lookup = {name.lower(): name for name in BIBLE_BOOKS}
+    lookup.update({alias.lower(): name for alias, name in _BOOK_NAME_ALIASES.items()})
+    for name, abbreviations in _BOOK_ABBREVIATIONS.items():
+        lookup.update({abbreviation.lower(): name for abbreviation in abbreviations})
+    return lookup
+
+def _alternation(names) -> str:
+    """Regex alternation, longest first so 'Philemon' wins over 'Phil'"""
+    return '|'.join(re.escape(name) for name in sorted(set(names), key=len, reverse=True))
+
+def _case_variants(abbreviations) -> List[str]:
+    return [variant for abbreviation in abbreviations for variant in (abbreviation, abbreviation.upper())]
+
+def _build_reference_pattern() -> re.Pattern:
+    """Compile one pattern that matches 'Book C:V[-V]', 'Book C' and 'Book C-C' forms"""
+    unnumbered = [name for name in BIBLE_BOOKS if not name[0].isdigit()]
+    numbered_full = list(_NUMBERED_BOOKS)
+    numbered_abbrev = [a for abbreviations in _NUMBERED_BOOKS.values() for a in abbreviations]
+    plain_abbrev = [a for abbreviations in _BOOK_ABBREVIATIONS.values() for a in abbreviations]
+    
+    # The prefix and book name must be on the same line
+    number_prefix = rf"(?P<number>(?i:{_alternation(_NUMBER_PREFIXES)}))[^\S\n]*"
+    book = (
+        rf"(?:{number_prefix}(?P<numbered>(?i:{_alternation(numbered_full)})|{_alternation(_case_variants(numbered_abbrev))})"
+        rf"|(?P<book>(?i:{_alternation(unnumbered + list(_BOOK_NAME_ALIASES))})|{_alternation(_case_variants(plain_abbrev))}))"
+    )
+    return re.compile(
+        rf"\b{book}(?P<period>\.)?\s*(?P<chapter>\d{{1,3}})"
+        rf"(?::(?P<verse>\d{{1,3}})(?:\s*[-\u2013]\s*(?P<end_verse>\d{{1,3}}))?"
+        rf"|\s*[-\u2013]\s*(?P<end_chapter>\d{{1,3}}))?(?![\d:])"
+    )
+
+_BOOK_LOOKUP = _build_book_lookup()
+_NUMBERED_LOOKUP = {name.lower(): name for name in _NUMBERED_BOOKS}
+for _name, _abbreviations in _NUMBERED_BOOKS.items():
+    _NUMBERED_LOOKUP.update({abbreviation.lower(): _name for abbreviation in _abbreviations})
+_REFERENCE_PATTERN = _build_reference_pattern()
+
+def extract_bible_references(content: str, limit: int = 10) -> List[str]:
+    """
+    Extract canonical Bible references from text in a single pass
+    
+    Verse references ('John 3:16', '1 Cor 13:4-7') come first, followed by
+    chapter-only references ('Psalm 23' -> 'Psalms 23') for chapters that have
+    no verse-specific reference. Chapters beyond a book's length are ignored.
+    In single-chapter books a lone number is a verse ('Jude 3' -> 'Jude 1:3'),
+    except 1, which is read as the whole book.
+    """
+    verse_refs = {}
+    chapter_refs = {}
+    chapters_with_verses = set()
+    
+    position = 0
+    while match := _REFERENCE_PATTERN.search(content, position):
+        position = match.end()
+        
+        if match.group('numbered'):
+            if _COUNTED_WORD.search(content, max(0, match.start() - 16), match.start()):
+                # Not a prefix after all: look for an unnumbered book from the name on
+                position = match.start('numbered')
+                continue
+            number = _NUMBER_PREFIXES[match.group('number').lower()]
+            book = f"{number} {_NUMBERED_LOOKUP[match.group('numbered').lower()]}"
+            name = match.group('numbered')
+        else:
+            book = _BOOK_LOOKUP[match.group('book').lower()]
+            name = match.group('book')
+        
+        verse = match.group('verse')
+        if name.lower() in _AMBIGUOUS_ABBREVIATIONS and not (match.group('period') or verse):
+            continue
+        
+        chapter = int(match.group('chapter'))
+        end_verse = match.group('end_verse')
+        if not verse and chapter > 1 and chapter <= _SINGLE_CHAPTER_VERSES.get(book, 0):
+            chapter, verse, end_verse = 1, match.group('chapter'), match.group('end_chapter')
+        if book not in BIBLE_BOOKS or not 1 <= chapter <= BIBLE_BOOKS[book]:
+            continue
+        
+        if verse:
+            ref = f"{book} {chapter}:{verse}"
+            if end_verse:
+                ref += f"-{end_verse}"
+            verse_refs[ref] = None
+            chapters_with_verses.add((book, chapter))
+        else:
+            chapter_refs[(book, chapter)] = None
+    
+    references = list(verse_refs)
+    references.extend(f"{book} {chapter}" for book, chapter in chapter_refs if (book, chapter) not in chapters_with_verses)
+    return references[:limit]
+
+def get_parse_executor() -> Optional[ProcessPoolExecutor]:
+    """Return the shared parser process pool, creating it on first use"""
+    global _parse_executor
+    if _parse_shutdown:
+        raise RuntimeError("File parser pool has been shut down")
+    if _parse_executor is None and FILE_PARSER_WORKERS > 0:
+        pids = _PARSER_CONTEXT.Queue()
+        _parse_executor = ProcessPoolExecutor(
+            max_workers=FILE_PARSER_WORKERS, mp_context=_PARSER_CONTEXT,
+            initializer=_report_worker_pid, initargs=(pids,)
+        )
+        _pool_workers[_parse_executor] = (pids, set())
+        logger.info(f"File parser process pool started ({FILE_PARSER_WORKERS} workers)")
+    return _parse_executor
+
+def _get_parse_slots() -> asyncio.Semaphore:
+    global _parse_slots
+    if _parse_slots is None:
+        _parse_slots = asyncio.Semaphore(max(1, FILE_PARSER_WORKERS))
+    return _parse_slots
+
+def _report_worker_pid(pids):
+    """Parser worker initializer: tell the parent which process to kill if a parse hangs"""
+    pids.put(os.getpid())
+
+def _forget_executor(executor: ProcessPoolExecutor):
+    _pool_jobs.pop(executor, None)
+    pids, _ = _pool_workers.pop(executor, (None, None))
+    if pids is not None:
+        pids.close()
+
+def _terminate_executor(executor: ProcessPoolExecutor):
+    """Kill a pool's worker processes (the only way to stop a parse that has started)"""
+    pids, known = _pool_workers.get(executor, (None, set()))
+    while pids is not None:
+        try:
+            known.add(pids.get_nowait())
+        except Empty:
+            break
+    # Only live children of this process, so a PID reused after a worker exited is never hit
+    for process in multiprocessing.active_children():
+        if process.pid in known:
+            process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+    _forget_executor(executor)
+
+def _discard_parse_executor(executor: ProcessPoolExecutor):
+    """Stop using a broken pool and terminate what is left of it; the next parse creates a fresh pool"""
+    global _parse_executor
+    if _parse_executor is executor:
+        _parse_executor = None
+        _terminate_executor(executor)
+
+async def shutdown_parse_executor(timeout: float = FILE_PARSER_SHUTDOWN_TIMEOUT):
+    """
+    Shut down the parser pool (called on app shutdown)
+    Running parses get up to timeout seconds to finish (waited on in a thread,
+    not the event loop); then the workers are terminated.
+    """
+    global _parse_executor, _parse_shutdown
+    _parse_shutdown = True
+    executor, _parse_executor = _parse_executor, None
+    if executor is None:
+        return
+    
+    try:
+        await asyncio.wait_for(
+            asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True),
+            timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"Parser pool still busy after {timeout}s, terminating its workers")
+        _terminate_executor(executor)
+    else:
+        _forget_executor(executor)
+
+def _retire_parse_executor(executor: ProcessPoolExecutor, hung_job: Future):
+    """
+    Stop sending parses to a pool with a stuck worker and terminate it once its
+    other (healthy) jobs have finished; new parses go to a fresh pool meanwhile
+    """
+    global _parse_executor
+    if _parse_executor is executor:
+        _parse_executor = None
+    
+    others = [job for job in _pool_jobs.get(executor, ()) if job is not hung_job and not job.done()]
+    
+    async def reap():
+        await asyncio.gather(*(asyncio.wrap_future(job) for job in others), return_exceptions=True)
+        _terminate_executor(executor)
+        logger.info(f"Retired parser pool terminated ({len(others)} jobs finished first)")
+    
+    reaper = asyncio.get_running_loop().create_task(reap())
+    _reapers.add(reaper)
+    reaper.add_done_callback(_reapers.discard)
+
+def _process_file_in_worker(filename: str, content_bytes: bytes, file_type: str) -> Dict[str, Any]:
+    """Process pool entry point (must be a module-level function to be picklable)"""
+    return FileProcessor().process_file_sync(filename, content_bytes, file_type)
+
+def _process_path_in_worker(filename: str, path: str, file_type: str) -> Dict[str, Any]:
+    """Process pool entry point for spooled uploads; only the path crosses the process boundary"""
+    return FileProcessor().process_path_sync(filename, path, file_type)
+
 @dataclass
 class ProcessedContent:
     """Structure for processed file content"""
@@ -52,44 +351,110 @@ class FileProcessor:
     
     def __init__(self):
         # Bible books for reference detection
-        self.bible_books = [
-            # Old Testament
-            'Genesis', 'Exodus', 'Leviticus', 'Numbers', 'Deuteronomy',
-            'Joshua', 'Judges', 'Ruth', '1 Samuel', '2 Samuel', '1 Kings', '2 Kings',
-            '1 Chronicles', '2 Chronicles', 'Ezra', 'Nehemiah', 'Esther',
-            'Job', 'Psalms', 'Proverbs', 'Ecclesiastes', 'Song of Solomon',
-            'Isaiah', 'Jeremiah', 'Lamentations', 'Ezekiel', 'Daniel',
-            'Hosea', 'Joel', 'Amos', 'Obadiah', 'Jonah', 'Micah', 'Nahum',
-            'Habakkuk', 'Zephaniah', 'Haggai', 'Zechariah', 'Malachi',
-            # New Testament
-            'Matthew', 'Mark', 'Luke', 'John', 'Acts', 'Romans',
-            '1 Corinthians', '2 Corinthians', 'Galatians', 'Ephesians',
-            'Philippians', 'Colossians', '1 Thessalonians', '2 Thessalonians',
-            '1 Timothy', '2 Timothy', 'Titus', 'Philemon', 'Hebrews',
-            'James', '1 Peter', '2 Peter', '1 John', '2 John', '3 John',
-            'Jude', 'Revelation'
-        ]
-        
+        self.bible_books = list(BIBLE_BOOKS)
     
     async def process_file(self, filename: str, content_bytes: bytes, 
+                          file_type: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Process file based on its type and extract content
+        
+        Parsing is CPU-bound, so it is dispatched to the parser process pool (or a
+        thread when FILE_PARSER_WORKERS=0) to keep the event loop free.
+        
+        Raises:
+            TimeoutError: If parsing takes longer than timeout (default FILE_PARSE_TIMEOUT);
+                          the stuck worker is terminated
+        """
+        return await self._run_parser(
+            _process_file_in_worker, self.process_file_sync,
+            filename, content_bytes, file_type, timeout
+        )
+    
+    async def process_path(self, filename: str, path: str, 
+                          file_type: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Process a file that has been spooled to disk (see process_file)
+        Parsers read from the file directly, so no in-memory copy of the upload is made.
+        """
+        return await self._run_parser(
+            _process_path_in_worker, self.process_path_sync,
+            filename, path, file_type, timeout
+        )
+    
+    async def _run_parser(self, worker_fn, sync_fn, filename: str, source, 
+                          file_type: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Run a parse in the process pool (or a thread) with a timeout"""
+        timeout = timeout or FILE_PARSE_TIMEOUT
+        executor = get_parse_executor()
+        
+        if executor is None:
+            return await asyncio.wait_for(
+                asyncio.to_thread(sync_fn, filename, source, file_type),
+                timeout=timeout
+            )
+        
+        # Wait for a free worker before the clock starts, so time spent queued
+        # behind other uploads never counts toward this parse's timeout
+        async with _get_parse_slots():
+            for attempt in (1, 2):
+                executor = get_parse_executor()
+                job = executor.submit(worker_fn, filename, source, file_type)
+                jobs = _pool_jobs.setdefault(executor, set())
+                jobs.add(job)
+                job.add_done_callback(jobs.discard)
+                
+                try:
+                    # Cancelling this await (client disconnect) cancels the job if it
+                    # has not started yet
+                    return await asyncio.wait_for(asyncio.wrap_future(job), timeout=timeout)
+                except asyncio.TimeoutError:
+                    logger.error(f"Parsing {filename} exceeded {timeout}s, retiring its parser pool")
+                    _retire_parse_executor(executor, job)
+                    raise TimeoutError(f"Parsing {filename} exceeded {timeout}s")
+                except asyncio.CancelledError:
+                    # Our own cancellation propagates; a job cancelled by a pool
+                    # shutdown is retried on a fresh pool
+                    if asyncio.current_task().cancelling() or not job.cancelled():
+                        raise
+                    logger.warning(f"Parser pool shut down while processing {filename}, retrying")
+                except BrokenProcessPool:
+                    # A worker died (e.g. out of memory); retry once on a fresh pool
+                    logger.warning(f"Parser pool broke while processing {filename}, retrying")
+                    _discard_parse_executor(executor)
+            
+            raise RuntimeError(f"Parser pool failed twice while processing {filename}")
+    
+    def process_file_sync(self, filename: str, content_bytes: bytes, 
+                          file_type: str) -> Dict[str, Any]:
+        """Blocking implementation of process_file"""
+        with io.BytesIO(content_bytes) as stream:
+            return self._process_stream(filename, stream, file_type)
+    
+    def process_path_sync(self, filename: str, path: str, 
                           file_type: str) -> Dict[str, Any]:
-        """Process file based on its type and extract content"""
+        """Blocking implementation of process_path"""
+        with open(path, 'rb') as stream:
+            return self._process_stream(filename, stream, file_type)
+    
+    def _process_stream(self, filename: str, stream, file_type: str) -> Dict[str, Any]:
+        """Extract content from a seekable binary stream"""
+        file_type = file_type or ''
         try:
             # Determine file extension
             file_ext = Path(filename).suffix.lower()
             
             # Extract text based on file type
             if file_ext == '.txt' or 'text/plain' in file_type:
-                text_content = await self._process_text_file(content_bytes)
+                text_content = self._process_text_file(stream)
             elif file_ext == '.md' or 'markdown' in file_type:
-                text_content = await self._process_markdown_file(content_bytes)
+                text_content = self._process_markdown_file(stream)
             elif file_ext == '.docx' or 'document' in file_type:
-                text_content = await self._process_docx_file(content_bytes)
+                text_content = self._process_docx_file(stream)
             elif file_ext == '.pdf' or 'pdf' in file_type:
-                text_content = await self._process_pdf_file(content_bytes)
+                text_content = self._process_pdf_file(stream)
             else:
                 # Fallback: try to decode as text
-                text_content = content_bytes.decode('utf-8', errors='ignore')
+                text_content = stream.read().decode('utf-8', errors='ignore')
             
             # Generate title from filename or content
             title = self._generate_title(filename, text_content)
@@ -114,29 +479,30 @@ class FileProcessor:
                 'metadata': {
                     'original_filename': filename,
                     'bible_references': passages,
-                    'processed_at': asyncio.get_event_loop().time()
+                    'processed_at': time.time()
                 }
             }
             
         except Exception as e:
             logger.error(f"Error processing file {filename}: {e}")
             # Return basic content even if processing fails
+            stream.seek(0)
             return {
                 'title': Path(filename).stem,
-                'content': content_bytes.decode('utf-8', errors='ignore'),
+                'content': stream.read().decode('utf-8', errors='ignore'),
                 'word_count': 0,
                 'tags': [],
                 'file_type': file_type,
                 'metadata': {'error': str(e)}
             }
     
-    async def _process_text_file(self, content_bytes: bytes) -> str:
+    def _process_text_file(self, stream) -> str:
         """Process plain text file"""
-        return content_bytes.decode('utf-8', errors='ignore')
+        return stream.read().decode('utf-8', errors='ignore')
     
-    async def _process_markdown_file(self, content_bytes: bytes) -> str:
+    def _process_markdown_file(self, stream) -> str:
         """Process Markdown file"""
-        markdown_text = content_bytes.decode('utf-8', errors='ignore')
+        markdown_text = stream.read().decode('utf-8', errors='ignore')
         
         if markdown:
             # Convert markdown to plain text (remove formatting)
@@ -150,13 +516,13 @@ class FileProcessor:
             # Fallback: return raw markdown
             return markdown_text
     
-    async def _process_docx_file(self, content_bytes: bytes) -> str:
+    def _process_docx_file(self, stream) -> str:
         """Process Word document"""
         if not Document:
             raise ImportError("python-docx not installed. Run: pip install python-docx")
         
         try:
-            doc = Document(io.BytesIO(content_bytes))
+            doc = Document(stream)
             paragraphs = []
             
             for paragraph in doc.paragraphs:
@@ -170,13 +536,13 @@ class FileProcessor:
             logger.error(f"Error processing DOCX: {e}")
             raise
     
-    async def _process_pdf_file(self, content_bytes: bytes) -> str:
+    def _process_pdf_file(self, stream) -> str:
         """Process PDF file"""
         if not PyPDF2:
             raise ImportError("PyPDF2 not installed. Run: pip install PyPDF2")
         
         try:
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(content_bytes))
+            pdf_reader = PyPDF2.PdfReader(stream)
             pages_text = []
             
             for page in pdf_reader.pages:
@@ -224,45 +590,7 @@ class FileProcessor:
     
     def _extract_bible_references(self, content: str) -> List[str]:
         """Extract Bible references from content"""
-        references = []
-        
-        # Create pattern for Bible references
-        books_pattern = '|'.join(re.escape(book) for book in self.bible_books)
-        
-        # Pattern: Book Chapter:Verse or Book Chapter:Verse-Verse
-        pattern = rf'\b({books_pattern})\s+(\d+):(\d+)(?:-(\d+))?\b'
-        
-        matches = re.finditer(pattern, content, re.IGNORECASE)
-        
-        for match in matches:
-            book = match.group(1)
-            chapter = match.group(2)
-            start_verse = match.group(3)
-            end_verse = match.group(4)
-            
-            if end_verse:
-                ref = f"{book} {chapter}:{start_verse}-{end_verse}"
-            else:
-                ref = f"{book} {chapter}:{start_verse}"
-            
-            if ref not in references:
-                references.append(ref)
-        
-        # Also look for chapter-only references
-        chapter_pattern = rf'\b({books_pattern})\s+(\d+)\b'
-        chapter_matches = re.finditer(chapter_pattern, content, re.IGNORECASE)
-        
-        for match in chapter_matches:
-            book = match.group(1)
-            chapter = match.group(2)
-            ref = f"{book} {chapter}"
-            
-            # Only add if we don't already have a more specific reference
-            if not any(existing.startswith(ref + ':') for existing in references):
-                references.append(ref)
-        
-        return references[:10]  # Limit to first 10 references
-    
+        return extract_bible_references(content)
     
     def validate_file_type(self, filename: str, file_type: str) -> bool:
         """Validate if file type is supported"""
@@ -9,8 +9,9 @@ import json
 import logging
 import asyncio
 import httpx
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Dict, List, Optional, Any
 from dataclasses import dataclass
+from .http_client import create_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -23,15 +24,39 @@ class TheologicalAnalysis:
 class GrokService:
     """Service for theological content and chat using Grok API"""
     
-    def __init__(self, api_key: str = None, base_url: str = "https://api.x.ai/v1"):
+    def __init__(self, api_key: str = None, base_url: str = None,
+                 http_client: Optional[httpx.AsyncClient] = None):
         self.api_key = api_key or os.getenv('XAI_API_KEY')
-        self.base_url = base_url
+        self.base_url = base_url or os.getenv('GROK_BASE_URL', 'https://api.x.ai/v1')
         self.model = "grok-3-mini"  # Fast, reasoning-capable model
         self.timeout = 60.0  # Grok is fast, shorter timeout
         self.max_retries = 3
         
         if not self.api_key:
             logger.warning("xAI API key not found. Set XAI_API_KEY environment variable.")
+        
+        # Shared keep-alive client, created on first use or by start()
+        self._client = http_client
+        
+        # Static analysis prefix (system prompt + tool schema), built once per process
+        self._analysis_system_message = {"role": "system", "content": self._create_system_prompt()}
+        self._analysis_tools = [self._create_function_schema()]
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared pooled HTTP client, creating it if needed"""
+        if self._client is None or self._client.is_closed:
+            self._client = create_http_client("Grok", self.timeout)
+        return self._client
+    
+    async def start(self):
+        """Open the shared HTTP client (called from app startup)"""
+        self._get_client()
+    
+    async def close(self):
+        """Close the shared HTTP client and its pooled connections (called from app shutdown)"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
     
     async def generate_sermon(self, prompt: str) -> str:
         """
@@ -69,44 +94,133 @@ class GrokService:
         
         # Use longer timeout for sermon generation
         sermon_timeout = 180.0  # 3 minutes for sermon generation
-        async with httpx.AsyncClient(timeout=sermon_timeout) as client:
-            for attempt in range(self.max_retries):
-                try:
-                    response = await client.post(
-                        f"{self.base_url}/chat/completions",
-                        headers=headers,
-                        json=payload
-                    )
-                    
-                    if response.status_code == 200:
-                        result = response.json()
-                        
-                        if 'choices' in result and len(result['choices']) > 0:
-                            sermon_text = result['choices'][0]['message']['content']
-                            logger.info(f"Successfully generated sermon: {len(sermon_text)} characters")
-                            return sermon_text
-                        else:
-                            logger.error(f"No choices in Grok response: {result}")
-                            raise ValueError("No sermon content generated")
+        client = self._get_client()
+        for attempt in range(self.max_retries):
+            try:
+                response = await client.post(
+                    f"{self.base_url}/chat/completions",
+                    timeout=sermon_timeout,
+                    headers=headers,
+                    json=payload
+                )
+                
+                if response.status_code == 200:
+                    result = response.json()
                     
+                    if 'choices' in result and len(result['choices']) > 0:
+                        sermon_text = result['choices'][0]['message']['content']
+                        logger.info(f"Successfully generated sermon: {len(sermon_text)} characters")
+                        return sermon_text
                     else:
-                        logger.error(f"Grok API error: {response.status_code} - {response.text}")
-                        if attempt == self.max_retries - 1:
-                            raise ValueError(f"Grok API failed after {self.max_retries} attempts")
-                        
-                        await asyncio.sleep(2 ** attempt)  # Exponential backoff
-                        
-                except httpx.TimeoutException:
-                    logger.error(f"Grok API timeout on attempt {attempt + 1}")
-                    if attempt == self.max_retries - 1:
-                        raise ValueError("Grok API timed out")
-                    await asyncio.sleep(2 ** attempt)
+                        logger.error(f"No choices in Grok response: {result}")
+                        raise ValueError("No sermon content generated")
                     
-                except Exception as e:
-                    logger.error(f"Unexpected error calling Grok API: {e}")
+                else:
+                    logger.error(f"Grok API error: {response.status_code} - {response.text}")
                     if attempt == self.max_retries - 1:
-                        raise ValueError(f"Grok API error: {str(e)}")
-                    await asyncio.sleep(2 ** attempt)
+                        raise ValueError(f"Grok API failed after {self.max_retries} attempts")
+                        
+                    await asyncio.sleep(2 ** attempt)  # Exponential backoff
+                    
+            except httpx.TimeoutException:
+                logger.error(f"Grok API timeout on attempt {attempt + 1}")
+                if attempt == self.max_retries - 1:
+                    raise ValueError("Grok API timed out")
+                await asyncio.sleep(2 ** attempt)
+                
+            except Exception as e:
+                logger.error(f"Unexpected error calling Grok API: {e}")
+                if attempt == self.max_retries - 1:
+                    raise ValueError(f"Grok API error: {str(e)}")
+                await asyncio.sleep(2 ** attempt)
+    
+    async def stream_sermon(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Stream a sermon from the Grok API as text chunks arrive
+        
+        Args:
+            prompt: The complete sermon generation prompt
+            
+        Yields:
+            Text deltas in generation order
+        """
+        if not self.api_key:
+            raise ValueError("xAI API key is required for sermon generation")
+        
+        logger.info(f"Streaming sermon with Grok API...")
+        async for text in self._stream_completion(prompt, max_tokens=8000):
+            yield text
+    
+    async def stream_chat_response(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Stream a chat response from the Grok API as text chunks arrive
+        
+        Closing the iterator (or cancelling the task consuming it) closes the
+        upstream connection, aborting generation.
+        
+        Args:
+            prompt: The chat prompt
+            
+        Yields:
+            Text deltas in generation order
+        """
+        if not self.api_key:
+            raise ValueError("xAI API key is required for chat generation")
+        
+        logger.info(f"Streaming chat response with Grok API...")
+        async for text in self._stream_completion(prompt, max_tokens=1000, read_timeout=30.0):
+            yield text
+    
+    async def _stream_completion(self, prompt: str, max_tokens: int,
+                                 read_timeout: float = None) -> AsyncIterator[str]:
+        """Stream text deltas from the chat completions API"""
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "Accept": "text/event-stream"
+        }
+        
+        payload = {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.7,
+            "max_tokens": max_tokens,
+            "stream": True
+        }
+        
+        # The read timeout applies between chunks, not to the whole response
+        client = self._get_client()
+        async with client.stream(
+            "POST",
+            f"{self.base_url}/chat/completions",
+            timeout=httpx.Timeout(read_timeout or self.timeout, connect=10.0),
+            headers=headers,
+            json=payload
+        ) as response:
+            if response.status_code != 200:
+                error_text = (await response.aread()).decode('utf-8', errors='replace')
+                raise ValueError(f"Grok API error: {response.status_code} - {error_text}")
+            
+            # Read to the end of the body after [DONE], so the connection goes back to the pool
+            done = False
+            async for line in response.aiter_lines():
+                if done or not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    done = True
+                    continue
+                
+                event = json.loads(data)
+                for choice in event.get('choices', []):
+                    text = choice.get('delta', {}).get('content')
+                    if text:
+                        yield text
     
     def _create_function_schema(self) -> Dict[str, Any]:
         """Create function calling schema for structured theological analysis"""
@@ -195,11 +309,11 @@ Call the analyze_theological_content function with your analysis."""
         try:
             # Prepare the API request (Grok format)
             messages = [
-                {"role": "system", "content": self._create_system_prompt()},
+                self._analysis_system_message,
                 {"role": "user", "content": self._create_user_prompt(content, title, category)}
             ]
             
-            tools = [self._create_function_schema()]
+            tools = self._analysis_tools
             
             # Use function calling with Grok
             payload = {
@@ -218,53 +332,54 @@ Call the analyze_theological_content function with your analysis."""
                 "Content-Type": "application/json"
             }
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/chat/completions",
-                    json=payload,
-                    headers=headers
-                )
-                
-                if response.status_code != 200:
-                    error_msg = f"Grok API error: {response.status_code} - {response.text}"
-                    logger.error(error_msg)
-                    raise Exception(error_msg)
+            client = self._get_client()
+            response = await client.post(
+                f"{self.base_url}/chat/completions",
+                timeout=self.timeout,
+                json=payload,
+                headers=headers
+            )
+            
+            if response.status_code != 200:
+                error_msg = f"Grok API error: {response.status_code} - {response.text}"
+                logger.error(error_msg)
+                raise Exception(error_msg)
                 
-                # Parse response
-                result = response.json()
-                logger.info(f"Grok API full response: {json.dumps(result, indent=2)}")
+            # Parse response
+            result = response.json()
+            logger.info(f"Grok API full response: {json.dumps(result, indent=2)}")
+            
+            # Extract function call result
+            if 'choices' in result and len(result['choices']) > 0:
+                choice = result['choices'][0]
+                logger.info(f"Choice content: {json.dumps(choice, indent=2)}")
                 
-                # Extract function call result
-                if 'choices' in result and len(result['choices']) > 0:
-                    choice = result['choices'][0]
-                    logger.info(f"Choice content: {json.dumps(choice, indent=2)}")
-                    
-                    if 'message' in choice and 'tool_calls' in choice['message']:
-                        tool_calls = choice['message']['tool_calls']
-                        logger.info(f"Tool calls found: {len(tool_calls)}")
-                        if len(tool_calls) > 0:
-                            logger.info(f"First tool call: {json.dumps(tool_calls[0], indent=2)}")
-                            try:
-                                function_args = json.loads(tool_calls[0]['function']['arguments'])
-                                
-                                return TheologicalAnalysis(
-                                    key_themes=function_args.get('key_themes', []),
-                                    thought_questions=function_args.get('thought_questions', [])
-                                )
-                            except json.JSONDecodeError as e:
-                                logger.error(f"Failed to parse function arguments JSON: {e}")
-                                logger.error(f"Raw arguments: {tool_calls[0]['function']['arguments']}")
-                                raise Exception(f"Invalid JSON in function arguments: {e}")
-                    else:
-                        logger.warning("No tool_calls found in message")
-                        if 'message' in choice:
-                            logger.info(f"Message content: {choice['message']}")
+                if 'message' in choice and 'tool_calls' in choice['message']:
+                    tool_calls = choice['message']['tool_calls']
+                    logger.info(f"Tool calls found: {len(tool_calls)}")
+                    if len(tool_calls) > 0:
+                        logger.info(f"First tool call: {json.dumps(tool_calls[0], indent=2)}")
+                        try:
+                            function_args = json.loads(tool_calls[0]['function']['arguments'])
+                            
+                            return TheologicalAnalysis(
+                                key_themes=function_args.get('key_themes', []),
+                                thought_questions=function_args.get('thought_questions', [])
+                            )
+                        except json.JSONDecodeError as e:
+                            logger.error(f"Failed to parse function arguments JSON: {e}")
+                            logger.error(f"Raw arguments: {tool_calls[0]['function']['arguments']}")
+                            raise Exception(f"Invalid JSON in function arguments: {e}")
                 else:
-                    logger.warning("No choices found in response")
-                
-                # Fallback if no function call found
-                raise Exception("No function call result found in response")
+                    logger.warning("No tool_calls found in message")
+                    if 'message' in choice:
+                        logger.info(f"Message content: {choice['message']}")
+            else:
+                logger.warning("No choices found in response")
                 
+            # Fallback if no function call found
+            raise Exception("No function call result found in response")
+            
         except httpx.TimeoutException:
             logger.error("Grok API request timeout")
             raise
@@ -308,75 +423,45 @@ Call the analyze_theological_content function with your analysis."""
         
         # Use shorter timeout for chat (Grok is fast)
         chat_timeout = 30.0  # 30 seconds for chat responses
-        async with httpx.AsyncClient(timeout=chat_timeout) as client:
-            for attempt in range(self.max_retries):
-                try:
-                    response = await client.post(
-                        f"{self.base_url}/chat/completions",
-                        headers=headers,
-                        json=payload
-                    )
-                    
-                    if response.status_code == 200:
-                        result = response.json()
-                        
-                        if 'choices' in result and len(result['choices']) > 0:
-                            chat_text = result['choices'][0]['message']['content']
-                            logger.info(f"Successfully generated chat response: {len(chat_text)} characters")
-                            return chat_text
-                        else:
-                            logger.error(f"No choices in Grok response: {result}")
-                            raise ValueError("No chat content generated")
+        client = self._get_client()
+        for attempt in range(self.max_retries):
+            try:
+                response = await client.post(
+                    f"{self.base_url}/chat/completions",
+                    timeout=chat_timeout,
+                    headers=headers,
+                    json=payload
+                )
+                
+                if response.status_code == 200:
+                    result = response.json()
                     
+                    if 'choices' in result and len(result['choices']) > 0:
+                        chat_text = result['choices'][0]['message']['content']
+                        logger.info(f"Successfully generated chat response: {len(chat_text)} characters")
+                        return chat_text
                     else:
-                        logger.error(f"Grok API error: {response.status_code} - {response.text}")
-                        if attempt == self.max_retries - 1:
-                            raise ValueError(f"Grok API failed after {self.max_retries} attempts")
-                        
-                        await asyncio.sleep(2 ** attempt)  # Exponential backoff
-                        
-                except httpx.TimeoutException:
-                    logger.error(f"Grok API timeout on attempt {attempt + 1}")
-                    if attempt == self.max_retries - 1:
-                        raise ValueError("Grok API timed out")
-                    await asyncio.sleep(2 ** attempt)
+                        logger.error(f"No choices in Grok response: {result}")
+                        raise ValueError("No chat content generated")
                     
-                except Exception as e:
-                    logger.error(f"Unexpected error calling Grok API: {e}")
+                else:
+                    logger.error(f"Grok API error: {response.status_code} - {response.text}")
                     if attempt == self.max_retries - 1:
-                        raise ValueError(f"Grok API error: {str(e)}")
-                    await asyncio.sleep(2 ** attempt)
-
-    async def health_check(self) -> bool:
-        """Check if Grok API is available"""
-        if not self.api_key:
-            return False
-        
-        try:
-            # Simple test request
-            messages = [{"role": "user", "content": "Hello"}]
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "max_tokens": 10
-            }
-            
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/chat/completions",
-                    json=payload,
-                    headers=headers
-                )
-                return response.status_code == 200
+                        raise ValueError(f"Grok API failed after {self.max_retries} attempts")
+                        
+                    await asyncio.sleep(2 ** attempt)  # Exponential backoff
+                    
+            except httpx.TimeoutException:
+                logger.error(f"Grok API timeout on attempt {attempt + 1}")
+                if attempt == self.max_retries - 1:
+                    raise ValueError("Grok API timed out")
+                await asyncio.sleep(2 ** attempt)
                 
-        except Exception as e:
-            logger.error(f"Grok health check failed: {e}")
-            return False
+            except Exception as e:
+                logger.error(f"Unexpected error calling Grok API: {e}")
+                if attempt == self.max_retries - 1:
+                    raise ValueError(f"Grok API error: {str(e)}")
+                await asyncio.sleep(2 ** attempt)
 
 # Create singleton instance
 grok_service = GrokService()
\ No newline at end of file
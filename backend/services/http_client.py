@@ -0,0 +1,55 @@
+# backend/services/http_client.py
+"""
+Shared HTTP client factory for AI provider APIs
+Builds long-lived httpx clients with keep-alive connection pooling (and HTTP/2
+when the h2 package is installed) so requests reuse TCP/TLS connections
+"""
+
+import os
+import logging
+import httpx
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401 - httpx needs it for HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+def create_http_client(provider: str, timeout: float = 60.0) -> httpx.AsyncClient:
+    """
+    Create a pooled AsyncClient for a provider
+
+    Pool limits and timeouts are tunable per provider through environment
+    variables prefixed with the provider name, e.g. GROK_HTTP_MAX_CONNECTIONS,
+    GROK_HTTP_MAX_KEEPALIVE, GROK_HTTP_KEEPALIVE_EXPIRY, GROK_HTTP_CONNECT_TIMEOUT
+    and GROK_HTTP2 (set to 'false' to force HTTP/1.1).
+
+    Args:
+        provider: Provider name used as the environment variable prefix
+        timeout: Default read/write timeout in seconds (calls may override it)
+    """
+    prefix = provider.upper()
+
+    limits = httpx.Limits(
+        max_connections=int(os.getenv(f'{prefix}_HTTP_MAX_CONNECTIONS', '20')),
+        max_keepalive_connections=int(os.getenv(f'{prefix}_HTTP_MAX_KEEPALIVE', '10')),
+        keepalive_expiry=_env_float(f'{prefix}_HTTP_KEEPALIVE_EXPIRY', 30.0)
+    )
+    client_timeout = httpx.Timeout(
+        timeout,
+        connect=_env_float(f'{prefix}_HTTP_CONNECT_TIMEOUT', 10.0),
+        pool=_env_float(f'{prefix}_HTTP_POOL_TIMEOUT', 30.0)
+    )
+
+    http2 = os.getenv(f'{prefix}_HTTP2', 'true').lower() == 'true'
+    if http2 and not HTTP2_AVAILABLE:
+        logger.warning(f"{provider} HTTP/2 requested but h2 is not installed, using HTTP/1.1")
+        http2 = False
+
+    logger.info(f"{provider} HTTP client created (max {limits.max_connections} connections, http2={http2})")
+    return httpx.AsyncClient(limits=limits, timeout=client_timeout, http2=http2)
@@ -0,0 +1,172 @@
+# backend/services/provider_health.py
+"""
+Provider health tracking for AI services (Grok, Claude)
+A circuit breaker per provider, fed by the outcomes and latencies of real
+requests, lets analysis, sermon and chat routing skip a provider that is known
+to be failing instead of burning retries on it
+
+States:
+  * closed: requests flow normally; consecutive failures are counted
+  * open: requests are rejected immediately for PROVIDER_OPEN_SECONDS
+  * half_open: a single probe request is let through; success closes the
+    circuit, failure opens it again
+"""
+
+import os
+import time
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class ProviderUnavailableError(Exception):
+    """Raised when a provider's circuit is open"""
+
+class CircuitBreaker:
+    """Circuit breaker and latency tracker for one provider"""
+    
+    def __init__(self, name: str, failure_threshold: int = 3, open_seconds: float = 30.0,
+                 latency_smoothing: float = 0.2):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.latency_smoothing = latency_smoothing
+        
+        self._state = CLOSED
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+        
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.latency_ewma: Optional[float] = None
+        self.last_error: Optional[str] = None
+    
+    @property
+    def state(self) -> str:
+        """Current state (an open circuit turns half-open once its timeout passes)"""
+        if self._state == OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self.probe_in_flight = False
+            logger.info(f"{self.name} circuit half-open, allowing a probe request")
+        return self._state
+    
+    def is_available(self) -> bool:
+        """Whether a request would currently be allowed (without reserving it)"""
+        state = self.state
+        return state == CLOSED or (state == HALF_OPEN and not self.probe_in_flight)
+    
+    def acquire(self) -> bool:
+        """Reserve permission for one request; in half-open only one probe runs at a time"""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+    
+    def release(self):
+        """Give back a reservation without an outcome (e.g. the request was cancelled)"""
+        self.probe_in_flight = False
+    
+    def record_success(self, latency: float):
+        self.successes += 1
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+        self._observe_latency(latency)
+        
+        if self._state != CLOSED:
+            logger.info(f"{self.name} circuit closed after a successful request")
+            self._state = CLOSED
+    
+    def record_failure(self, latency: float, error: Exception = None):
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        self._observe_latency(latency)
+        self.last_error = str(error) if error else None
+        
+        if self._state == HALF_OPEN or (self._state == CLOSED and self.consecutive_failures >= self.failure_threshold):
+            logger.warning(f"{self.name} circuit opened for {self.open_seconds}s after "
+                           f"{self.consecutive_failures} consecutive failures: {self.last_error}")
+            self._state = OPEN
+            self.opened_at = time.monotonic()
+    
+    def _observe_latency(self, latency: float):
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += self.latency_smoothing * (latency - self.latency_ewma)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        state = self.state
+        return {
+            'state': state,
+            'available': self.is_available(),
+            'consecutive_failures': self.consecutive_failures,
+            'successes': self.successes,
+            'failures': self.failures,
+            'rejected': self.rejected,
+            'latency_ewma_seconds': round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            'retry_in_seconds': round(max(0.0, self.open_seconds - (time.monotonic() - self.opened_at)), 1) if state == OPEN else None,
+            'last_error': self.last_error
+        }
+
+class ProviderHealth:
+    """Registry of circuit breakers shared by all AI callers"""
+    
+    def __init__(self):
+        self.failure_threshold = int(os.getenv('PROVIDER_FAILURE_THRESHOLD', '3'))
+        self.open_seconds = float(os.getenv('PROVIDER_OPEN_SECONDS', '30'))
+        self.breakers: Dict[str, CircuitBreaker] = {
+            provider: CircuitBreaker(provider, self.failure_threshold, self.open_seconds)
+            for provider in ('grok', 'claude')
+        }
+    
+    def breaker(self, provider: str) -> CircuitBreaker:
+        provider = provider.lower()
+        if provider not in self.breakers:
+            self.breakers[provider] = CircuitBreaker(provider, self.failure_threshold, self.open_seconds)
+        return self.breakers[provider]
+    
+    def is_available(self, provider: str) -> bool:
+        return self.breaker(provider).is_available()
+    
+    @asynccontextmanager
+    async def call(self, provider: str):
+        """
+        Guard one request to a provider and record its outcome
+        
+        Raises:
+            ProviderUnavailableError: If the provider's circuit is open
+        """
+        breaker = self.breaker(provider)
+        if not breaker.acquire():
+            raise ProviderUnavailableError(f"{provider} is unavailable (circuit {breaker.state})")
+        
+        started = time.monotonic()
+        try:
+            yield breaker
+        except Exception as e:
+            breaker.record_failure(time.monotonic() - started, e)
+            raise
+        except BaseException:
+            # Cancelled or closed by the caller: says nothing about the provider
+            breaker.release()
+            raise
+        else:
+            breaker.record_success(time.monotonic() - started)
+    
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {name: breaker.to_dict() for name, breaker in self.breakers.items()}
+
+# Create singleton instance
+provider_health = ProviderHealth()
\ No newline at end of file
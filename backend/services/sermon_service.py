@@ -2,40 +2,175 @@
 """
 Sermon Generation Service with fallback capabilities
 Handles sermon generation with primary Grok API and fallback to Claude
+
+Dispatch policies (SERMON_DISPATCH_POLICY):
+  * sequential: try Grok, then Claude only after Grok has fully failed
+  * hedged: start Claude too if Grok has not answered (or, when streaming,
+    produced a first token) within SERMON_HEDGE_DELAY seconds
+  * race: start both at once; the first success wins and the loser is cancelled
 """
 
+import os
+import time
+import asyncio
 import logging
-from typing import Tuple
+from collections import deque
+from typing import AsyncIterator, Dict, Optional, Tuple
 
 from .grok_service import grok_service
 from .claude_service import claude_service
+from .provider_health import provider_health, ProviderUnavailableError
 
 logger = logging.getLogger(__name__)
 
+DISPATCH_POLICIES = ('sequential', 'hedged', 'race')
+
+class ProviderLatency:
+    """Rolling latency samples for one provider"""
+    
+    def __init__(self, window: int = 100):
+        self.samples = deque(maxlen=window)
+        self.successes = 0
+        self.failures = 0
+        self.cancelled = 0
+    
+    def record(self, seconds: float, success: bool):
+        if success:
+            self.successes += 1
+            self.samples.append(seconds)
+        else:
+            self.failures += 1
+    
+    def _percentile(self, ordered, fraction: float) -> Optional[float]:
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+        return round(ordered[index], 3)
+    
+    def to_dict(self) -> Dict[str, Optional[float]]:
+        ordered = sorted(self.samples)
+        return {
+            'successes': self.successes,
+            'failures': self.failures,
+            'cancelled': self.cancelled,
+            'samples': len(ordered),
+            'p50_seconds': self._percentile(ordered, 0.5),
+            'p90_seconds': self._percentile(ordered, 0.9),
+            'p99_seconds': self._percentile(ordered, 0.99),
+            'max_seconds': round(ordered[-1], 3) if ordered else None
+        }
+
 class SermonService:
     """Sermon generation service with Grok primary and Claude fallback"""
     
     def __init__(self):
         self.primary_service = grok_service
         self.fallback_service = claude_service
+        
+        self.policy = os.getenv('SERMON_DISPATCH_POLICY', 'sequential').lower()
+        if self.policy not in DISPATCH_POLICIES:
+            logger.warning(f"Unknown SERMON_DISPATCH_POLICY '{self.policy}', using sequential")
+            self.policy = 'sequential'
+        self.hedge_delay = float(os.getenv('SERMON_HEDGE_DELAY', '20'))
+        
+        # Full-response latency (generate_sermon) and time-to-first-token (stream_sermon)
+        self.latency = {
+            'response': {'grok': ProviderLatency(), 'claude': ProviderLatency()},
+            'first_token': {'grok': ProviderLatency(), 'claude': ProviderLatency()}
+        }
+    
+    def get_latency_stats(self) -> Dict[str, object]:
+        """Per-provider latency percentiles, for tuning SERMON_HEDGE_DELAY"""
+        return {
+            'policy': self.policy,
+            'hedge_delay_seconds': self.hedge_delay,
+            'response': {name: stats.to_dict() for name, stats in self.latency['response'].items()},
+            'first_token': {name: stats.to_dict() for name, stats in self.latency['first_token'].items()}
+        }
     
-    async def generate_sermon(self, prompt: str) -> Tuple[str, str]:
+    async def generate_sermon(self, prompt: str, policy: str = None) -> Tuple[str, str]:
         """
         Generate a sermon using primary AI service with fallback
         
         Args:
             prompt: The complete sermon generation prompt
-            
+            policy: Dispatch policy override (defaults to SERMON_DISPATCH_POLICY)
+        
         Returns:
             Tuple of (generated_sermon, service_used)
         """
+        policy = policy or self.policy
+        if policy == 'sequential':
+            return await self._generate_sequential(prompt)
+        
+        hedge_delay = self._hedge_delay(policy)
+        tasks = {"grok": asyncio.create_task(self._timed_generate("grok", self.primary_service, prompt))}
+        errors = {}
+        try:
+            done, _ = await asyncio.wait(tasks.values(), timeout=hedge_delay)
+            if done:
+                grok_task = tasks["grok"]
+                if grok_task.exception() is None:
+                    sermon = grok_task.result()
+                    logger.info(f"Successfully generated sermon with grok ({policy}): {len(sermon)} characters")
+                    return sermon, "grok"
+                errors["grok"] = grok_task.exception()
+                logger.warning(f"grok sermon generation failed: {errors['grok']}")
+            else:
+                logger.info(f"Grok has not answered after {hedge_delay}s, hedging with Claude...")
+            tasks["claude"] = asyncio.create_task(self._timed_generate("claude", self.fallback_service, prompt))
+            
+            pending = set(tasks.values())
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for name, task in tasks.items():
+                    if task not in done or name in errors:
+                        continue
+                    if task.exception() is None:
+                        sermon = task.result()
+                        logger.info(f"Successfully generated sermon with {name} ({policy}): {len(sermon)} characters")
+                        return sermon, name
+                    errors[name] = task.exception()
+                    logger.warning(f"{name} sermon generation failed: {errors[name]}")
+            
+            raise Exception(f"Both AI services failed - Grok: {errors.get('grok')}, Claude: {errors.get('claude')}")
+        
+        finally:
+            # Cancel the loser (or everything, if the caller was cancelled)
+            for name, task in tasks.items():
+                if not task.done():
+                    task.cancel()
+                    self.latency['response'][name].cancelled += 1
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+    
+    def _hedge_delay(self, policy: str) -> Optional[float]:
+        """Seconds to wait on Grok before starting Claude (None: only once Grok fails)"""
+        return None if policy == 'sequential' else 0 if policy == 'race' else self.hedge_delay
+    
+    async def _timed_generate(self, name: str, service, prompt: str) -> str:
+        """Call a provider and record its response latency"""
+        started = time.monotonic()
+        try:
+            # Raises ProviderUnavailableError at once if the provider's circuit is open
+            async with provider_health.call(name):
+                sermon = await service.generate_sermon(prompt)
+        except (asyncio.CancelledError, ProviderUnavailableError):
+            raise
+        except Exception:
+            self.latency['response'][name].record(time.monotonic() - started, False)
+            raise
+        self.latency['response'][name].record(time.monotonic() - started, True)
+        return sermon
+    
+    async def _generate_sequential(self, prompt: str) -> Tuple[str, str]:
+        """Try Grok, then Claude once Grok has fully failed"""
         # Try primary service (Grok) first
         try:
             logger.info("Attempting sermon generation with Grok API...")
-            sermon = await self.primary_service.generate_sermon(prompt)
+            sermon = await self._timed_generate("grok", self.primary_service, prompt)
             logger.info(f"Successfully generated sermon with Grok API: {len(sermon)} characters")
             return sermon, "grok"
-            
+        
         except Exception as grok_error:
             logger.warning(f"Grok API failed: {grok_error}")
             
@@ -46,31 +181,119 @@ class SermonService:
                 logger.info(f"Grok API failed with error: {grok_error}, trying Claude fallback...")
             
             try:
-                sermon = await self.fallback_service.generate_sermon(prompt)
+                sermon = await self._timed_generate("claude", self.fallback_service, prompt)
                 logger.info(f"Successfully generated sermon with Claude fallback: {len(sermon)} characters")
                 return sermon, "claude"
-                
+            
             except Exception as claude_error:
                 logger.error(f"Claude fallback also failed: {claude_error}")
                 raise Exception(f"Both AI services failed - Grok: {grok_error}, Claude: {claude_error}")
     
-    async def health_check(self) -> dict:
-        """Check health of both AI services"""
+    async def stream_sermon(self, prompt: str, policy: str = None) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Stream a sermon using primary AI service with fallback
+        
+        Providers are only switched before any text has been emitted; once
+        text has been sent to the client a failure is raised instead, since the
+        fallback would restart the sermon from the beginning. Hedging and
+        racing are decided on the first token.
+        
+        Args:
+            prompt: The complete sermon generation prompt
+            policy: Dispatch policy override (defaults to SERMON_DISPATCH_POLICY)
+        
+        Yields:
+            Tuples of (text_chunk, service_used)
+        """
+        policy = policy or self.policy
+        hedge_delay = self._hedge_delay(policy)
+        
+        streams = {}
+        first_chunks = {}
+        errors = {}
+        winner = None
+        
+        def start(name: str, service):
+            streams[name] = service.stream_sermon(prompt)
+            first_chunks[name] = asyncio.create_task(self._timed_first_chunk(name, streams[name]))
+        
         try:
-            grok_healthy = await self.primary_service.health_check()
-        except Exception:
-            grok_healthy = False
+            start("grok", self.primary_service)
             
+            while winner is None:
+                waiting = [task for name, task in first_chunks.items() if name not in errors]
+                # Claude is started once Grok fails, or (hedged/race) once the hedge delay passes
+                timeout = hedge_delay if "claude" not in streams else None
+                if waiting:
+                    done, _ = await asyncio.wait(waiting, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                else:
+                    done = set()
+                
+                for name, task in first_chunks.items():
+                    if task in done and name not in errors:
+                        if task.exception() is None and winner is None:
+                            winner = name
+                        elif task.exception() is not None:
+                            errors[name] = task.exception()
+                            logger.warning(f"{name} sermon stream failed before its first token: {errors[name]}")
+                
+                if winner is None and "claude" not in streams and (not done or "grok" in errors):
+                    if "grok" not in errors:
+                        logger.info(f"Grok produced no tokens after {hedge_delay}s, hedging with Claude...")
+                    start("claude", self.fallback_service)
+                elif winner is None and len(errors) == len(first_chunks):
+                    raise Exception(f"Both AI services failed - Grok: {errors.get('grok')}, Claude: {errors.get('claude')}")
+            
+            # Close the loser's upstream request before streaming the winner
+            for name, task in first_chunks.items():
+                if name != winner:
+                    await self._close_stream(name, task, streams[name])
+            
+            logger.info(f"Streaming sermon from {winner} ({policy})")
+            yield first_chunks[winner].result(), winner
+            async for chunk in streams[winner]:
+                yield chunk, winner
+        
+        finally:
+            for name, task in first_chunks.items():
+                await self._close_stream(name, task, streams[name])
+    
+    async def _timed_first_chunk(self, name: str, stream: AsyncIterator[str]) -> str:
+        """Wait for a stream's first text chunk and record time-to-first-token"""
+        started = time.monotonic()
         try:
-            claude_healthy = await self.fallback_service.health_check()
+            async with provider_health.call(name):
+                chunk = await stream.__anext__()
+        except (asyncio.CancelledError, ProviderUnavailableError):
+            raise
+        except StopAsyncIteration:
+            self.latency['first_token'][name].record(time.monotonic() - started, False)
+            raise ValueError(f"{name} returned an empty sermon")
         except Exception:
-            claude_healthy = False
-            
+            self.latency['first_token'][name].record(time.monotonic() - started, False)
+            raise
+        self.latency['first_token'][name].record(time.monotonic() - started, True)
+        return chunk
+    
+    async def _close_stream(self, name: str, first_chunk: asyncio.Task, stream):
+        """Cancel a provider stream, aborting its upstream request"""
+        if not first_chunk.done():
+            first_chunk.cancel()
+            self.latency['first_token'][name].cancelled += 1
+            await asyncio.gather(first_chunk, return_exceptions=True)
+        await stream.aclose()
+    
+    async def health_check(self) -> dict:
+        """Check health of both AI services from circuit breaker state (no live probe calls)"""
+        grok_healthy = provider_health.is_available("grok") and bool(self.primary_service.api_key)
+        claude_healthy = provider_health.is_available("claude") and bool(self.fallback_service.api_key)
+        
         return {
             "grok": grok_healthy,
             "claude": claude_healthy,
-            "at_least_one_available": grok_healthy or claude_healthy
+            "at_least_one_available": grok_healthy or claude_healthy,
+            "providers": provider_health.snapshot()
         }
 
 # Create singleton instance
-sermon_service = SermonService()
\ No newline at end of file
+sermon_service = SermonService()
@@ -12,7 +12,7 @@ CORE FUNCTIONALITY:
    - Store/retrieve user content with 17-field schema including AI analysis results
    - Full CRUD operations (Create, Read, Update, Delete) for all content types
    - Category-based organization (sermons, study-notes, research, journal, social-media-posts)
-   - Full-text search across titles and content
+   - Ranked full-text search (tsvector + GIN) across titles and content
    - Bulk import/export capabilities for data migration
 
 2. AI Processing Integration:
@@ -64,20 +64,153 @@ DEPENDENCIES:
 """
 
 import asyncio
+import base64
+import json
+import re
 import uuid
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import List, Dict, Any, Optional, AsyncIterator
 import asyncpg
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Columns returned to API callers (excludes internal columns such as search_vector)
+CONTENT_COLUMNS = """
+    id, user_id, title, category, content, date_created, word_count, passage,
+    tags, post_tags, file_type, bible_references, ai_processing_time_seconds,
+    key_themes, thought_questions, last_error, date_modified, size_bytes,
+    processing_status
+"""
+
+# Listing projection without the content body; the preview is computed server-side
+PREVIEW_LENGTH = 300
+CONTENT_SUMMARY_COLUMNS = f"""
+    id, user_id, title, category, date_created, word_count, passage,
+    tags, post_tags, file_type, bible_references, ai_processing_time_seconds,
+    key_themes, thought_questions, last_error, date_modified, size_bytes,
+    processing_status, LEFT(content, {PREVIEW_LENGTH}) AS preview
+"""
+
+CONTENT_FIELD_SETS = ('full', 'summary')
+
+def _content_columns(fields: str = 'full') -> str:
+    """Column list for a projection mode ('full' includes content, 'summary' a preview)"""
+    if fields not in CONTENT_FIELD_SETS:
+        raise ValueError(f"Unknown fields mode: {fields}")
+    return CONTENT_SUMMARY_COLUMNS if fields == 'summary' else CONTENT_COLUMNS
+
+# Marks the content of dead-lettered jobs (the 'dead' CTE) as failed; finished
+# content is left alone
+DEAD_JOB_CONTENT_UPDATE = """
+    UPDATE content_items c
+    SET processing_status = 'failed', last_error = dead.last_error, date_modified = NOW()
+    FROM dead
+    WHERE c.id = dead.content_id AND dead.status = 'dead'
+    AND c.processing_status IS DISTINCT FROM 'completed'
+"""
+
+# Columns written by bulk_import (staged with COPY, then upserted)
+IMPORT_COLUMNS = (
+    'id', 'user_id', 'title', 'category', 'content', 'date_created', 'word_count',
+    'passage', 'tags', 'post_tags', 'file_type', 'bible_references',
+    'ai_processing_time_seconds', 'key_themes', 'thought_questions', 'last_error',
+    'date_modified', 'size_bytes', 'processing_status'
+)
+
+# ts_headline options for highlighted search snippets
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10, FragmentDelimiter=\" ... \""
+
+SEARCH_MODES = ('fulltext', 'fuzzy', 'substring')
+
+# Default pg_trgm word similarity threshold for fuzzy title/passage lookups
+DEFAULT_SIMILARITY_THRESHOLD = 0.3
+
+def _build_tsquery(query: str, prefix: bool = True) -> str:
+    """
+    Convert a user search string into a to_tsquery() expression.
+    Quoted text becomes a phrase query (word <-> word), bare words are ANDed,
+    and the last bare word is matched as a prefix so search-as-you-type works.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query):
+        if phrase:
+            words = re.findall(r'\w+', phrase)
+            if words:
+                terms.append(('phrase', ' <-> '.join(words)))
+        else:
+            terms.extend(('word', w) for w in re.findall(r'\w+', word))
+    
+    if not terms:
+        return ''
+    
+    if prefix and terms[-1][0] == 'word':
+        terms[-1] = ('word', terms[-1][1] + ':*')
+    
+    return ' & '.join(f"({term})" if kind == 'phrase' else term for kind, term in terms)
+
+def encode_cursor(date_created: datetime, content_id) -> str:
+    """Encode a (date_created, id) keyset position as an opaque URL-safe cursor"""
+    payload = json.dumps({'d': date_created.isoformat(), 'id': str(content_id)})
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str) -> tuple:
+    """Decode a cursor from encode_cursor; raises ValueError if it is malformed"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(payload['d']), str(uuid.UUID(payload['id']))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+def _parse_timestamp(value) -> datetime:
+    """Parse an exported ISO timestamp, defaulting to now for missing values"""
+    if isinstance(value, datetime):
+        return value
+    if value:
+        return datetime.fromisoformat(value)
+    return datetime.now(timezone.utc)
+
+def _import_record(user_id: str, item: Dict[str, Any]) -> tuple:
+    """Convert an imported content item into a record tuple matching IMPORT_COLUMNS"""
+    if not isinstance(item, dict):
+        raise ValueError(f"Content item must be an object, got {type(item).__name__}")
+    
+    content = item.get('content') or ''
+    processing_time = item.get('ai_processing_time_seconds')
+    key_themes = item.get('key_themes') or []
+    thought_questions = item.get('thought_questions') or []
+    
+    return (
+        str(uuid.UUID(str(item['id']))) if item.get('id') else str(uuid.uuid4()),
+        user_id,
+        item.get('title') or 'Untitled',
+        item.get('category') or 'sermons',
+        content,
+        _parse_timestamp(item.get('date_created')),
+        item.get('word_count') if item.get('word_count') is not None else len(content.split()),
+        item.get('passage'),
+        item.get('tags') or [],
+        item.get('post_tags') or [],
+        item.get('file_type'),
+        item.get('bible_references') or [],
+        Decimal(str(processing_time)) if processing_time is not None else None,
+        key_themes,
+        thought_questions,
+        item.get('last_error'),
+        _parse_timestamp(item.get('date_modified')),
+        item.get('size_bytes') if item.get('size_bytes') is not None else len(content.encode('utf-8')),
+        # Items that were never analyzed are re-queued after import
+        item.get('processing_status') or ('completed' if key_themes and thought_questions else 'pending')
+    )
+
 class StorageService:
     """Simple PostgreSQL storage service"""
     
     def __init__(self, database_url: str):
         self.database_url = database_url
         self.pool = None
+        self.trigram_available = False
     
     async def initialize(self):
         """Initialize database connection"""
@@ -121,6 +254,105 @@ class StorageService:
                 );
             """)
             
+            # Columns added after the original schema
+            await conn.execute("""
+                ALTER TABLE content_items ADD COLUMN IF NOT EXISTS post_tags TEXT[];
+            """)
+            
+            # Full-text search vector (title weighted above content) with GIN index
+            await conn.execute("""
+                ALTER TABLE content_items ADD COLUMN IF NOT EXISTS search_vector tsvector
+                GENERATED ALWAYS AS (
+                    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+                    setweight(to_tsvector('english', coalesce(content, '')), 'B')
+                ) STORED;
+            """)
+            
+            await conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_content_items_search_vector
+                ON content_items USING GIN (search_vector);
+            """)
+            
+            # Keyset pagination indexes for list_content (with and without category filter)
+            await conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_content_items_user_category_created
+                ON content_items (user_id, category, date_created DESC, id DESC);
+            """)
+            
+            await conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_content_items_user_created
+                ON content_items (user_id, date_created DESC, id DESC);
+            """)
+            
+            # Trigram indexes for typo-tolerant title/passage lookups
+            try:
+                await conn.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+                await conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_content_items_title_trgm
+                    ON content_items USING GIN (title gin_trgm_ops);
+                """)
+                await conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_content_items_passage_trgm
+                    ON content_items USING GIN (passage gin_trgm_ops);
+                """)
+            except Exception as e:
+                logger.warning(f"pg_trgm indexes could not be created: {e}")
+            
+            # Fuzzy search needs the extension itself (the indexes only speed it up)
+            self.trigram_available = await conn.fetchval(
+                "SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')"
+            )
+            if not self.trigram_available:
+                logger.warning("pg_trgm is not installed, fuzzy search will fall back to substring search")
+            
+            # Durable AI analysis job queue (claimed with FOR UPDATE SKIP LOCKED)
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_jobs (
+                    id BIGSERIAL PRIMARY KEY,
+                    content_id UUID NOT NULL REFERENCES content_items(id) ON DELETE CASCADE,
+                    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL DEFAULT 5,
+                    available_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                    locked_until TIMESTAMPTZ,
+                    last_error TEXT,
+                    created_at TIMESTAMPTZ DEFAULT NOW(),
+                    updated_at TIMESTAMPTZ DEFAULT NOW()
+                );
+            """)
+            
+            # Jobs in the 'batch' lane go through provider batch APIs; batch_id
+            # tracks the submitted batch so polling can resume after a restart
+            await conn.execute("""
+                ALTER TABLE analysis_jobs
+                ADD COLUMN IF NOT EXISTS lane VARCHAR(20) NOT NULL DEFAULT 'interactive',
+                ADD COLUMN IF NOT EXISTS batch_id TEXT;
+            """)
+            
+            # At most one waiting job per content item
+            await conn.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_analysis_jobs_queued_content
+                ON analysis_jobs (content_id) WHERE status = 'queued';
+            """)
+            
+            await conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_analysis_jobs_claim
+                ON analysis_jobs (status, available_at);
+            """)
+            
+            # AI analysis results keyed by a hash of (text, title, category, model, prompt)
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    cache_key CHAR(64) PRIMARY KEY,
+                    model VARCHAR(100) NOT NULL,
+                    key_themes TEXT[] NOT NULL,
+                    thought_questions TEXT[] NOT NULL,
+                    hit_count INTEGER NOT NULL DEFAULT 0,
+                    created_at TIMESTAMPTZ DEFAULT NOW(),
+                    last_used_at TIMESTAMPTZ DEFAULT NOW()
+                );
+            """)
+            
             # Create lookup tables
             await conn.execute("""
                 CREATE TABLE IF NOT EXISTS roles (
@@ -294,30 +526,48 @@ class StorageService:
     async def get_content(self, user_id: str, content_id: str) -> Optional[Dict[str, Any]]:
         """Get content by ID"""
         async with self.pool.acquire() as conn:
-            row = await conn.fetchrow("""
-                SELECT * FROM content_items 
+            row = await conn.fetchrow(f"""
+                SELECT {CONTENT_COLUMNS} FROM content_items 
                 WHERE id = $1 AND user_id = $2
             """, content_id, user_id)
             
             return dict(row) if row else None
     
-    async def list_content(self, user_id: str, category: Optional[str] = None, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
-        """List all content for user with optional filtering"""
+    async def list_content(self, user_id: str, category: Optional[str] = None, limit: int = 100,
+                           offset: int = 0, cursor: Optional[str] = None,
+                           fields: str = 'full') -> List[Dict[str, Any]]:
+        """
+        List all content for user with optional filtering
+        
+        When a cursor (from encode_cursor) is given, rows strictly after that
+        (date_created, id) position are returned and offset is ignored, so deep
+        pages cost the same as the first one.
+        
+        fields='summary' omits the content body and returns a short 'preview' instead.
+        """
+        columns = _content_columns(fields)
+        params = [user_id]
+        filters = ["user_id = $1"]
+        
+        if category:
+            params.append(category)
+            filters.append(f"category = ${len(params)}")
+        
+        if cursor:
+            cursor_date, cursor_id = decode_cursor(cursor)
+            params.extend([cursor_date, cursor_id])
+            filters.append(f"(date_created, id) < (${len(params) - 1}, ${len(params)})")
+            offset = 0
+        
+        params.extend([limit, offset])
+        
         async with self.pool.acquire() as conn:
-            if category:
-                rows = await conn.fetch("""
-                    SELECT * FROM content_items 
-                    WHERE user_id = $1 AND category = $2
-                    ORDER BY date_created DESC
-                    LIMIT $3 OFFSET $4
-                """, user_id, category, limit, offset)
-            else:
-                rows = await conn.fetch("""
-                    SELECT * FROM content_items 
-                    WHERE user_id = $1
-                    ORDER BY date_created DESC
-                    LIMIT $2 OFFSET $3
-                """, user_id, limit, offset)
+            rows = await conn.fetch(f"""
+                SELECT {columns} FROM content_items 
+                WHERE {' AND '.join(filters)}
+                ORDER BY date_created DESC, id DESC
+                LIMIT ${len(params) - 1} OFFSET ${len(params)}
+            """, *params)
             
             return [dict(row) for row in rows]
     
@@ -334,20 +584,120 @@ class StorageService:
             logger.info(f"Deleted content {content_id}: {rows_affected} rows affected")
             return rows_affected > 0
     
-    async def search_content(self, user_id: str, query: str, category: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
-        """Search content with full-text search"""
+    async def search_content(self, user_id: str, query: str, category: Optional[str] = None,
+                             limit: int = 50, mode: str = 'fulltext', prefix: bool = True,
+                             similarity: float = DEFAULT_SIMILARITY_THRESHOLD,
+                             fields: str = 'full') -> List[Dict[str, Any]]:
+        """
+        Search content
+        
+        Modes:
+            fulltext: ranked tsvector search with phrase ("...") and prefix support,
+                      returns a highlighted 'snippet' and 'rank' per item
+            fuzzy: typo-tolerant trigram match on title/passage, returns 'similarity'
+            substring: legacy ILIKE match on title/content
+        
+        fields='summary' omits the content body and returns a short 'preview' instead.
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+        
+        columns = _content_columns(fields)
+        
+        if mode == 'fuzzy':
+            return await self._search_fuzzy(user_id, query, category, limit, similarity, columns)
+        
+        if mode == 'substring':
+            return await self._search_substring(user_id, query, category, limit, columns)
+        
+        tsquery = _build_tsquery(query, prefix=prefix)
+        if not tsquery:
+            return []
+        
+        params = [user_id, tsquery]
+        category_filter = ""
+        if category:
+            params.append(category)
+            category_filter = f"AND category = ${len(params)}"
+        params.append(limit)
+        
+        async with self.pool.acquire() as conn:
+            # Rank and limit on the index first, then project and build headlines
+            # only for the returned rows
+            rows = await conn.fetch(f"""
+                WITH q AS (SELECT to_tsquery('english', $2) AS query),
+                ranked AS (
+                    SELECT id, ts_rank(search_vector, q.query) AS rank
+                    FROM content_items, q
+                    WHERE user_id = $1
+                    AND search_vector @@ q.query
+                    {category_filter}
+                    ORDER BY rank DESC, date_created DESC
+                    LIMIT ${len(params)}
+                )
+                SELECT {columns}, ranked.rank,
+                       ts_headline('english', content_items.content, q.query, '{HEADLINE_OPTIONS}') AS snippet
+                FROM ranked
+                JOIN content_items USING (id)
+                CROSS JOIN q
+                ORDER BY ranked.rank DESC, date_created DESC
+            """, *params)
+            
+            return [dict(row) for row in rows]
+    
+    async def _search_fuzzy(self, user_id: str, query: str, category: Optional[str] = None,
+                            limit: int = 50, similarity: float = DEFAULT_SIMILARITY_THRESHOLD,
+                            columns: str = CONTENT_COLUMNS) -> List[Dict[str, Any]]:
+        """Trigram word-similarity search on title and passage (uses the gin_trgm_ops indexes)"""
+        if not self.trigram_available:
+            raise RuntimeError("Fuzzy search is not available (the pg_trgm extension is not installed)")
+        
+        params = [user_id, query]
+        category_filter = ""
+        if category:
+            params.append(category)
+            category_filter = f"AND category = ${len(params)}"
+        params.append(limit)
+        
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                # The <% operator compares against this threshold; scope it to this transaction
+                await conn.execute(
+                    "SELECT set_config('pg_trgm.word_similarity_threshold', $1, true)",
+                    str(similarity)
+                )
+                
+                rows = await conn.fetch(f"""
+                    SELECT {columns},
+                           GREATEST(
+                               word_similarity($2, title),
+                               COALESCE(word_similarity($2, passage), 0)
+                           ) AS similarity
+                    FROM content_items
+                    WHERE user_id = $1
+                    AND ($2 <% title OR $2 <% passage)
+                    {category_filter}
+                    ORDER BY similarity DESC, date_created DESC
+                    LIMIT ${len(params)}
+                """, *params)
+            
+            return [dict(row) for row in rows]
+    
+    async def _search_substring(self, user_id: str, query: str, category: Optional[str] = None,
+                                limit: int = 50, columns: str = CONTENT_COLUMNS) -> List[Dict[str, Any]]:
+        """Legacy ILIKE search (sequential scan)"""
         async with self.pool.acquire() as conn:
             if category:
-                rows = await conn.fetch("""
-                    SELECT * FROM content_items 
+                rows = await conn.fetch(f"""
+                    SELECT {columns} FROM content_items 
                     WHERE user_id = $1 AND category = $2
                     AND (title ILIKE $3 OR content ILIKE $3)
                     ORDER BY date_created DESC
                     LIMIT $4
                 """, user_id, category, f"%{query}%", limit)
             else:
-                rows = await conn.fetch("""
-                    SELECT * FROM content_items 
+                rows = await conn.fetch(f"""
+                    SELECT {columns} FROM content_items 
                     WHERE user_id = $1
                     AND (title ILIKE $2 OR content ILIKE $2)
                     ORDER BY date_created DESC
@@ -374,9 +724,26 @@ class StorageService:
                 'last_updated': row['last_updated']
             }
     
+    async def iter_content(self, user_id: str, batch_size: int = 200) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield every content item for a user via a server-side cursor
+        Only batch_size rows are held in memory at a time, regardless of library size.
+        """
+        async with self.pool.acquire() as conn:
+            # asyncpg cursors must run inside a transaction
+            async with conn.transaction():
+                cursor = conn.cursor(f"""
+                    SELECT {CONTENT_COLUMNS} FROM content_items 
+                    WHERE user_id = $1
+                    ORDER BY date_created DESC, id DESC
+                """, user_id, prefetch=batch_size)
+                
+                async for row in cursor:
+                    yield dict(row)
+    
     async def export_user_data(self, user_id: str) -> Dict[str, Any]:
-        """Export all user data"""
-        content_items = await self.list_content(user_id)
+        """Export all user data (in memory - use iter_content for large libraries)"""
+        content_items = [item async for item in self.iter_content(user_id)]
         
         return {
             'user_id': user_id,
@@ -384,16 +751,271 @@ class StorageService:
             'content_items': content_items
         }
     
-    async def bulk_import(self, user_id: str, content_items: List[Dict[str, Any]]) -> List[str]:
-        """Import multiple content items"""
-        imported_ids = []
+    async def bulk_import(self, user_id: str, content_items: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """
+        Import a batch of content items in a single transaction
+        
+        Rows are loaded into a temporary staging table with COPY and then upserted
+        on id, so re-importing an export updates existing items instead of
+        duplicating them. Returns the content id of each input item in input
+        order, or None where nothing was written (the id belongs to another user).
+        """
+        records = [_import_record(user_id, item) for item in content_items]
+        if not records:
+            return []
+        
+        content_ids = [record[0] for record in records]
+        
+        # An upsert cannot touch the same id twice in one statement; keep the last copy
+        records = list({record[0]: record for record in records}.values())
+        
+        columns = ', '.join(IMPORT_COLUMNS)
+        updates = ', '.join(
+            f"{column} = EXCLUDED.{column}"
+            for column in IMPORT_COLUMNS if column not in ('id', 'user_id', 'date_created')
+        )
+        
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("""
+                    CREATE TEMP TABLE content_import_staging
+                    (LIKE content_items INCLUDING DEFAULTS) ON COMMIT DROP
+                """)
+                
+                await conn.copy_records_to_table(
+                    'content_import_staging',
+                    records=records,
+                    columns=IMPORT_COLUMNS
+                )
+                
+                rows = await conn.fetch(f"""
+                    INSERT INTO content_items ({columns})
+                    SELECT {columns} FROM content_import_staging
+                    ON CONFLICT (id) DO UPDATE SET {updates}
+                    WHERE content_items.user_id = EXCLUDED.user_id
+                    RETURNING id
+                """)
+        
+        written = {str(row['id']) for row in rows}
+        if len(written) < len(records):
+            logger.warning(f"Bulk import skipped {len(records) - len(written)} items owned by another user")
         
-        for item in content_items:
-            # Store each item
-            content_id = await self.store_content(user_id, item)
-            imported_ids.append(content_id)
+        logger.info(f"Bulk imported {len(written)} content items")
+        return [content_id if content_id in written else None for content_id in content_ids]
+    
+    async def enqueue_analysis_jobs(self, content_ids: List[str], lane: str = 'interactive') -> int:
+        """Queue durable analysis jobs; items that already have a waiting job are skipped"""
+        if not content_ids:
+            return 0
         
-        return imported_ids
+        async with self.pool.acquire() as conn:
+            result = await conn.execute("""
+                INSERT INTO analysis_jobs (content_id, lane)
+                SELECT unnest($1::uuid[]), $2
+                ON CONFLICT (content_id) WHERE status = 'queued' DO NOTHING
+            """, [str(content_id) for content_id in content_ids], lane)
+            
+            return int(result.split()[-1])
+    
+    async def requeue_pending_analysis(self, limit: Optional[int] = None) -> int:
+        """
+        Queue jobs for content left 'pending' without an active job (e.g. after a
+        restart, or deferred by the queue's admission limit), oldest first
+        """
+        async with self.pool.acquire() as conn:
+            result = await conn.execute("""
+                INSERT INTO analysis_jobs (content_id)
+                SELECT c.id FROM content_items c
+                WHERE c.processing_status = 'pending'
+                AND NOT EXISTS (
+                    SELECT 1 FROM analysis_jobs j
+                    WHERE j.content_id = c.id AND j.status IN ('queued', 'running')
+                )
+                ORDER BY c.date_created
+                LIMIT $1
+                ON CONFLICT (content_id) WHERE status = 'queued' DO NOTHING
+            """, limit)
+            
+            requeued = int(result.split()[-1])
+            if requeued:
+                logger.info(f"Requeued {requeued} pending content items for analysis")
+            return requeued
+    
+    async def claim_analysis_jobs(self, limit: int = 1, visibility_timeout: float = 300,
+                                  lane: str = 'interactive') -> List[Dict[str, Any]]:
+        """
+        Claim due jobs for processing
+        
+        Claimed jobs are hidden from other workers (and replicas) for
+        visibility_timeout seconds; a job whose worker died becomes claimable
+        again once that expires. Jobs that expire on their last attempt are
+        dead-lettered and their content marked 'failed'. Jobs submitted in a
+        provider batch (batch_id set) are never re-claimed here; the batch
+        runner resumes polling them instead.
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(f"""
+                    WITH dead AS (
+                        UPDATE analysis_jobs
+                        SET status = 'dead', updated_at = NOW(),
+                            last_error = COALESCE(last_error, 'Visibility timeout expired')
+                        WHERE status = 'running' AND locked_until < NOW()
+                        AND attempts >= max_attempts AND batch_id IS NULL
+                        RETURNING content_id, status, last_error
+                    )
+                    {DEAD_JOB_CONTENT_UPDATE}
+                """)
+                
+                rows = await conn.fetch("""
+                    UPDATE analysis_jobs j
+                    SET status = 'running', attempts = j.attempts + 1, batch_id = NULL,
+                        locked_until = NOW() + make_interval(secs => $2),
+                        updated_at = NOW()
+                    FROM (
+                        SELECT id FROM analysis_jobs
+                        WHERE lane = $3
+                        AND ((status = 'queued' AND available_at <= NOW())
+                             OR (status = 'running' AND locked_until < NOW() AND batch_id IS NULL))
+                        ORDER BY available_at
+                        LIMIT $1
+                        FOR UPDATE SKIP LOCKED
+                    ) claimable, content_items c
+                    WHERE j.id = claimable.id AND c.id = j.content_id
+                    RETURNING j.id AS job_id, j.content_id, j.attempts, j.max_attempts,
+                              c.title, c.category, c.content
+                """, limit, float(visibility_timeout), lane)
+                
+                return [dict(row) for row in rows]
+    
+    async def complete_analysis_job(self, job_id: int):
+        """Remove a finished job"""
+        async with self.pool.acquire() as conn:
+            await conn.execute("DELETE FROM analysis_jobs WHERE id = $1", job_id)
+    
+    async def fail_analysis_job(self, job_id: int, error: str, retry_delay: float = 60,
+                                lane: Optional[str] = None) -> str:
+        """
+        Schedule a retry after retry_delay seconds, or dead-letter the job once attempts run out
+        
+        The retry can be moved to another lane (e.g. failed batch items retry interactively).
+        """
+        async with self.pool.acquire() as conn:
+            try:
+                # A dead-lettered job marks its content 'failed' in the same statement;
+                # while retries remain the content stays 'pending'
+                status = await conn.fetchval(f"""
+                    WITH dead AS (
+                        UPDATE analysis_jobs
+                        SET status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'queued' END,
+                            available_at = NOW() + make_interval(secs => $3),
+                            lane = COALESCE($4, lane), batch_id = NULL,
+                            locked_until = NULL, last_error = $2, updated_at = NOW()
+                        WHERE id = $1
+                        RETURNING content_id, status, last_error
+                    ),
+                    failed AS ({DEAD_JOB_CONTENT_UPDATE})
+                    SELECT status FROM dead
+                """, job_id, error, float(retry_delay), lane)
+            except asyncpg.UniqueViolationError:
+                # The content was re-queued meanwhile; that newer job supersedes this one
+                await conn.execute("DELETE FROM analysis_jobs WHERE id = $1", job_id)
+                return 'superseded'
+            
+            if status == 'dead':
+                logger.error(f"Analysis job {job_id} dead-lettered: {error}")
+            return status
+    
+    async def release_analysis_job(self, job_id: int):
+        """Return a claimed job to the queue without counting the attempt (shutdown)"""
+        async with self.pool.acquire() as conn:
+            try:
+                await conn.execute("""
+                    UPDATE analysis_jobs
+                    SET status = 'queued', attempts = GREATEST(attempts - 1, 0),
+                        batch_id = NULL, locked_until = NULL, updated_at = NOW()
+                    WHERE id = $1 AND status = 'running'
+                """, job_id)
+            except asyncpg.UniqueViolationError:
+                await conn.execute("DELETE FROM analysis_jobs WHERE id = $1", job_id)
+    
+    async def set_analysis_job_batch(self, job_ids: List[int], batch_id: str, lock_seconds: float):
+        """
+        Record the provider batch that claimed jobs were submitted in, and hold
+        their claim for lock_seconds (the batch's polling window)
+        """
+        async with self.pool.acquire() as conn:
+            await conn.execute("""
+                UPDATE analysis_jobs
+                SET batch_id = $2, locked_until = NOW() + make_interval(secs => $3), updated_at = NOW()
+                WHERE id = ANY($1::bigint[])
+            """, job_ids, batch_id, float(lock_seconds))
+    
+    async def get_submitted_analysis_batches(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Running jobs that were submitted in a provider batch, grouped by batch id
+        
+        lock_seconds is how long each job's claim has left (negative once expired).
+        """
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT j.batch_id, j.id AS job_id, j.content_id, j.attempts, j.max_attempts,
+                       EXTRACT(EPOCH FROM j.locked_until - NOW())::float8 AS lock_seconds,
+                       c.title, c.category, c.content
+                FROM analysis_jobs j
+                JOIN content_items c ON c.id = j.content_id
+                WHERE j.status = 'running' AND j.batch_id IS NOT NULL
+                ORDER BY j.batch_id, j.id
+            """)
+            
+            batches: Dict[str, List[Dict[str, Any]]] = {}
+            for row in rows:
+                job = dict(row)
+                batches.setdefault(job.pop('batch_id'), []).append(job)
+            return batches
+    
+    async def count_queued_analysis_jobs(self, lane: str = 'interactive') -> int:
+        """Number of jobs waiting to be claimed in a lane"""
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval(
+                "SELECT COUNT(*) FROM analysis_jobs WHERE status = 'queued' AND lane = $1", lane
+            )
+    
+    async def get_analysis_job_counts(self) -> Dict[str, int]:
+        """Number of analysis jobs by status"""
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("SELECT status, COUNT(*) AS count FROM analysis_jobs GROUP BY status")
+            return {row['status']: row['count'] for row in rows}
+    
+    async def get_cached_analysis(self, cache_keys: List[str]) -> Optional[Dict[str, Any]]:
+        """Return the first cached analysis found for cache_keys (in order of preference)"""
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow("""
+                UPDATE analysis_cache
+                SET hit_count = hit_count + 1, last_used_at = NOW()
+                WHERE cache_key = (
+                    SELECT cache_key FROM analysis_cache
+                    WHERE cache_key = ANY($1::text[])
+                    ORDER BY array_position($1::text[], cache_key::text)
+                    LIMIT 1
+                )
+                RETURNING cache_key, model, key_themes, thought_questions
+            """, cache_keys)
+            
+            return dict(row) if row else None
+    
+    async def store_cached_analysis(self, cache_key: str, model: str,
+                                    key_themes: List[str], thought_questions: List[str]):
+        """Save an analysis result for reuse by identical content"""
+        async with self.pool.acquire() as conn:
+            await conn.execute("""
+                INSERT INTO analysis_cache (cache_key, model, key_themes, thought_questions)
+                VALUES ($1, $2, $3, $4)
+                ON CONFLICT (cache_key) DO UPDATE SET
+                    key_themes = EXCLUDED.key_themes,
+                    thought_questions = EXCLUDED.thought_questions,
+                    last_used_at = NOW()
+            """, cache_key, model, key_themes, thought_questions)
     
     async def _insert_default_lookup_data(self, conn):
         """Insert default data into lookup tables"""
@@ -0,0 +1,9 @@
+# backend/tests/conftest.py
+"""
+Test configuration: import app modules the way the server does (from backend/)
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
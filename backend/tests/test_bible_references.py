@@ -0,0 +1,65 @@
+# backend/tests/test_bible_references.py
+"""
+Tests for Bible reference extraction (services.file_processor.extract_bible_references)
+"""
+
+import pytest
+
+from services.file_processor import extract_bible_references
+
+@pytest.mark.parametrize("text, expected", [
+    ("For God so loved the world (John 3:16)", ["John 3:16"]),
+    ("Read 1 Cor 13:4-7 and Psalm 23", ["1 Corinthians 13:4-7", "Psalms 23"]),
+    ("I Cor 13", ["1 Corinthians 13"]),
+    ("2 Tim 3:16", ["2 Timothy 3:16"]),
+    ("Song of Songs 2", ["Song of Songs 2"]),
+    ("Psalm 23-24", ["Psalms 23"]),
+])
+def test_references(text, expected):
+    assert extract_bible_references(text) == expected
+
+@pytest.mark.parametrize("text", [
+    "We Act 2 tonight",
+    "Song 2 verses",
+    "Ex 3 was better",
+    "Pro 3 tier",
+])
+def test_ambiguous_abbreviation_needs_period_or_verse(text):
+    assert extract_bible_references(text) == []
+
+@pytest.mark.parametrize("text, expected", [
+    ("Act. 2", ["Acts 2"]),
+    ("Act 2:4", ["Acts 2:4"]),
+    ("1 Ch 2:3", ["1 Chronicles 2:3"]),
+    ("1 Ch. 2", ["1 Chronicles 2"]),
+    ("1 Co 13:4", ["1 Corinthians 13:4"]),
+])
+def test_ambiguous_abbreviation_with_period_or_verse(text, expected):
+    assert extract_bible_references(text) == expected
+
+@pytest.mark.parametrize("text, expected", [
+    ("In Chapter 1 Ch 2", []),
+    ("page 2 Kings 3", []),
+    ("chapter 1 John 3:16", ["John 3:16"]),
+    ("See 1\nCor 2", []),
+])
+def test_number_prefix_belongs_to_the_book(text, expected):
+    assert extract_bible_references(text) == expected
+
+@pytest.mark.parametrize("text, expected", [
+    ("Jude 3 says", ["Jude 1:3"]),
+    ("Jude 3-5", ["Jude 1:3-5"]),
+    ("Phlm 4", ["Philemon 1:4"]),
+    ("3 John 14", ["3 John 1:14"]),
+    ("Jude 1:3", ["Jude 1:3"]),
+    ("Obadiah 1", ["Obadiah 1"]),
+    ("Jude 30", []),
+])
+def test_single_chapter_books_cite_verses(text, expected):
+    assert extract_bible_references(text) == expected
+
+def test_chapters_beyond_book_length_are_ignored():
+    assert extract_bible_references("Genesis 51 and Revelation 22") == ["Revelation 22"]
+
+def test_chapter_reference_dropped_when_verse_present():
+    assert extract_bible_references("John 3 and John 3:16") == ["John 3:16"]
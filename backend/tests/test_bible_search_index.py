@@ -0,0 +1,71 @@
+# backend/tests/test_bible_search_index.py
+"""
+Tests for the session verse index (services.bible_search_index) and its share
+of the ChapterCache byte bound
+"""
+
+from services.bible_search_index import VerseIndex, tokenize
+from services.bible_session_service import ChapterCache, CompactChapter
+from services.bible_storage_service import BibleChapter
+
+def make_chapter(book_name: str, chapter_number: int, texts) -> BibleChapter:
+    return BibleChapter(
+        book_name=book_name,
+        book_abbrev=book_name[:3],
+        chapter_number=chapter_number,
+        version_code='NLT',
+        verses=[{'number': number, 'text': text} for number, text in enumerate(texts, 1)],
+        verse_count=len(texts),
+        api_reference=f"{book_name}.{chapter_number}"
+    )
+
+PSALM_23 = make_chapter('Psalms', 23, [
+    "The Lord is my shepherd; I have all that I need.",
+    "I will live in the house of the Lord forever.",
+])
+PSALM_24 = make_chapter('Psalms', 24, [
+    "The earth is the Lord’s, and everything in it.",
+])
+
+def test_possessive_matches_the_bare_word():
+    assert tokenize("The Lord’s house, the LORD's house") == ['the', 'lord', 'house', 'the', 'lord', 'house']
+
+    index = VerseIndex()
+    index.add('NLT', 'Psalms_24', CompactChapter(PSALM_24))
+    assert [result['reference'] for result in index.search("lord", 'NLT')] == ['Psalms 24:1']
+    assert [result['reference'] for result in index.search("Lord's earth", 'NLT')] == ['Psalms 24:1']
+
+def test_phrase_with_possessive():
+    index = VerseIndex()
+    index.add('NLT', 'Psalms_24', CompactChapter(PSALM_24))
+    assert [result['reference'] for result in index.search('"the lord\'s"', 'NLT')] == ['Psalms 24:1']
+
+def test_index_bytes_follow_the_resident_chapters():
+    index = VerseIndex()
+    assert index.nbytes == 0
+    index.add('NLT', 'Psalms_23', CompactChapter(PSALM_23))
+    one_chapter = index.nbytes
+    index.add('NLT', 'Psalms_24', CompactChapter(PSALM_24))
+    assert index.nbytes > one_chapter
+    index.remove('NLT', 'Psalms_24')
+    assert index.nbytes == one_chapter
+    index.remove('NLT', 'Psalms_23')
+    assert index.nbytes == 0
+
+def test_cache_byte_bound_counts_index_postings():
+    probe = ChapterCache(index=VerseIndex())
+    probe.put('NLT', 'Psalms_23', PSALM_23)
+    assert probe.resident_bytes() > probe.total_bytes
+
+    # Room for the chapter itself, but not for the chapter plus its postings
+    index = VerseIndex()
+    cache = ChapterCache(max_bytes=probe.total_bytes, index=index)
+    cache.put('NLT', 'Psalms_23', PSALM_23)
+    assert not cache.contains('NLT', 'Psalms_23')
+    assert cache.evictions == 1
+    assert index.nbytes == 0 and cache.resident_bytes() == 0
+
+    cache = ChapterCache(max_bytes=probe.resident_bytes(), index=VerseIndex())
+    cache.put('NLT', 'Psalms_23', PSALM_23)
+    assert cache.contains('NLT', 'Psalms_23')
+    assert cache.stats()['approx_bytes'] == probe.resident_bytes()
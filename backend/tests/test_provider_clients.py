@@ -0,0 +1,158 @@
+# backend/tests/test_provider_clients.py
+"""
+Grok and Claude clients against a local stub server (GROK_BASE_URL/CLAUDE_BASE_URL
+style overrides): pooled connection reuse and the streaming helpers
+"""
+
+import json
+import asyncio
+
+import pytest
+
+from services.grok_service import GrokService
+from services.claude_service import ClaudeService
+from services.http_client import create_http_client
+
+class StubServer:
+    """Minimal keep-alive HTTP/1.1 server that counts connections and requests"""
+
+    def __init__(self):
+        self.connections = 0
+        self.requests = []
+        self.disconnects = 0
+        self.server = None
+        self.release = asyncio.Event()  # lets a held stream finish
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release.set()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    name, value = line.decode().split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                payload = json.loads(body) if body else {}
+                self.requests.append((method, path, payload))
+                await self._respond(reader, writer, path, payload)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.disconnects += 1
+            writer.close()
+
+    async def _respond(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, path: str, payload: dict):
+        if not payload.get("stream"):
+            if path.endswith("/chat/completions"):
+                body = {"choices": [{"message": {"content": f"reply {len(self.requests)}"}}]}
+            else:
+                body = {"content": [{"type": "text", "text": f"sermon {len(self.requests)}"}]}
+            data = json.dumps(body).encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+            )
+            await writer.drain()
+            return
+
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nTransfer-Encoding: chunked\r\n\r\n")
+        for event in self._stream_events(path, payload):
+            if event is None:
+                # Hold the stream open until released, or until the client disconnects
+                released = asyncio.ensure_future(self.release.wait())
+                eof = asyncio.ensure_future(reader.read(1))
+                await asyncio.wait({released, eof}, return_when=asyncio.FIRST_COMPLETED)
+                released.cancel()
+                if eof.done():
+                    raise ConnectionError("client disconnected")
+                eof.cancel()
+                continue
+            chunk = event.encode()
+            writer.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    def _stream_events(self, path: str, payload: dict):
+        prompt = payload["messages"][0]["content"]
+        words = ["In ", "the ", "beginning"]
+        if path.endswith("/chat/completions"):
+            for word in words:
+                yield f"data: {json.dumps({'choices': [{'delta': {'content': word}}]})}\n\n"
+            if prompt == "hold":
+                yield None
+            yield "data: [DONE]\n\n"
+        else:
+            yield f"event: message_start\ndata: {json.dumps({'type': 'message_start'})}\n\n"
+            for word in words:
+                delta = {'type': 'content_block_delta', 'delta': {'type': 'text_delta', 'text': word}}
+                yield f"event: content_block_delta\ndata: {json.dumps(delta)}\n\n"
+            yield f"event: message_stop\ndata: {json.dumps({'type': 'message_stop'})}\n\n"
+
+@pytest.mark.asyncio
+async def test_grok_calls_reuse_one_pooled_connection():
+    async with StubServer() as stub:
+        grok = GrokService(api_key="test", base_url=f"{stub.base_url}/v1", http_client=create_http_client("Grok"))
+        try:
+            assert await grok.generate_chat_response("first") == "reply 1"
+            assert "".join([text async for text in grok.stream_chat_response("second")]) == "In the beginning"
+            assert await grok.generate_sermon("third") == "reply 3"
+        finally:
+            await grok.close()
+
+        assert [path for _, path, _ in stub.requests] == ["/v1/chat/completions"] * 3
+        assert stub.connections == 1
+
+@pytest.mark.asyncio
+async def test_claude_calls_reuse_one_pooled_connection():
+    async with StubServer() as stub:
+        claude = ClaudeService(api_key="test", base_url=stub.base_url, http_client=create_http_client("Claude"))
+        try:
+            assert "".join([text async for text in claude.stream_sermon("first")]) == "In the beginning"
+            assert await claude.generate_sermon("second") == "sermon 2"
+        finally:
+            await claude.close()
+
+        assert [path for _, path, _ in stub.requests] == ["/v1/messages"] * 2
+        assert [payload.get("stream", False) for _, _, payload in stub.requests] == [True, False]
+        assert stub.connections == 1
+
+@pytest.mark.asyncio
+async def test_closing_a_stream_closes_its_upstream_connection():
+    async with StubServer() as stub:
+        grok = GrokService(api_key="test", base_url=f"{stub.base_url}/v1", http_client=create_http_client("Grok"))
+        try:
+            stream = grok.stream_chat_response("hold")
+            assert [await stream.__anext__() for _ in range(3)] == ["In ", "the ", "beginning"]
+            await stream.aclose()
+
+            # The half-read response can't be reused, so the stub sees the disconnect
+            for _ in range(50):
+                if stub.disconnects:
+                    break
+                await asyncio.sleep(0.01)
+            assert stub.disconnects == 1
+
+            # The next call opens a fresh connection from the same client
+            assert await grok.generate_chat_response("after") == "reply 2"
+            assert stub.connections == 2
+        finally:
+            await grok.close()
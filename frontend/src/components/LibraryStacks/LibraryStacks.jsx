@@ -48,14 +48,22 @@ const LibraryStacks = () => {
   // Handle content actions with navigation
   const handleContentAction = useCallback(async (action, item) => {
     if (action === "edit") {
-      // Store content in localStorage for StudyHall
+      // Store content in localStorage for StudyHall (list items only carry a preview)
+      let fullItem;
+      try {
+        fullItem = await contentHook.loadFullContent(item);
+      } catch (error) {
+        console.error('Failed to load content for editing:', error);
+        alert('Failed to open content for editing. Please try again.');
+        return;
+      }
       localStorage.setItem(
         "editingContent",
         JSON.stringify({
-          id: item.id,
-          title: item.title,
-          content: item.content,
-          category: item.category,
+          id: fullItem.id,
+          title: fullItem.title,
+          content: fullItem.content,
+          category: fullItem.category,
         })
       );
 
@@ -66,7 +74,7 @@ const LibraryStacks = () => {
 
     // Handle other actions through content hook
     await contentHook.handleContentAction(action, item);
-  }, [navigate, contentHook.handleContentAction]);
+  }, [navigate, contentHook.handleContentAction, contentHook.loadFullContent]);
 
   // Handle file upload success
   const handleUploadSuccess = useCallback(async (category) => {
@@ -212,8 +212,8 @@ const ContentGrid = ({
           {/* Card Content */}
           <div className="p-3 md:p-4">
             <div className="text-sm text-wood-dark/80 leading-relaxed mb-3">
-              {item.content ? (
-                <MarkdownRenderer content={truncateContent(item.content)} />
+              {(item.preview || item.content) ? (
+                <MarkdownRenderer content={truncateContent(item.preview || item.content)} />
               ) : (
                 <p className="italic text-wood-dark/60">No content preview available</p>
               )}
@@ -255,21 +255,39 @@ export const useContentManagement = () => {
     }
   };
 
+  // Listed items carry only a preview; fetch the full body when it is needed
+  const loadFullContent = async (item) => {
+    if (typeof item.content === 'string') {
+      return item;
+    }
+    const fullItem = await apiService.getContent(item.id);
+    return { ...item, ...fullItem };
+  };
+
   // Handle content actions (edit, delete, share, etc.)
   const handleContentAction = async (action, item) => {
     switch (action) {
-      case 'edit':
+      case 'edit': {
         // Store content in localStorage for StudyHall
+        let fullItem;
+        try {
+          fullItem = await loadFullContent(item);
+        } catch (error) {
+          console.error('Failed to load content for editing:', error);
+          alert('Failed to open content for editing. Please try again.');
+          break;
+        }
         localStorage.setItem('editingContent', JSON.stringify({
-          id: item.id,
-          title: item.title,
-          content: item.content,
-          category: item.category
+          id: fullItem.id,
+          title: fullItem.title,
+          content: fullItem.content,
+          category: fullItem.category
         }));
         
         // Navigate to StudyHall
         // Note: navigate function should be passed from parent component
         break;
+      }
 
       case 'delete':
         if (window.confirm(`Are you sure you want to delete "${item.title}"?`)) {
@@ -291,7 +309,12 @@ export const useContentManagement = () => {
         break;
 
       case 'view':
-        setSelectedContent(item);
+        try {
+          setSelectedContent(await loadFullContent(item));
+        } catch (fetchError) {
+          console.error('Failed to fetch complete content:', fetchError);
+          setSelectedContent(item);
+        }
         setShowContentViewer(true);
         break;
 
@@ -419,7 +442,7 @@ export const useContentManagement = () => {
       
       // Ensure we have complete content data including AI analysis
       let fullItem = item;
-      if (!item.key_themes || !item.thought_questions) {
+      if (typeof item.content !== 'string' || !item.key_themes || !item.thought_questions) {
         try {
           console.log('📥 Fetching complete content with AI analysis...');
           fullItem = await apiService.getContent(item.id);
@@ -540,6 +563,7 @@ export const useContentManagement = () => {
     handleArtifactSelect,
     handleDownload,
     handleCategoryChange,
+    loadFullContent,
 
     // Setters
     setShowContentViewer,
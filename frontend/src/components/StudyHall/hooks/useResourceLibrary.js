@@ -34,6 +34,7 @@ export const useResourceLibrary = () => {
               const fullData = await apiService.getContent(resource.id);
               return {
                 ...resource,
+                content: fullData.content,
                 key_themes: fullData.key_themes || [],
                 tags: fullData.tags || []
               };
@@ -73,7 +74,7 @@ export const useResourceLibrary = () => {
             category: category,
             type: category,
             size: item.size_bytes ? formatFileSize(item.size_bytes) : '0 B',
-            content: item.content, // Include content for viewing
+            preview: item.preview, // Full content is fetched when the resource is selected
             key_themes: item.key_themes || [], // Include key themes for sermon curation
             date_created: item.date_created,
             date_modified: item.date_modified
@@ -118,6 +119,7 @@ export const useResourceLibrary = () => {
         const fullData = await apiService.getContent(resource.id);
         const enrichedResource = {
           ...resource,
+          content: fullData.content, // Listings only carry a preview
           key_themes: fullData.key_themes || [],
           tags: fullData.tags || []
         };
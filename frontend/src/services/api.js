@@ -111,11 +111,17 @@ class APIService {
     return await this.handleResponse(response);
   }
 
-  async listContent(category = null, limit = 100, offset = 0) {
-    let url = `${this.baseURL}/api/storage/content?limit=${limit}&offset=${offset}`;
+  // Listings default to the summary projection (metadata plus a short preview);
+  // use getContent for the full body, or pass fields = 'full'
+  async listContent(category = null, limit = 100, offset = 0, cursor = null, fields = 'summary') {
+    let url = `${this.baseURL}/api/storage/content?limit=${limit}&offset=${offset}&fields=${fields}`;
     if (category) {
       url += `&category=${encodeURIComponent(category)}`;
     }
+    if (cursor) {
+      // next_cursor from the previous page (keyset pagination)
+      url += `&cursor=${encodeURIComponent(cursor)}`;
+    }
 
     const response = await fetch(url, {
       headers: this.getAuthHeaders(),